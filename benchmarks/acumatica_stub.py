@@ -0,0 +1,422 @@
+"""
+Local stand-in for the Acumatica REST endpoints the scanner app calls.
+
+Serves what the app needs for a scan lookup, as documented in the manual:
+
+    POST /identity/connect/token              OAuth 2.0 password grant
+    POST /entity/auth/login, /entity/auth/logout
+                                              cookie login, the app's fallback
+    GET  /entity                              endpoint/version discovery
+    GET  /entity/Default/{version}/StockItem  $filter on InventoryID (eq,
+                                              contains, startswith), $expand
+
+Items come from a synthetic catalog (or a StockItem CSV export) with
+Acumatica's {"value": ...} field wrappers and per-warehouse details. Each
+response can be delayed by a fixed latency plus random jitter, and a share
+of lookups can be failed with 401 (an expired token) or 404 (an API version
+mismatch), the errors the manual's troubleshooting section covers. Asking
+for an unknown version or for /InventoryItem returns 404 as the real server
+does.
+
+Only the standard library is needed. bench_lookup.py drives it with replayed
+scan streams.
+
+Run: python benchmarks/acumatica_stub.py [--port 8765] [--items 10000] [--latency 20 --jitter 10]
+"""
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, unquote, urlsplit
+import argparse
+import asyncio
+import bisect
+import csv
+import json
+import random
+import re
+import secrets
+import time
+import uuid
+
+DEFAULT_PORT = 8765
+DEFAULT_VERSION = '24.200.001'
+# Versions listed by /entity; the app picks one of the Default endpoints
+VERSIONS = ('20.200.001', '22.200.001', '23.200.001', DEFAULT_VERSION)
+BUILD_VERSION = '24.109.0016'
+WAREHOUSES = ('WHOLESALE', 'RETAIL', 'MAIN')
+ITEM_CLASSES = ('STOCKITEM', 'ELECTRONIC', 'HARDWARE', 'CONSUMABLE')
+
+DEFAULT_CLIENT_ID = 'C6ECE655-8FE3-5C1F-C7C8-3309E724BA61@Company'
+DEFAULT_CLIENT_SECRET = 'your-secret-key'
+DEFAULT_USERNAME = 'admin'
+DEFAULT_PASSWORD = 'admin'
+
+STATUS_TEXT = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+# ---------------------------------------------------------------------------
+# HTTP/1.1 over asyncio streams, shared with bench_lookup.py
+# ---------------------------------------------------------------------------
+
+class HttpError(Exception):
+    """The peer sent something that is not HTTP we understand."""
+
+async def read_message(reader):
+    """Read one request or response; returns (start_line, headers, body).
+
+    Header names are lower-cased. Returns None when the connection closes
+    before a message starts. Bodies need a Content-Length.
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise
+        return None
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    if 'chunked' in headers.get('transfer-encoding', ''):
+        raise HttpError('chunked bodies are not supported')
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return lines[0], headers, body
+
+def format_message(start_line, headers, body=b''):
+    """Return the bytes of an HTTP message with a Content-Length."""
+    lines = [start_line] + [f'{name}: {value}' for name, value in headers.items()]
+    lines.append(f'Content-Length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+# ---------------------------------------------------------------------------
+# Catalog
+# ---------------------------------------------------------------------------
+
+def wrap(value):
+    """Wrap a field value the way Acumatica's contract API does."""
+    return {'value': value}
+
+def stock_item(inventory_id, description, item_class='STOCKITEM', base_unit='EA', rng=random):
+    """Return a StockItem record with warehouse details."""
+    details = []
+    for i, warehouse in enumerate(rng.sample(WAREHOUSES, rng.randint(1, len(WAREHOUSES)))):
+        on_hand = rng.randint(0, 500)
+        details.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'WarehouseID': wrap(warehouse),
+            'QtyOnHand': wrap(float(on_hand)),
+            'QtyAvailable': wrap(float(on_hand - rng.randint(0, on_hand // 4))),
+            'IsDefault': wrap(i == 0),
+        })
+    price = round(rng.uniform(1, 500), 2)
+    return {
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'InventoryID': wrap(inventory_id),
+        'Description': wrap(description),
+        'Type': wrap('Finished Good'),
+        'ItemClass': wrap(item_class),
+        'PostingClass': wrap('STOCKITEM'),
+        'TaxCategory': wrap('TAXABLE'),
+        'DefaultWarehouse': wrap(details[0]['WarehouseID']['value']),
+        'BaseUnit': wrap(base_unit),
+        'DefaultPrice': wrap(price),
+        'BasePrice': wrap(price),
+        'ItemStatus': wrap('Active'),
+        'QtyOnHand': wrap(sum(detail['QtyOnHand']['value'] for detail in details)),
+        'ValMethod': wrap('Average'),
+        'LotSerialClass': wrap('NOTTRACKED'),
+        'WarehouseDetails': details,
+    }
+
+def synthetic_ids(count):
+    """Return the inventory IDs of the synthetic catalog."""
+    return [f'ITEM{i:06d}' for i in range(count)]
+
+def synthetic_catalog(count, seed=0):
+    """Yield count synthetic StockItem records."""
+    rng = random.Random(seed)
+    for i, inventory_id in enumerate(synthetic_ids(count)):
+        yield stock_item(inventory_id, f'Stock item {i}', ITEM_CLASSES[i % len(ITEM_CLASSES)], 'EA', rng)
+
+def csv_catalog(path, seed=0):
+    """Yield StockItem records for the rows of a StockItem CSV export."""
+    rng = random.Random(seed)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('InventoryID'):
+                yield stock_item(row['InventoryID'].strip(), row.get('Description', ''),
+                                 row.get('ItemClass') or 'STOCKITEM', row.get('BaseUOM') or 'EA', rng)
+
+class Catalog:
+    """Items indexed by InventoryID, with each response body encoded once."""
+
+    def __init__(self, items):
+        self.ids = []
+        self.bodies = {}
+        for item in items:
+            inventory_id = item['InventoryID']['value']
+            summary = {key: value for key, value in item.items() if key != 'WarehouseDetails'}
+            self.ids.append(inventory_id)
+            self.bodies[inventory_id] = (json.dumps(summary), json.dumps(item))
+        self.ids.sort()
+        self.upper = [inventory_id.upper() for inventory_id in self.ids]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find(self, operator, value):
+        """Return the matching InventoryIDs; matching ignores case like Acumatica's."""
+        value = value.upper()
+        if operator == 'eq':
+            i = bisect.bisect_left(self.upper, value)
+            return self.ids[i:i + 1] if i < len(self.upper) and self.upper[i] == value else []
+        if operator == 'startswith':
+            i = bisect.bisect_left(self.upper, value)
+            j = bisect.bisect_left(self.upper, value + '\uffff')
+            return self.ids[i:j]
+        return [inventory_id for inventory_id, upper in zip(self.ids, self.upper) if value in upper]
+
+    def body(self, inventory_ids, expand):
+        """Return the JSON array of the items."""
+        index = 1 if expand else 0
+        return ('[' + ','.join(self.bodies[inventory_id][index] for inventory_id in inventory_ids) + ']').encode()
+
+FILTER_PATTERNS = (
+    ('eq', re.compile(r"^\s*InventoryID\s+eq\s+'((?:[^']|'')*)'\s*$")),
+    ('contains', re.compile(r"^\s*contains\(\s*InventoryID\s*,\s*'((?:[^']|'')*)'\s*\)\s*$")),
+    ('startswith', re.compile(r"^\s*startswith\(\s*InventoryID\s*,\s*'((?:[^']|'')*)'\s*\)\s*$")),
+)
+
+def parse_filter(text):
+    """Return (operator, value) for the $filter forms the app sends."""
+    for operator, pattern in FILTER_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return operator, match.group(1).replace("''", "'")
+    raise ValueError(f'Unsupported $filter: {text}')
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+@dataclass
+class StubConfig:
+    """Credentials, injected latency and error rates."""
+    client_id: str = DEFAULT_CLIENT_ID
+    client_secret: str = DEFAULT_CLIENT_SECRET
+    username: str = DEFAULT_USERNAME
+    password: str = DEFAULT_PASSWORD
+    token_ttl: int = 3600  # seconds
+    latency: float = 0.0  # ms added to every response
+    jitter: float = 0.0  # ms, uniform on top of latency
+    error_401: float = 0.0  # share of lookups answered 401
+    error_404: float = 0.0  # share of lookups answered 404
+    seed: int = 0
+    versions: tuple = VERSIONS
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    by_status: dict = field(default_factory=dict)
+
+    def count(self, status):
+        self.requests += 1
+        self.by_status[status] = self.by_status.get(status, 0) + 1
+
+def json_response(status, payload, headers=None):
+    return status, dict(headers or {}), json.dumps(payload).encode()
+
+def error_response(status, message):
+    """Return an Acumatica-style error body."""
+    return json_response(status, {'message': message})
+
+class AcumaticaStub:
+    """Answers requests from a Catalog under a StubConfig."""
+
+    def __init__(self, catalog, config=StubConfig()):
+        self.catalog = catalog
+        self.config = config
+        self.tokens = {}  # access token -> expiry (monotonic seconds)
+        self.sessions = set()  # .ASPXAUTH cookie values
+        self.random = random.Random(config.seed)
+        self.stats = StubStats()
+
+    # Routes -----------------------------------------------------------------
+
+    def token(self, form):
+        config = self.config
+        if form.get('grant_type') != 'password':
+            return json_response(400, {'error': 'unsupported_grant_type'})
+        if (form.get('client_id'), form.get('client_secret')) != (config.client_id, config.client_secret):
+            return json_response(401, {'error': 'invalid_client'})
+        if (form.get('username'), form.get('password')) != (config.username, config.password):
+            return json_response(400, {'error': 'invalid_grant', 'error_description': 'invalid_username_or_password'})
+        access_token = secrets.token_urlsafe(24)
+        self.tokens[access_token] = time.monotonic() + config.token_ttl
+        return json_response(200, {'access_token': access_token, 'expires_in': config.token_ttl,
+                                   'token_type': 'Bearer', 'scope': form.get('scope', 'api')})
+
+    def login(self, body):
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            return error_response(400, 'Invalid JSON')
+        if (request.get('name'), request.get('password')) != (self.config.username, self.config.password):
+            return error_response(401, 'Invalid credentials. Please try again.')
+        session = secrets.token_hex(16)
+        self.sessions.add(session)
+        return 204, {'Set-Cookie': f'.ASPXAUTH={session}; path=/; HttpOnly'}, b''
+
+    def logout(self, headers):
+        self.sessions.discard(session_cookie(headers))
+        return 204, {}, b''
+
+    def endpoints(self, base_url):
+        return json_response(200, {
+            'version': {'acumaticaBuildVersion': BUILD_VERSION, 'databaseVersion': BUILD_VERSION},
+            'endpoints': [{'name': 'Default', 'version': version, 'href': f'{base_url}/entity/Default/{version}/'}
+                          for version in self.config.versions],
+        })
+
+    def authorized(self, headers):
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        if scheme.lower() == 'bearer':
+            expiry = self.tokens.get(token)
+            return expiry is not None and expiry > time.monotonic()
+        return session_cookie(headers) in self.sessions
+
+    def stock_items(self, version, entity, query, headers):
+        if not self.authorized(headers):
+            return error_response(401, 'You are not logged in.')
+        if version not in self.config.versions or entity != 'StockItem':
+            return error_response(404, f'Entity {entity} not found in endpoint Default/{version}.')
+        roll = self.random.random()
+        if roll < self.config.error_401:
+            return error_response(401, 'You are not logged in.')
+        if roll < self.config.error_401 + self.config.error_404:
+            return error_response(404, f'Entity {entity} not found in endpoint Default/{version}.')
+        expand = 'WarehouseDetails' in query.get('$expand', '')
+        text = query.get('$filter')
+        if text is None:
+            found = self.catalog.ids[:int(query.get('$top', 100))]
+        else:
+            try:
+                found = self.catalog.find(*parse_filter(text))
+            except ValueError as e:
+                return error_response(400, str(e))
+        return 200, {}, self.catalog.body(found, expand)
+
+    def handle(self, method, target, headers, body, base_url=''):
+        """Return (status, headers, body) for one request."""
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip('/')
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = path.split('/')
+        if path == '/identity/connect/token' and method == 'POST':
+            form = {key: values[-1] for key, values in parse_qs(body.decode('utf-8')).items()}
+            return self.token(form)
+        if path == '/entity/auth/login' and method == 'POST':
+            return self.login(body)
+        if path == '/entity/auth/logout' and method == 'POST':
+            return self.logout(headers)
+        if path == '/entity' and method == 'GET':
+            return self.endpoints(base_url)
+        if len(parts) == 5 and parts[1] == 'entity' and parts[2] == 'Default':
+            if method != 'GET':
+                return error_response(405, f'{method} is not supported by this stand-in')
+            return self.stock_items(parts[3], parts[4], query, headers)
+        return error_response(404, f'No route for {method} {path}')
+
+    # Connection handling ----------------------------------------------------
+
+    async def delay(self):
+        seconds = (self.config.latency + self.random.uniform(0, self.config.jitter)) / 1000
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    async def serve_connection(self, reader, writer):
+        host, port = writer.get_extra_info('sockname')[:2]
+        base_url = f'http://{host}:{port}'
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                request_line, headers, body = message
+                method, target, _ = request_line.split(' ', 2)
+                try:
+                    status, response_headers, payload = self.handle(method, target, headers, body, base_url)
+                except Exception as e:  # keep serving; the client sees a 500
+                    status, response_headers, payload = error_response(500, f'{type(e).__name__}: {e}')
+                await self.delay()
+                self.stats.count(status)
+                if payload:
+                    response_headers.setdefault('Content-Type', 'application/json; charset=utf-8')
+                writer.write(format_message(f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}',
+                                            response_headers, payload))
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, HttpError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Start listening and return the asyncio server; port 0 picks a free one."""
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+def session_cookie(headers):
+    for cookie in headers.get('cookie', '').split(';'):
+        name, _, value = cookie.strip().partition('=')
+        if name == '.ASPXAUTH':
+            return value
+    return None
+
+def add_stub_arguments(parser):
+    """Add the catalog, latency and error injection options to a parser."""
+    parser.add_argument('--items', type=int, default=10000, help='synthetic catalog size (default: 10000)')
+    parser.add_argument('--catalog', metavar='CSV', help='serve the items of a StockItem CSV export instead')
+    parser.add_argument('--latency', type=float, default=0.0, metavar='MS',
+                        help='delay added to every response (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, metavar='MS',
+                        help='random extra delay, uniform in [0, MS] (default: 0)')
+    parser.add_argument('--error-401', type=float, default=0.0, metavar='RATE',
+                        help='share of lookups failed with 401 as if the token expired (default: 0)')
+    parser.add_argument('--error-404', type=float, default=0.0, metavar='RATE',
+                        help='share of lookups failed with 404 as on an API version mismatch (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the catalog, jitter and errors')
+
+def stub_from_args(args):
+    """Build an AcumaticaStub from parsed arguments."""
+    items = csv_catalog(args.catalog, args.seed) if args.catalog else synthetic_catalog(args.items, args.seed)
+    config = StubConfig(latency=args.latency, jitter=args.jitter, error_401=args.error_401,
+                        error_404=args.error_404, seed=args.seed)
+    return AcumaticaStub(Catalog(items), config)
+
+async def serve(stub, host, port):
+    server = await stub.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f'Acumatica stand-in on http://{address[0]}:{address[1]} with {len(stub.catalog)} items')
+    print(f'OAuth client: {stub.config.client_id} / {stub.config.client_secret}, '
+          f'user: {stub.config.username} / {stub.config.password}, versions: {", ".join(stub.config.versions)}')
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the Acumatica REST API.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'port (default: {DEFAULT_PORT})')
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+    stub = stub_from_args(args)
+    try:
+        asyncio.run(serve(stub, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    print(f'Served {stub.stats.requests} requests: '
+          + ', '.join(f'{status}: {count}' for status, count in sorted(stub.stats.by_status.items())))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""
+Benchmark suite for the asset generation scripts.
+
+Each case runs in a fresh Python process, and its wall time, CPU time and
+peak RSS are recorded:
+
+    create_icon[N]       create_icon.create_icon at N px
+    tiled_icon[8192]     the same icon drawn in 256-row strips
+    generate_icon[N]     generate_icons.generate_icon at N px with cairosvg
+    cold_start[BACKEND]  a new interpreter per run, from launch until the
+                         first generate_icons icon is on disk
+    create_manual[...]   create_manual.create_manual: cached, raw screenshots,
+                         every format, or every language
+    table[...]           the bulk table builder at 10k rows and python-docx's
+                         cell-by-cell API at 1k rows
+    barcode_sheets[...]  barcode_sheets at 1k and 10k SKUs (peak RSS should
+                         not grow with the count) and as PNG
+
+Results can be saved as a baseline JSON and compared on later runs. The
+suite exits with status 1 when a case regresses past the threshold or goes
+over its RSS_LIMITS_MB ceiling.
+
+Everything runs offline against files in this repository. Cases whose
+dependencies are not installed (e.g. cairosvg or resvg) are reported as
+skipped.
+
+Run: python benchmarks/bench_assets.py [--save-baseline] [--threshold 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ICONS_DIR = os.path.join(REPO_ROOT, 'store-assets', 'samsung')
+DOCS_DIR = os.path.join(REPO_ROOT, 'docs')
+SVG_PATH = os.path.join(REPO_ROOT, 'AcumaticaInventoryScanner', 'Resources', 'Images', 'app_icon.svg')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+# Metrics compared against the baseline
+METRICS = ('wall_s', 'cpu_s', 'peak_rss_kb')
+
+# Peak RSS ceilings in MB, checked on every run with or without a baseline.
+# Tiled rendering must stay bounded by the strip size; the full 8192 canvas
+# peaks above 1 GB.
+RSS_LIMITS_MB = {
+    'tiled_icon[8192]': 200,
+}
+
+# ---------------------------------------------------------------------------
+# Cases (run inside the child process)
+# ---------------------------------------------------------------------------
+
+def case_create_icon(size, tile_rows=0):
+    import create_icon
+    from png_encode import PngEncoder
+    encoder = PngEncoder(tile_rows=tile_rows)
+    return lambda out_dir: create_icon.create_icon(size, os.path.join(out_dir, f"icon_{size}.png"), encoder=encoder)
+
+def case_generate_icon(size):
+    import generate_icons
+    from icon_backends import get_backend
+    get_backend('cairosvg')  # skip the case when cairosvg cannot run
+    return lambda out_dir: generate_icons.generate_icon(SVG_PATH, os.path.join(out_dir, f"icon_{size}.png"), size,
+                                                        backend='cairosvg')
+
+COLD_START_SCRIPT = (
+    "import sys; sys.path.insert(0, sys.argv[1]); import generate_icons; "
+    "sys.exit(not generate_icons.generate_icon(sys.argv[2], sys.argv[3], 512, backend=sys.argv[4]))"
+)
+
+def case_cold_start(backend):
+    from icon_backends import get_backend, load_svg
+    get_backend(backend, [load_svg(SVG_PATH)])  # skip the case when the backend cannot run
+    def run(out_dir):
+        subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, ICONS_DIR, SVG_PATH,
+                        os.path.join(out_dir, 'icon_512.png'), backend],
+                       check=True, stdout=subprocess.DEVNULL)
+    return run
+
+def case_create_manual(raw_images=False, formats=('docx',), languages=('en',)):
+    import create_manual
+    from image_prep import ImagePreprocessor
+    # The screenshot and section caches live in the case's temp dir: the
+    # first run fills them and the best-of-N time is the warm, cached build
+    return lambda out_dir: create_manual.create_manual(
+        os.path.join(out_dir, 'manual.docx'),
+        ImagePreprocessor(cache_dir=os.path.join(out_dir, 'image-cache')),
+        raw_images=raw_images,
+        fragments=create_manual.FragmentCache(os.path.join(out_dir, 'manual-cache')),
+        formats=formats, languages=languages)
+
+CATALOG_HEADER = ['InventoryID', 'Description', 'ItemClass', 'BaseUOM', 'Barcode']
+
+def catalog_rows(count):
+    """Yield synthetic StockItem rows."""
+    for i in range(count):
+        yield [f"ITEM{i:06d}", f"Stock item {i}", 'STOCKITEM', 'EA', f"400638{i:07d}"]
+
+def add_table_by_cell(doc, header, rows):
+    """Fill a table through python-docx's cell proxies, as create_manual once did."""
+    from docx.shared import RGBColor
+    from create_manual import set_cell_shading
+    rows = [header] + list(rows)
+    table = doc.add_table(rows=len(rows), cols=len(header))
+    table.style = 'Table Grid'
+    for i, row_data in enumerate(rows):
+        for j, cell_text in enumerate(row_data):
+            cell = table.rows[i].cells[j]
+            cell.text = cell_text
+            if i == 0:
+                set_cell_shading(cell, '008080')
+                run = cell.paragraphs[0].runs[0]
+                run.bold = True
+                run.font.color.rgb = RGBColor(255, 255, 255)
+
+def case_table(rows, bulk=True):
+    from docx import Document
+    from docx_tables import add_bulk_table
+    add = add_bulk_table if bulk else add_table_by_cell
+    def run(out_dir):
+        doc = Document()
+        add(doc, CATALOG_HEADER, catalog_rows(rows))
+        doc.save(os.path.join(out_dir, 'table.docx'))
+    return run
+
+def case_barcode_sheets(count, output='sheets.pdf'):
+    import csv
+    import barcode_sheets
+    def run(out_dir):
+        csv_path = os.path.join(out_dir, f'items-{count}.csv')
+        if not os.path.exists(csv_path):
+            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(CATALOG_HEADER)
+                writer.writerows(catalog_rows(count))
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            barcode_sheets.write_sheets(f, os.path.join(out_dir, output))
+    return run
+
+CASES = {
+    'create_icon[48]': (case_create_icon, (48,)),
+    'create_icon[512]': (case_create_icon, (512,)),
+    'create_icon[1024]': (case_create_icon, (1024,)),
+    'create_icon[4096]': (case_create_icon, (4096,)),
+    'create_icon[8192]': (case_create_icon, (8192,)),
+    'tiled_icon[8192]': (case_create_icon, (8192, 256)),
+    'generate_icon[48]': (case_generate_icon, (48,)),
+    'generate_icon[512]': (case_generate_icon, (512,)),
+    'cold_start[resvg]': (case_cold_start, ('resvg',)),
+    'cold_start[cairosvg]': (case_cold_start, ('cairosvg',)),
+    'cold_start[pillow]': (case_cold_start, ('pillow',)),
+    'create_manual': (case_create_manual, ()),
+    'create_manual[raw]': (case_create_manual, (True,)),
+    'create_manual[all]': (case_create_manual, (False, ('docx', 'html', 'pdf'))),
+    'create_manual[i18n]': (case_create_manual, (False, ('docx',), ('en', 'de', 'es'))),
+    # Cell by cell is quadratic in the row count; 10k rows would take minutes
+    'table[bulk-10k]': (case_table, (10000,)),
+    'table[cells-1k]': (case_table, (1000, False)),
+    'barcode_sheets[1k]': (case_barcode_sheets, (1000,)),
+    'barcode_sheets[10k]': (case_barcode_sheets, (10000,)),
+    'barcode_sheets[png]': (case_barcode_sheets, (1000, 'sheets.png')),
+}
+
+def peak_rss_kb():
+    """Return the peak resident set size of this process or its children in KiB, if known."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def cpu_time():
+    """Return CPU seconds used by this process and its finished children."""
+    if resource is None:
+        return time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+def run_case(name, repeat):
+    """Run one case in this process and return its measurements."""
+    sys.path[:0] = [ICONS_DIR, DOCS_DIR]
+    factory, args = CASES[name]
+    try:
+        func = factory(*args)
+    except (ImportError, OSError) as e:
+        reason = (str(e).splitlines() or [''])[0]
+        return {'skipped': f"{type(e).__name__}: {reason}"}
+
+    best = None
+    with tempfile.TemporaryDirectory() as out_dir:
+        devnull = open(os.devnull, 'w')
+        stdout = sys.stdout
+        for _ in range(repeat):
+            sys.stdout = devnull
+            try:
+                wall_start, cpu_start = time.perf_counter(), cpu_time()
+                func(out_dir)
+                wall, cpu = time.perf_counter() - wall_start, cpu_time() - cpu_start
+            finally:
+                sys.stdout = stdout
+            if best is None or wall < best[0]:
+                best = (wall, cpu)
+        devnull.close()
+    return {'wall_s': best[0], 'cpu_s': best[1], 'peak_rss_kb': peak_rss_kb()}
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def measure(name, repeat):
+    """Run a case in a fresh interpreter so peak RSS is its own."""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-case', name, '--repeat', str(repeat)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {'error': (proc.stderr.strip().splitlines() or ['unknown error'])[-1]}
+    return json.loads(proc.stdout)
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous or 'skipped' in current or 'error' in current or 'skipped' in previous:
+            continue
+        for metric in METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if old and new is not None and new > old * (1 + threshold):
+                regressions.append(f"{name}: {metric} {old:.4g} -> {new:.4g} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+def over_limit(results):
+    """Return a message for each case whose peak RSS is above its ceiling."""
+    messages = []
+    for name, limit in RSS_LIMITS_MB.items():
+        rss = results.get(name, {}).get('peak_rss_kb')
+        if rss and rss / 1024 > limit:
+            messages.append(f"{name}: peak RSS {rss / 1024:.1f} MB over the {limit} MB limit")
+    return messages
+
+def format_row(name, result, baseline):
+    """Return one line of the results table."""
+    if 'skipped' in result:
+        return f"{name:<20} skipped ({result['skipped']})"
+    if 'error' in result:
+        return f"{name:<20} ERROR {result['error']}"
+    rss = result['peak_rss_kb']
+    row = (f"{name:<20} {result['wall_s'] * 1000:>10.1f} {result['cpu_s'] * 1000:>10.1f} "
+           f"{(rss / 1024 if rss else 0):>9.1f}")
+    previous = baseline.get('cases', {}).get(name, {})
+    if previous.get('wall_s'):
+        row += f" {(result['wall_s'] / previous['wall_s'] - 1) * 100:>+8.0f}%"
+    return row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the asset generation scripts.")
+    parser.add_argument('cases', nargs='*', metavar='CASE',
+                        help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, best is kept (default: 3)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON path')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'allowed slowdown before failing, as a fraction (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--output', help='also write the results JSON here')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.repeat)))
+        return 0
+
+    names = args.cases or list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(f"{'Case':<20} {'wall (ms)':>10} {'cpu (ms)':>10} {'RSS (MB)':>9} {'vs base':>9}")
+    print("-" * 62)
+    results = {}
+    for name in names:
+        results[name] = measure(name, args.repeat)
+        print(format_row(name, results[name], baseline))
+    print("-" * 62)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    limits = over_limit(results)
+    for message in limits:
+        print(f"OVER LIMIT {message}")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+        return 1 if limits else 0
+
+    if not baseline:
+        print("No baseline to compare against (use --save-baseline)")
+        return 1 if limits else 0
+    regressions = compare(results, baseline, args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if regressions or limits:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Load generator for the scan-lookup path.
+
+Replays a stream of scanned barcodes the way the app looks them up: each
+virtual scanner keeps one keep-alive connection and gets an OAuth token once,
+the way the app's HttpClient does. It picks the newest Default endpoint from
+/entity, then for every scan queries StockItem with InventoryID eq, falling
+back to contains and then startswith when nothing matches. A 401 triggers one
+re-authentication and a retry, as a token refresh would.
+
+Scans come from a file (one code per line, or a CSV with a Barcode or
+InventoryID column) or from a synthetic stream over the stand-in's catalog
+with a share of partial codes and misses. By default the scanners run closed
+loop (the next scan starts when the previous one returns, after an optional
+think time). With --rate, scans are scheduled at a fixed arrival rate and
+latency is measured from the scheduled time, so a slow server is not hidden
+by scanners that back off.
+
+Without --url an acumatica_stub server is started in this process, on the
+same event loop. The stand-in's latency and error injection options apply to
+it. The report gives throughput and p50/p90/p99 latency per scan and per
+request, plus outcome and status counts.
+
+Run: python benchmarks/bench_lookup.py [--scans 5000] [--scanners 8] [--rate 200] [--latency 20 --jitter 10]
+"""
+from urllib.parse import quote, urlsplit
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import time
+
+from acumatica_stub import (DEFAULT_CLIENT_ID, DEFAULT_CLIENT_SECRET, DEFAULT_PASSWORD, DEFAULT_USERNAME,
+                            add_stub_arguments, format_message, read_message, stub_from_args, synthetic_ids)
+
+# The app's lookup chain, tried in order until one returns items
+LOOKUP_FILTERS = (
+    "InventoryID eq '{}'",
+    "contains(InventoryID,'{}')",
+    "startswith(InventoryID,'{}')",
+)
+
+# ---------------------------------------------------------------------------
+# Scan streams
+# ---------------------------------------------------------------------------
+
+def read_stream(path):
+    """Return the codes in a scan file: plain lines, or a CSV with a Barcode/InventoryID column."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        first = f.readline()
+        f.seek(0)
+        columns = [column.strip() for column in first.split(',')]
+        if 'Barcode' in columns or 'InventoryID' in columns:
+            return [code for row in csv.DictReader(f)
+                    if (code := (row.get('Barcode') or row.get('InventoryID') or '').strip())]
+        return [line.strip() for line in f if line.strip()]
+
+def synthetic_stream(count, items, partial_rate=0.05, miss_rate=0.05, seed=0):
+    """Return count scans over the synthetic catalog.
+
+    Partial codes (a leading slice of an ID) miss the eq lookup and are found
+    by the contains fallback; misses run the whole chain and find nothing.
+    """
+    rng = random.Random(seed)
+    ids = synthetic_ids(items)
+    codes = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < miss_rate:
+            codes.append(f'NOSUCH{i:06d}')
+        elif roll < miss_rate + partial_rate:
+            codes.append(rng.choice(ids)[:-2])
+        else:
+            codes.append(rng.choice(ids))
+    return codes
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class ScanClient:
+    """One scanner: a keep-alive connection, a bearer token and the lookup chain."""
+
+    def __init__(self, url, credentials, stats):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise ValueError(f'Only http:// targets are supported: {url}')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.credentials = credentials
+        self.stats = stats
+        self.reader = self.writer = None
+        self.token = None
+        self.version = None
+
+    async def request(self, method, path, body=b'', content_type=None, auth=True):
+        """Send one request, reconnecting once if the server closed the connection."""
+        headers = {'Host': f'{self.host}:{self.port}', 'Accept': 'application/json'}
+        if auth and self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if content_type:
+            headers['Content-Type'] = content_type
+        data = format_message(f'{method} {self.prefix}{path} HTTP/1.1', headers, body)
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            start = time.perf_counter()
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+                message = await read_message(self.reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                message = None
+            if message is not None:
+                status_line, _, payload = message
+                status = int(status_line.split(' ', 2)[1])
+                self.stats.request(status, time.perf_counter() - start)
+                return status, payload
+            await self.close()
+            if attempt:
+                raise ConnectionError(f'{self.host}:{self.port} closed the connection')
+
+    async def authenticate(self):
+        user, password, client_id, client_secret = self.credentials
+        form = '&'.join(f'{key}={quote(value)}' for key, value in (
+            ('grant_type', 'password'), ('client_id', client_id), ('client_secret', client_secret),
+            ('username', user), ('password', password), ('scope', 'api')))
+        status, payload = await self.request('POST', '/identity/connect/token', form.encode(),
+                                             'application/x-www-form-urlencoded', auth=False)
+        if status != 200:
+            raise RuntimeError(f'Token request failed with {status}: {payload[:200].decode("utf-8", "replace")}')
+        self.token = json.loads(payload)['access_token']
+
+    async def discover(self):
+        """Pick the newest Default endpoint version, as the login page does."""
+        status, payload = await self.request('GET', '/entity')
+        if status != 200:
+            raise RuntimeError(f'Endpoint discovery failed with {status}')
+        versions = sorted((endpoint['version'] for endpoint in json.loads(payload)['endpoints']
+                           if endpoint['name'] == 'Default'), reverse=True)
+        self.version = versions[0]
+
+    async def lookup(self, code):
+        """Run the lookup chain for one scan; returns 'found', 'not found' or 'error <status>'."""
+        escaped = code.replace("'", "''")
+        for pattern in LOOKUP_FILTERS:
+            path = (f'/entity/Default/{self.version}/StockItem?$filter={quote(pattern.format(escaped))}'
+                    '&$expand=WarehouseDetails')
+            status, payload = await self.request('GET', path)
+            if status == 401:
+                await self.authenticate()
+                status, payload = await self.request('GET', path)
+            if status != 200:
+                return f'error {status}'
+            if json.loads(payload):
+                return 'found'
+        return 'not found'
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+class LoadStats:
+    def __init__(self):
+        self.request_seconds = []
+        self.scan_seconds = []
+        self.statuses = {}
+        self.outcomes = {}
+
+    def request(self, status, seconds):
+        self.request_seconds.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def scan(self, outcome, seconds):
+        self.scan_seconds.append(seconds)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def summary(self, wall):
+        def latency(samples):
+            ordered = sorted(samples)
+            return {f'p{p}_ms': percentile(ordered, p) * 1000 for p in (50, 90, 99)} | {
+                'max_ms': (ordered[-1] if ordered else 0.0) * 1000}
+        return {
+            'wall_s': wall,
+            'scans': len(self.scan_seconds),
+            'requests': len(self.request_seconds),
+            'scans_per_s': len(self.scan_seconds) / wall if wall else 0.0,
+            'requests_per_s': len(self.request_seconds) / wall if wall else 0.0,
+            'scan_latency': latency(self.scan_seconds),
+            'request_latency': latency(self.request_seconds),
+            'outcomes': dict(sorted(self.outcomes.items())),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+        }
+
+async def scanner(client, codes, start, rate, think, stats):
+    """Take scans off the shared iterator until it runs out."""
+    await client.authenticate()
+    await client.discover()
+    for index, code in codes:
+        if rate:
+            scheduled = start + index / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        else:
+            scheduled = time.perf_counter()
+        try:
+            outcome = await client.lookup(code)
+        except (ConnectionError, OSError) as e:
+            outcome = f'error {type(e).__name__}'
+        stats.scan(outcome, time.perf_counter() - scheduled)
+        if think:
+            await asyncio.sleep(think)
+    await client.close()
+
+async def run_load(url, codes, scanners, rate=None, think=0.0, credentials=None):
+    """Replay codes against url with the given number of scanners; returns the summary."""
+    stats = LoadStats()
+    credentials = credentials or (DEFAULT_USERNAME, DEFAULT_PASSWORD, DEFAULT_CLIENT_ID, DEFAULT_CLIENT_SECRET)
+    shared = iter(enumerate(codes))
+    start = time.perf_counter()
+    await asyncio.gather(*(scanner(ScanClient(url, credentials, stats), shared, start, rate, think, stats)
+                           for _ in range(scanners)))
+    return stats.summary(time.perf_counter() - start)
+
+async def run(args, codes):
+    server = None
+    url = args.url
+    if url is None:
+        stub = stub_from_args(args)
+        server = await stub.start('127.0.0.1', 0)
+        url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+    try:
+        return url, await run_load(url, codes, args.scanners, args.rate, args.think / 1000,
+                                   (args.username, args.password, args.client_id, args.client_secret))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+def print_summary(url, summary):
+    print(f"{summary['scans']} scans, {summary['requests']} requests against {url} in {summary['wall_s']:.2f} s")
+    print(f"Throughput: {summary['scans_per_s']:.1f} scans/s, {summary['requests_per_s']:.1f} requests/s")
+    print(f"{'Latency (ms)':<14}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for label, key in (('scan', 'scan_latency'), ('request', 'request_latency')):
+        latency = summary[key]
+        print(f"{label:<14}" + ''.join(f"{latency[name]:>9.2f}" for name in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms')))
+    print('Outcomes: ' + ', '.join(f'{outcome}: {count}' for outcome, count in summary['outcomes'].items()))
+    print('Statuses: ' + ', '.join(f'{status}: {count}' for status, count in summary['statuses'].items()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay barcode scans against the Acumatica lookup path.')
+    parser.add_argument('--url', help='instance to load, e.g. http://127.0.0.1:8765 '
+                                      '(default: an in-process acumatica_stub)')
+    parser.add_argument('--stream', metavar='FILE', help='scan codes, one per line or a CSV with a Barcode '
+                                                          'or InventoryID column (default: synthetic)')
+    parser.add_argument('--scans', type=int, default=5000, help='synthetic scans to replay (default: 5000)')
+    parser.add_argument('--partial-rate', type=float, default=0.05,
+                        help='share of synthetic scans that are partial IDs (default: 0.05)')
+    parser.add_argument('--miss-rate', type=float, default=0.05,
+                        help='share of synthetic scans not in the catalog (default: 0.05)')
+    parser.add_argument('--scanners', type=int, default=8, help='concurrent scanners (default: 8)')
+    parser.add_argument('--rate', type=float, metavar='SCANS_PER_S',
+                        help='open-loop arrival rate across all scanners (default: closed loop)')
+    parser.add_argument('--think', type=float, default=0.0, metavar='MS',
+                        help='pause between a scanner\'s scans in closed loop (default: 0)')
+    parser.add_argument('--username', default=DEFAULT_USERNAME)
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--client-id', default=DEFAULT_CLIENT_ID)
+    parser.add_argument('--client-secret', default=DEFAULT_CLIENT_SECRET)
+    parser.add_argument('--output', metavar='JSON', help='also write the summary to this file')
+    add_stub_arguments(parser.add_argument_group('in-process stand-in (without --url)'))
+    args = parser.parse_args(argv)
+
+    if args.stream:
+        codes = read_stream(args.stream)
+    else:
+        codes = synthetic_stream(args.scans, args.items, args.partial_rate, args.miss_rate, args.seed)
+    if not codes:
+        print('No scans to replay')
+        return 1
+
+    url, summary = asyncio.run(run(args, codes))
+    print_summary(url, summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary | {'url': url, 'scanners': args.scanners, 'rate': args.rate}, f, indent=2)
+        print(f"Summary written to {os.path.relpath(args.output)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,50 @@
 """
 Script to create the Acumatica Inventory Scanner Manual with embedded screenshots.
+The text lives in manual.yaml; see manual_content.py. Besides the .docx it can
+write an HTML page and a PDF (--format html/pdf/all; see manual_html.py and
+manual_pdf.py), and translated builds from the string catalogs in locales/
+(--language; see manual_i18n.py). --trace records where the build time goes
+(see store-assets/samsung/build_trace.py).
+Run: pip install python-docx pillow pyyaml
 """
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
 from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from docx.oxml import OxmlElement, parse_xml
+from lxml import etree
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import argparse
+import hashlib
+import io
+import json
 import os
+import sys
+import time
+
+import docx_tables
+from docx_tables import add_bulk_table
+from image_prep import ImagePreprocessor, add_image_arguments, preprocessor_from_args
+from manual_content import CONTENT_PATH, DEFAULT_LABELS, catalog_sections, csv_table_rows, load_content
+from manual_html import render_html
+from manual_i18n import SOURCE_LANGUAGE, available_languages, catalog_path, load_catalog, localize, write_template
+from manual_pdf import render_pdf
+
+# The build tracer is the asset scripts' build_trace, imported from their folder
+ASSET_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'store-assets', 'samsung')
+if os.path.abspath(ASSET_SCRIPTS_DIR) not in map(os.path.abspath, sys.path):
+    sys.path.append(ASSET_SCRIPTS_DIR)
+import build_trace
+from build_trace import add_trace_argument, span
 
 # Path to images
 IMAGES_DIR = os.path.join(os.path.dirname(__file__), 'images')
 
+# Rendered sections are cached here
+FRAGMENT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.manual-cache')
+
 def add_heading_style(doc):
     """Add custom heading styles"""
     pass  # Use default styles
@@ -28,12 +61,12 @@ def set_cell_shading(cell, color):
     shading.set(qn('w:fill'), color)
     cell._tc.get_or_add_tcPr().append(shading)
 
-def add_step_box(doc, step_num, text):
+def add_step_box(doc, step_num, text, label=DEFAULT_LABELS['step']):
     """Add a styled step box"""
     table = doc.add_table(rows=1, cols=1)
     table.autofit = True
     cell = table.cell(0, 0)
-    cell.text = f"Step {step_num}: {text}"
+    cell.text = label.format(number=step_num, text=text)
     set_cell_shading(cell, 'E0F7FA')  # Light cyan
     paragraph = cell.paragraphs[0]
     run = paragraph.runs[0]
@@ -41,9 +74,12 @@ def add_step_box(doc, step_num, text):
     run.font.size = Pt(11)
     doc.add_paragraph()  # spacing
 
-def add_image_with_caption(doc, image_path, caption, width=5.5):
-    """Add an image with caption"""
+def add_image_with_caption(doc, image_path, caption, width=5.5, preprocessor=None,
+                           missing_label=DEFAULT_LABELS['image_not_found']):
+    """Add an image with caption, resized and recompressed by the preprocessor if given"""
     if os.path.exists(image_path):
+        if preprocessor is not None:
+            image_path = preprocessor.prepare(image_path, width).path
         doc.add_picture(image_path, width=Inches(width))
         last_paragraph = doc.paragraphs[-1]
         last_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
@@ -56,318 +92,430 @@ def add_image_with_caption(doc, image_path, caption, width=5.5):
         run.font.size = Pt(10)
         run.font.color.rgb = RGBColor(100, 100, 100)
     else:
-        p = doc.add_paragraph(f"[Image not found: {image_path}]")
+        p = doc.add_paragraph(missing_label.format(path=image_path))
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
     doc.add_paragraph()  # spacing
 
-def create_manual():
-    doc = Document()
-    
-    # Title
-    title = doc.add_heading('Acumatica Inventory Scanner', 0)
+# ---------------------------------------------------------------------------
+# Blocks: one function per manual.yaml block type
+# ---------------------------------------------------------------------------
+
+class RenderState:
+    """Per-section state shared by the block renderers."""
+
+    def __init__(self, figure_paths, labels=DEFAULT_LABELS):
+        self.figure_paths = figure_paths
+        self.labels = labels
+        self.step = 0
+
+def add_title(doc, text, state):
+    title = doc.add_heading(text, 0)
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
+
+def add_subtitle(doc, text, state):
     subtitle = doc.add_paragraph()
     subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = subtitle.add_run('User Manual')
+    run = subtitle.add_run(text)
     run.font.size = Pt(18)
     run.font.color.rgb = RGBColor(0, 128, 128)
-    
-    doc.add_paragraph()
-    
+
+def add_byline(doc, text, state):
     company = doc.add_paragraph()
     company.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = company.add_run('Developed by AcuPower LTD')
+    run = company.add_run(text)
     run.font.size = Pt(12)
     run.italic = True
-    
-    doc.add_page_break()
-    
-    # Table of Contents
-    doc.add_heading('Table of Contents', level=1)
-    toc_items = [
-        '1. Introduction',
-        '2. Prerequisites',
-        '3. Acumatica Configuration',
-        '   3.1. Navigating to Connected Applications',
-        '   3.2. Creating an OAuth Application',
-        '   3.3. Adding a Client Secret',
-        '   3.4. Saving Your Credentials',
-        '4. Using the Mobile App',
-        '5. Troubleshooting',
-    ]
-    for item in toc_items:
-        doc.add_paragraph(item)
-    
-    doc.add_page_break()
-    
-    # Section 1: Introduction
-    doc.add_heading('1. Introduction', level=1)
-    doc.add_paragraph(
-        'The Acumatica Inventory Scanner is a modern mobile barcode scanning application '
-        'designed for Acumatica ERP inventory management. Built with .NET MAUI, it provides '
-        'cross-platform deployment on Android and iOS devices.'
-    )
-    doc.add_paragraph()
-    doc.add_paragraph('Key Features:')
-    features = [
-        'Real-time Barcode Scanning - Fast camera-based barcode detection',
-        'Inventory Lookup - Instantly search and view stock item details',
-        'OAuth 2.0 Authentication - Secure API access to Acumatica',
-        'Settings Persistence - Save credentials for quick re-login',
-        'Modern Dark Theme - Industrial-inspired UI design',
-        'Cross-Platform - Works on Android and iOS',
-    ]
-    for feature in features:
-        doc.add_paragraph(f'• {feature}')
-    
-    doc.add_page_break()
-    
-    # Section 2: Prerequisites
-    doc.add_heading('2. Prerequisites', level=1)
-    doc.add_paragraph('Before using this app, ensure you have:')
-    prereqs = [
-        'Acumatica ERP Instance (version 20.2 or later)',
-        'User Account with API access permissions',
-        'OAuth Connected Application configured in Acumatica',
-    ]
-    for i, prereq in enumerate(prereqs, 1):
-        doc.add_paragraph(f'{i}. {prereq}')
-    
-    doc.add_page_break()
-    
-    # Section 3: Acumatica Configuration
-    doc.add_heading('3. Acumatica Configuration', level=1)
-    doc.add_paragraph(
-        'This section guides you through configuring Acumatica to allow the mobile app '
-        'to connect using OAuth 2.0 authentication.'
-    )
-    
-    # 3.1 Navigating to Connected Applications
-    doc.add_heading('3.1. Navigating to Connected Applications', level=2)
-    
-    add_step_box(doc, 1, 'Log in to your Acumatica instance as an administrator.')
-    add_image_with_caption(doc, 
-        os.path.join(IMAGES_DIR, '01-login-page.png'),
-        'Figure 1: Acumatica Login Page - Enter your administrator credentials')
-    
-    add_step_box(doc, 2, 'Click on "More Items" in the left navigation menu.')
-    add_image_with_caption(doc,
-        os.path.join(IMAGES_DIR, '02-navigation-menu.png'),
-        'Figure 2: Main Navigation Menu - The "More Items" option is at the bottom of the left sidebar')
-    
-    add_step_box(doc, 3, 'Select "Integration" from the expanded menu.')
-    add_image_with_caption(doc,
-        os.path.join(IMAGES_DIR, '03-integration-menu.png'),
-        'Figure 3: Integration Menu - Shows various integration options')
-    
-    add_step_box(doc, 4, 'Click on "Connected Applications" under Preferences.')
-    add_image_with_caption(doc,
-        os.path.join(IMAGES_DIR, '04-integration-full-menu.png'),
-        'Figure 4: Full Integration Menu - Connected Applications is under Preferences')
-    
-    doc.add_page_break()
-    
-    # 3.2 Creating an OAuth Application
-    doc.add_heading('3.2. Creating an OAuth Application', level=2)
-    
-    add_step_box(doc, 1, 'In the Connected Applications screen, click the "+" button to create a new record.')
-    add_image_with_caption(doc,
-        os.path.join(IMAGES_DIR, '05-connected-applications.png'),
-        'Figure 5: Connected Applications Screen - Click "+" to add a new application')
-    
-    doc.add_paragraph('Fill in the following fields:')
-    
-    # Create a table for the fields
-    table = doc.add_table(rows=5, cols=2)
-    table.style = 'Table Grid'
-    
-    headers = ['Field', 'Value']
-    rows_data = [
-        ('Client Name', 'InventoryScanner (or your preferred name)'),
-        ('Active', 'Checked ✓'),
-        ('Flow', 'Resource Owner Password Credentials'),
-        ('Plug-In', 'No Plug-In'),
-    ]
-    
-    # Header row
-    for i, header in enumerate(headers):
-        cell = table.rows[0].cells[i]
-        cell.text = header
-        set_cell_shading(cell, '008080')
-        run = cell.paragraphs[0].runs[0]
-        run.bold = True
-        run.font.color.rgb = RGBColor(255, 255, 255)
-    
-    # Data rows
-    for i, (field, value) in enumerate(rows_data, 1):
-        table.rows[i].cells[0].text = field
-        table.rows[i].cells[1].text = value
-    
-    doc.add_paragraph()
-    add_image_with_caption(doc,
-        os.path.join(IMAGES_DIR, 'step2-create-app.png'),
-        'Figure 6: Creating the InventoryScanner OAuth Application')
-    
-    doc.add_page_break()
-    
-    # 3.3 Adding a Client Secret
-    doc.add_heading('3.3. Adding a Client Secret', level=2)
-    
-    add_step_box(doc, 1, 'Click on the "SECRETS" tab in the Connected Applications form.')
-    add_step_box(doc, 2, 'Click "ADD SHARED SECRET" button.')
-    add_step_box(doc, 3, 'Enter a description (e.g., "Mobile App Secret").')
-    
-    doc.add_paragraph()
+
+def add_heading(doc, value, state):
+    doc.add_heading(value['text'], level=value['level'])
+    state.step = 0  # step boxes are numbered per heading
+
+def add_lines(doc, lines, state):
+    for line in lines:
+        doc.add_paragraph(line)
+
+def add_bullets(doc, items, state):
+    for item in items:
+        doc.add_paragraph(f'• {item}')
+
+def add_numbered(doc, items, state):
+    for i, item in enumerate(items, 1):
+        doc.add_paragraph(f'{i}. {item}')
+
+def add_step(doc, text, state):
+    state.step += 1
+    add_step_box(doc, state.step, text, state.labels['step'])
+
+def add_figure(doc, figure, state):
+    add_image_with_caption(doc, state.figure_paths[figure['image']], figure['caption'], figure.get('width', 5.5),
+                           missing_label=state.labels['image_not_found'])
+
+def add_table(doc, table_spec, state):
+    """Add a grid table whose first row is shaded as a header"""
+    add_bulk_table(doc, table_spec['header'], table_spec['rows'])
+
+def add_csv_table(doc, table_spec, state):
+    """Add a grid table of the chosen CSV columns, streamed from the file"""
+    add_bulk_table(doc, table_spec['columns'], csv_table_rows(table_spec))
+
+def add_callout(doc, callout, state):
     p = doc.add_paragraph()
-    run = p.add_run('⚠️ IMPORTANT: ')
+    run = p.add_run(callout['label'])
     run.bold = True
     run.font.color.rgb = RGBColor(200, 0, 0)
-    run = p.add_run('Copy and save the generated secret value immediately! The secret is only shown once and cannot be retrieved later.')
-    
-    doc.add_paragraph()
-    add_image_with_caption(doc,
-        os.path.join(IMAGES_DIR, 'step3-add-secret.png'),
-        'Figure 7: Adding a Shared Secret - Note the masked value in the Secrets grid')
-    
-    doc.add_page_break()
-    
-    # 3.4 Saving Your Credentials
-    doc.add_heading('3.4. Saving Your Credentials', level=2)
-    
-    add_step_box(doc, 1, 'Press Ctrl+S to save the Connected Application.')
-    add_step_box(doc, 2, 'Note down the following values for the mobile app:')
-    
-    doc.add_paragraph()
-    table = doc.add_table(rows=3, cols=2)
-    table.style = 'Table Grid'
-    
-    cred_data = [
-        ('Credential', 'Example'),
-        ('Client ID', 'C6ECE655-8FE3-5C1F-C7C8-3309E724BA61@Company'),
-        ('Client Secret', '(The value you copied when creating the secret)'),
-    ]
-    
-    for i, (field, value) in enumerate(cred_data):
-        table.rows[i].cells[0].text = field
-        table.rows[i].cells[1].text = value
-        if i == 0:
-            set_cell_shading(table.rows[i].cells[0], '008080')
-            set_cell_shading(table.rows[i].cells[1], '008080')
-            for cell in table.rows[i].cells:
-                run = cell.paragraphs[0].runs[0]
-                run.bold = True
-                run.font.color.rgb = RGBColor(255, 255, 255)
-    
-    doc.add_paragraph()
-    add_image_with_caption(doc,
-        os.path.join(IMAGES_DIR, 'step4-credentials.png'),
-        'Figure 8: Completed OAuth Application with Client ID and Secret configured')
-    
-    doc.add_page_break()
-    
-    # Section 4: Using the Mobile App
-    doc.add_heading('4. Using the Mobile App', level=1)
-    
-    doc.add_heading('4.1. First Launch Setup', level=2)
-    doc.add_paragraph('When you first open the app, you need to configure the connection settings:')
-    
-    table = doc.add_table(rows=8, cols=3)
-    table.style = 'Table Grid'
-    
-    app_fields = [
-        ('Field', 'Description', 'Example'),
-        ('Instance URL', 'Your Acumatica site URL', 'https://mycompany.acumatica.com/MySite'),
-        ('Username', 'Your Acumatica username', 'admin'),
-        ('Password', 'Your Acumatica password', '****'),
-        ('Tenant', 'Optional - leave empty for single-tenant', ''),
-        ('API Version', 'From the /entity endpoint', '24.200.001'),
-        ('Client ID', 'OAuth Client ID from Step 3.4', 'GUID@Company'),
-        ('Client Secret', 'OAuth Secret from Step 3.3', 'your-secret-key'),
-    ]
-    
-    for i, row_data in enumerate(app_fields):
-        for j, cell_text in enumerate(row_data):
-            table.rows[i].cells[j].text = cell_text
-            if i == 0:
-                set_cell_shading(table.rows[i].cells[j], '008080')
-                run = table.rows[i].cells[j].paragraphs[0].runs[0]
-                run.bold = True
-                run.font.color.rgb = RGBColor(255, 255, 255)
-    
+    p.add_run(callout['text'])
+
+def add_issue(doc, issue, state):
+    p = doc.add_paragraph()
+    run = p.add_run(issue['title'])
+    run.bold = True
+    run.font.size = Pt(12)
+    add_bullets(doc, issue['solutions'], state)
     doc.add_paragraph()
-    
-    doc.add_heading('4.2. Scanning Barcodes', level=2)
-    doc.add_paragraph('To scan inventory items:')
-    steps = [
-        'Point the camera at a barcode - Position it within the scanning frame',
-        'Hold steady - The red scanning line indicates the detection area',
-        'Automatic detection - The barcode is recognized and searched automatically',
-    ]
-    for i, step in enumerate(steps, 1):
-        doc.add_paragraph(f'{i}. {step}')
-    
-    doc.add_heading('4.3. Search Results', level=2)
-    doc.add_paragraph('After scanning, the app displays:')
-    results = [
-        'Item ID - Acumatica Inventory ID',
-        'Description - Item description',
-        'Availability - Current stock levels',
-        'Warehouse Location - Where the item is stored',
-    ]
-    for result in results:
-        doc.add_paragraph(f'• {result}')
-    
-    doc.add_page_break()
-    
-    # Section 5: Troubleshooting
-    doc.add_heading('5. Troubleshooting', level=1)
-    
-    issues = [
-        ('"401 Unauthorized" Error', [
-            'OAuth credentials may be incorrect or expired',
-            'Verify Client ID and Secret in Acumatica',
-            'Check that the Connected Application is Active',
-        ]),
-        ('"404 Not Found" Error', [
-            'API version mismatch',
-            'The endpoint uses StockItem, not InventoryItem',
-            'Try a different API version from the /entity endpoint',
-        ]),
-        ('"Connection Failed"', [
-            'Check network connectivity',
-            'Verify the instance URL is correct',
-            'Ensure no VPN or firewall is blocking access',
-        ]),
-        ('Scanner Not Detecting', [
-            'Ensure camera permissions are granted',
-            'Hold device steady with good lighting',
-            'Barcode must be within the scanning frame',
-        ]),
-    ]
-    
-    for issue_title, solutions in issues:
-        p = doc.add_paragraph()
-        run = p.add_run(issue_title)
-        run.bold = True
-        run.font.size = Pt(12)
-        
-        for solution in solutions:
-            doc.add_paragraph(f'• {solution}')
-        doc.add_paragraph()
-    
-    # Footer
-    doc.add_page_break()
-    doc.add_heading('Support', level=1)
-    doc.add_paragraph('Created by AcuPower LTD')
-    doc.add_paragraph('Website: https://acupowererp.com')
-    doc.add_paragraph('Email: support@acupowererp.com')
-    
-    # Save the document
-    output_path = os.path.join(os.path.dirname(__file__), 'Acumatica_Inventory_Scanner_Manual.docx')
-    doc.save(output_path)
-    print(f'Manual created successfully: {output_path}')
+
+BLOCK_RENDERERS = {
+    'title': add_title,
+    'subtitle': add_subtitle,
+    'byline': add_byline,
+    'heading': add_heading,
+    'paragraph': lambda doc, text, state: doc.add_paragraph(text),
+    'lines': add_lines,
+    'bullets': add_bullets,
+    'numbered': add_numbered,
+    'step': add_step,
+    'figure': add_figure,
+    'table': add_table,
+    'csv_table': add_csv_table,
+    'callout': add_callout,
+    'issue': add_issue,
+    'spacer': lambda doc, value, state: doc.add_paragraph(),
+    'page_break': lambda doc, value, state: doc.add_page_break(),
+}
+
+def render_section(doc, section, figure_paths, labels=DEFAULT_LABELS):
+    """Append one section's blocks to the document"""
+    state = RenderState(figure_paths, labels)
+    for kind, value in section.blocks:
+        BLOCK_RENDERERS[kind](doc, value, state)
+
+# ---------------------------------------------------------------------------
+# Section fragments: rendered body XML cached per section
+# ---------------------------------------------------------------------------
+
+class FragmentCache:
+    """Rendered body elements of each section, keyed by a hash of its inputs.
+
+    A fragment stores the section's top-level body XML plus the images its
+    pictures point to, in document order, so it can be appended to a new
+    document without running the block renderers again.
+    """
+
+    def __init__(self, cache_dir=FRAGMENT_CACHE_DIR, force=False):
+        self.cache_dir = cache_dir
+        self.force = force
+        self.fresh = set()  # keys stored by this build, reused even with force
+        self.memory = {}  # key -> fragment, so a long-lived process skips the disk
+        self.used = set()
+        self.renderer = file_digest(__file__) + file_digest(docx_tables.__file__)
+
+    def key(self, section, figure_paths, labels=DEFAULT_LABELS):
+        """Key a section by its content and labels, the renderer code and its image and CSV files."""
+        images = [file_digest(path) if os.path.exists(path) else None
+                  for path in (figure_paths[figure['image']] for figure in section.figures())]
+        data = [file_digest(path) for path in section.data_files()]
+        labels = {name: labels[name] for name in section.label_keys()}
+        payload = json.dumps([section.digest(), self.renderer, images, data, labels], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load(self, key):
+        """Return the cached fragment for key, or None."""
+        if self.force and key not in self.fresh:
+            return None
+        fragment = self.memory.get(key)
+        if fragment is None:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    fragment = json.load(f)
+            except (OSError, ValueError):
+                return None
+        if not all(os.path.exists(path) for path in fragment['images']):
+            return None
+        self.memory[key] = fragment
+        self.used.add(key)
+        return fragment
+
+    def store(self, key, fragment):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Per-process temp name: workers building other languages may store the same key
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(fragment, f)
+        os.replace(tmp_path, self._path(key))
+        self.fresh.add(key)
+        self.memory[key] = fragment
+        self.used.add(key)
+
+    def trim(self):
+        """Drop in-memory fragments not loaded or stored since the last trim."""
+        self.memory = {key: fragment for key, fragment in self.memory.items() if key in self.used}
+        self.used = set()
+
+# path -> (size, mtime_ns, digest); files are only hashed again once they change
+_digests = {}
+
+def file_digest(path):
+    st = os.stat(path)
+    known = _digests.get(path)
+    if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+        return known[2]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _digests[path] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+def capture_fragment(elements, figure_paths, section):
+    """Serialize freshly rendered body elements as a fragment."""
+    return {
+        'elements': [etree.tostring(element, encoding='unicode') for element in elements],
+        'images': [path for path in (figure_paths[figure['image']] for figure in section.figures())
+                   if os.path.exists(path)],
+    }
+
+def append_fragment(doc, fragment):
+    """Append a cached fragment's elements, re-linking its pictures to this document."""
+    sect_pr = doc.element.body.sectPr
+    images = iter(fragment['images'])
+    for xml in fragment['elements']:
+        element = parse_xml(xml)
+        for blip in element.xpath('.//a:blip'):
+            r_id, _ = doc.part.get_or_add_image(next(images))
+            blip.set(qn('r:embed'), r_id)
+        sect_pr.addprevious(element)
+
+def renumber_pictures(doc):
+    """Give every drawing a unique id; restored fragments may repeat them."""
+    doc_prs = doc.element.body.xpath('.//wp:docPr')
+    if len({doc_pr.get('id') for doc_pr in doc_prs}) < len(doc_prs):
+        for i, doc_pr in enumerate(doc_prs, 1):
+            doc_pr.set('id', str(i))
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def resolve_figures(sections, preprocessor):
+    """Map each figure's image name to the file to embed, preprocessing it once"""
+    figure_paths = {}
+    for section in sections:
+        for figure in section.figures():
+            name = figure['image']
+            if name in figure_paths:
+                continue
+            path = os.path.join(IMAGES_DIR, name)
+            if preprocessor is not None and os.path.exists(path):
+                with span('figure', image=name):
+                    path = preprocessor.prepare(path, figure.get('width', 5.5)).path
+            figure_paths[name] = path
+    return figure_paths
+
+def build_document(sections, figure_paths, fragments=None, labels=DEFAULT_LABELS):
+    """Render the sections into a new Document, reusing cached fragments.
+
+    Returns (doc, rendered_count).
+    """
+    doc = Document()
+    body = doc.element.body
+    rendered = 0
+    for section in sections:
+        key = fragments.key(section, figure_paths, labels) if fragments else None
+        fragment = fragments.load(key) if fragments else None
+        if fragment is not None:
+            with span('section', id=section.id, cached=True):
+                append_fragment(doc, fragment)
+            continue
+        with span('section', id=section.id, cached=False):
+            start = len(body) - 1  # sectPr stays last
+            render_section(doc, section, figure_paths, labels)
+            rendered += 1
+            if fragments:
+                fragments.store(key, capture_fragment(body[start:-1], figure_paths, section))
+    renumber_pictures(doc)
+    return doc, rendered
+
+def render_docx(sections, figure_paths, output_path, labels=DEFAULT_LABELS, fragments=None):
+    """Write the sections as a .docx, reusing cached section fragments"""
+    doc, rendered = build_document(sections, figure_paths, fragments, labels)
+    with span('save', path=os.path.basename(output_path)) as s:
+        doc.save(output_path)
+        s.set(bytes=os.path.getsize(output_path))
+    print(f'Sections: {rendered} rendered, {len(sections) - rendered} reused')
     return output_path
 
+RENDERERS = {
+    'docx': render_docx,
+    'html': render_html,
+    'pdf': render_pdf,
+}
+OUTPUT_FORMATS = tuple(RENDERERS)
+
+def _render_captured(job):
+    """Render one output in a worker and return (path, output, seconds, spans)."""
+    fmt, args, kwargs, traced = job
+    output = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(output), build_trace.collect(traced) as spans:
+        with span('output', format=fmt, language=args[3]['language']) as s:
+            path = RENDERERS[fmt](*args, **kwargs)
+            s.set(bytes=os.path.getsize(path))
+    return path, output.getvalue(), time.perf_counter() - start, spans
+
+def render_outputs(jobs, workers=0):
+    """Render (format, args, kwargs) jobs, in a process pool when there are several.
+
+    workers=0 uses one process per output, up to the CPU count. Each job's
+    console output is printed in job order. Returns (path, seconds) per job.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    traced = build_trace.enabled()
+    jobs = [job + (traced,) for job in jobs]
+    if workers <= 1:
+        results = map(_render_captured, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_render_captured, jobs)
+    try:
+        rendered = []
+        for path, output, seconds, spans in results:
+            sys.stdout.write(output)
+            build_trace.merge(spans)
+            rendered.append((path, seconds))
+        return rendered
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def localized_builds(sections, languages):
+    """Return (language, sections, labels) for each language, translating
+    from the string catalogs in locales/."""
+    builds = []
+    for language in languages:
+        if language == SOURCE_LANGUAGE:
+            builds.append((language, sections, DEFAULT_LABELS))
+            continue
+        catalog = load_catalog(language)
+        localized, missing = localize(sections, catalog)
+        if missing:
+            print(f'[{language}] {len(missing)} string(s) missing from {catalog_path(language)}, left in English')
+        builds.append((language, localized, catalog.labels))
+    return builds
+
+def prerender_shared(builds, figure_paths, fragments):
+    """Render once the sections that come out the same in every build.
+
+    They are stored in the fragment cache before the builds fan out, so no
+    worker renders them again. Returns how many were rendered.
+    """
+    shared = [versions[0] for versions in zip(*(sections for _, sections, _ in builds))
+              if len({fragments.key(section, figure_paths, labels)
+                      for section, (_, _, labels) in zip(versions, builds)}) == 1]
+    _, rendered = build_document(shared, figure_paths, fragments, builds[0][2])
+    return rendered
+
+def create_manual(output_path=None, preprocessor=None, raw_images=False, content_path=CONTENT_PATH,
+                  fragments=None, catalog=None, catalog_columns=None, formats=('docx',), workers=0,
+                  languages=(SOURCE_LANGUAGE,)):
+    """Build the manual in each of formats and languages. Screenshots go
+    through preprocessor (default settings if None) unless raw_images is
+    set; sections come from fragments (a FragmentCache, the default one if
+    None) when unchanged. A catalog CSV (a StockItem export) is appended as
+    an item catalog appendix.
+
+    The content is parsed and the screenshots prepared once, and sections
+    that read the same in every language are rendered once; then every
+    (language, format) output is rendered concurrently (see render_outputs).
+    Returns {(language, format): path}. output_path's extension is replaced
+    per format and other languages than English add a _<language> suffix."""
+    if raw_images:
+        preprocessor = None
+    elif preprocessor is None:
+        preprocessor = ImagePreprocessor()
+    if fragments is None:
+        fragments = FragmentCache()
+    
+    sections = load_content(content_path)
+    if catalog:
+        sections += catalog_sections(catalog, catalog_columns)
+    figure_paths = resolve_figures(sections, preprocessor)
+    if preprocessor is not None:
+        preprocessor.report()
+    builds = localized_builds(sections, languages)
+    if 'docx' in formats and len(builds) > 1:
+        print(f'Shared sections: {prerender_shared(builds, figure_paths, fragments)} rendered once for '
+              f'{len(builds)} languages')
+    
+    # Save the documents
+    if output_path is None:
+        output_path = os.path.join(os.path.dirname(__file__), 'Acumatica_Inventory_Scanner_Manual.docx')
+    stem = os.path.splitext(output_path)[0]
+    paths, jobs = {}, []
+    for language, localized, labels in builds:
+        suffix = '' if language == SOURCE_LANGUAGE else f'_{language}'
+        for fmt in formats:
+            path = paths[language, fmt] = f'{stem}{suffix}.{fmt}'
+            jobs.append((fmt, (localized, figure_paths, path, labels),
+                         {'fragments': fragments} if fmt == 'docx' else {}))
+    for path, seconds in render_outputs(jobs, workers):
+        print(f'Manual created successfully: {path} ({os.path.getsize(path):,} B, {seconds:.2f} s)')
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Create the Acumatica Inventory Scanner manual.')
+    parser.add_argument('--output', help='output path; the extension is set per format (default: next to this script)')
+    parser.add_argument('--format', action='append', choices=OUTPUT_FORMATS + ('all',), dest='formats',
+                        help='output format, repeatable (default: docx)')
+    parser.add_argument('--language', action='append', dest='languages',
+                        choices=[SOURCE_LANGUAGE] + available_languages() + ['all'],
+                        help=f'language, repeatable; all builds {SOURCE_LANGUAGE} and every catalog in locales/ '
+                             f'(default: {SOURCE_LANGUAGE})')
+    parser.add_argument('--workers', type=int, default=0, metavar='N',
+                        help='worker processes rendering the outputs, 0 for one per output (default: 0)')
+    parser.add_argument('--content', default=CONTENT_PATH, help='manual content (default: manual.yaml)')
+    parser.add_argument('--force', action='store_true', help='re-render every section')
+    parser.add_argument('--catalog', metavar='CSV', help='append an item catalog from a StockItem CSV export')
+    parser.add_argument('--catalog-columns', metavar='NAMES',
+                        help='comma-separated CSV columns for the catalog (default: InventoryID, Description, '
+                             'ItemClass, BaseUOM and Barcode where present)')
+    parser.add_argument('--extract-strings', metavar='PATH',
+                        help='write a string catalog of the content to translate, then exit')
+    add_image_arguments(parser)
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    
+    if args.extract_strings:
+        sections = load_content(args.content)
+        if args.catalog:
+            sections += catalog_sections(args.catalog)
+        count = write_template(sections, args.extract_strings)
+        print(f'Wrote {count} strings to {args.extract_strings}')
+        return
+    
+    build_trace.start(args.trace)
+    formats = args.formats or ['docx']
+    if 'all' in formats:
+        formats = OUTPUT_FORMATS
+    languages = args.languages or [SOURCE_LANGUAGE]
+    if 'all' in languages:
+        languages = [SOURCE_LANGUAGE] + available_languages()
+    columns = args.catalog_columns.split(',') if args.catalog_columns else None
+    create_manual(args.output, preprocessor_from_args(args), raw_images=args.raw_images,
+                  content_path=args.content, fragments=FragmentCache(force=args.force),
+                  catalog=args.catalog, catalog_columns=columns, formats=tuple(dict.fromkeys(formats)),
+                  workers=args.workers, languages=tuple(dict.fromkeys(languages)))
+    build_trace.finish()
+
 if __name__ == '__main__':
-    create_manual()
+    main()
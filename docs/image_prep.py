@@ -0,0 +1,177 @@
+"""
+Screenshot preprocessing for the manual.
+
+Each image is resized to the pixels it needs at its printed width and the
+target DPI, then recompressed as PNG or JPEG. Results are cached under
+.image-cache/ by a hash of the source bytes and the settings, so unchanged
+screenshots are never processed twice.
+"""
+from dataclasses import dataclass, replace
+from io import BytesIO
+import hashlib
+import json
+import os
+
+from PIL import Image
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.image-cache')
+DEFAULT_DPI = 150
+DEFAULT_FORMAT = 'jpeg'
+DEFAULT_QUALITY = 85
+FORMATS = ('png', 'jpeg', 'auto')
+
+# Bump when the processing below changes, to invalidate cached results
+PREP_VERSION = 1
+
+@dataclass
+class PreparedImage:
+    """A processed screenshot ready to embed."""
+    source: str
+    path: str
+    source_bytes: int
+    bytes: int
+    source_size: tuple
+    size: tuple
+    format: str
+    cached: bool
+
+    def describe(self):
+        """Return a one-line report of the size saving."""
+        saved = self.source_bytes - self.bytes
+        percent = saved / self.source_bytes * 100 if self.source_bytes else 0
+        return (f"{os.path.basename(self.source)}: {self.source_bytes:,} B -> {self.bytes:,} B "
+                f"(-{percent:.0f}%, {self.source_size[0]}x{self.source_size[1]} -> "
+                f"{self.size[0]}x{self.size[1]} {self.format}{', cached' if self.cached else ''})")
+
+def target_width(source_width, width_in, dpi):
+    """Return the pixel width needed to print at width_in inches; never upscales."""
+    return min(source_width, max(1, round(width_in * dpi)))
+
+def flatten(img):
+    """Return an RGB image, compositing any transparency onto white."""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+def encode(img, fmt, quality):
+    """Encode img as PNG or JPEG (or the smaller of both). Returns (bytes, format)."""
+    if fmt == 'auto':
+        return min((encode(img, f, quality) for f in ('png', 'jpeg')), key=lambda result: len(result[0]))
+    buf = BytesIO()
+    if fmt == 'jpeg':
+        flatten(img).save(buf, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buf, 'PNG', optimize=True)
+    return buf.getvalue(), fmt
+
+class ImagePreprocessor:
+    """Resizes and recompresses images for embedding, caching by content hash."""
+
+    def __init__(self, dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT, quality=DEFAULT_QUALITY, cache_dir=DEFAULT_CACHE_DIR):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown image format: {fmt}")
+        self.dpi = dpi
+        self.fmt = fmt
+        self.quality = quality
+        self.cache_dir = cache_dir
+        self.prepared = []
+        self._known = {}  # (path, width_in) -> (size, mtime_ns, PreparedImage)
+
+    def _key(self, data, width_in):
+        settings = json.dumps({
+            'width_in': width_in,
+            'dpi': self.dpi,
+            'format': self.fmt,
+            'quality': self.quality,
+            'version': PREP_VERSION,
+        }, sort_keys=True)
+        return hashlib.sha256(data + settings.encode('utf-8')).hexdigest()
+
+    def prepare(self, image_path, width_in):
+        """Return the PreparedImage for image_path shown at width_in inches.
+
+        An image already prepared by this instance is not read again until
+        its size or modification time changes.
+        """
+        st = os.stat(image_path)
+        known = self._known.get((image_path, width_in))
+        if known is not None and known[:2] == (st.st_size, st.st_mtime_ns) and os.path.exists(known[2].path):
+            prepared = replace(known[2], cached=True)
+            self.prepared.append(prepared)
+            return prepared
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        key = self._key(data, width_in)
+        meta_path = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            path = os.path.join(self.cache_dir, meta['file'])
+            cached = os.path.exists(path)
+        except (OSError, ValueError, KeyError):
+            cached = False
+
+        if not cached:
+            with Image.open(BytesIO(data)) as img:
+                img.load()
+                source_size = img.size
+                width = target_width(img.width, width_in, self.dpi)
+                if width < img.width:
+                    height = max(1, round(img.height * width / img.width))
+                    img = img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+                encoded, fmt = encode(img, self.fmt, self.quality)
+                size = img.size
+            meta = {
+                'file': f"{key}.{'jpg' if fmt == 'jpeg' else 'png'}",
+                'format': fmt,
+                'source_size': source_size,
+                'size': size,
+            }
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, meta['file'])
+            # Per-process temp names: concurrent manual builds may prepare the same image
+            suffix = f".{os.getpid()}.tmp"
+            with open(path + suffix, 'wb') as f:
+                f.write(encoded)
+            os.replace(path + suffix, path)
+            # Metadata last, so an interrupted write is just a cache miss
+            with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(meta_path + suffix, meta_path)
+
+        prepared = PreparedImage(image_path, path, len(data), os.path.getsize(path),
+                                 tuple(meta['source_size']), tuple(meta['size']), meta['format'], cached)
+        self._known[image_path, width_in] = (st.st_size, st.st_mtime_ns, prepared)
+        self.prepared.append(prepared)
+        return prepared
+
+    def report(self):
+        """Print per-image and total savings for everything prepared so far."""
+        for prepared in self.prepared:
+            print(f"[IMG] {prepared.describe()}")
+        before = sum(p.source_bytes for p in self.prepared)
+        after = sum(p.bytes for p in self.prepared)
+        cached = sum(p.cached for p in self.prepared)
+        if before:
+            print(f"[IMG] Total: {before:,} B -> {after:,} B, saved {before - after:,} B "
+                  f"({(before - after) / before * 100:.0f}%), {cached}/{len(self.prepared)} cached")
+
+def add_image_arguments(parser):
+    """Add the screenshot preprocessing options to a parser."""
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI,
+                        help=f'target resolution at the printed width (default: {DEFAULT_DPI})')
+    parser.add_argument('--image-format', choices=FORMATS, default=DEFAULT_FORMAT,
+                        help=f'format for embedded screenshots (default: {DEFAULT_FORMAT})')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY,
+                        help=f'JPEG quality (default: {DEFAULT_QUALITY})')
+    parser.add_argument('--image-cache', default=DEFAULT_CACHE_DIR, metavar='DIR',
+                        help='where processed screenshots are cached (default: docs/.image-cache)')
+    parser.add_argument('--raw-images', action='store_true',
+                        help='embed the original screenshots unchanged')
+
+def preprocessor_from_args(args):
+    """Build an ImagePreprocessor from parsed arguments."""
+    return ImagePreprocessor(args.dpi, args.image_format, args.quality, args.image_cache)
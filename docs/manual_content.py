@@ -0,0 +1,127 @@
+"""
+Structured content for the manual.
+
+manual.yaml lists the manual's sections; each section is a list of blocks
+(headings, paragraphs, step boxes, figures, tables...). load_content() parses
+and checks it once, and every output is rendered from the result.
+"""
+from dataclasses import dataclass
+import csv
+import hashlib
+import json
+import os
+
+import yaml
+
+CONTENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manual.yaml')
+
+# Block types without content, written as a bare name in the YAML
+EMPTY_BLOCKS = ('spacer', 'page_break')
+BLOCK_TYPES = EMPTY_BLOCKS + ('title', 'subtitle', 'byline', 'heading', 'paragraph', 'lines', 'bullets',
+                              'numbered', 'step', 'figure', 'table', 'csv_table', 'callout', 'issue')
+
+# Text the renderers add around the content; string catalogs translate these
+# too (see manual_i18n.py)
+DEFAULT_LABELS = {
+    'language': 'en',
+    'step': 'Step {number}: {text}',
+    'image_not_found': '[Image not found: {path}]',
+}
+
+# Block type -> the label it is drawn with
+LABEL_BLOCKS = {'step': 'step', 'figure': 'image_not_found'}
+
+# Columns the item catalog appendix shows when a StockItem export has them
+CATALOG_COLUMNS = ('InventoryID', 'Description', 'ItemClass', 'BaseUOM', 'Barcode')
+
+@dataclass(frozen=True)
+class Section:
+    """One cacheable part of the manual."""
+    id: str
+    blocks: tuple
+
+    def digest(self):
+        """Return a hash of the section's content."""
+        payload = json.dumps([self.id, self.blocks], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def label_keys(self):
+        """Return the DEFAULT_LABELS keys the section's blocks are drawn with."""
+        return sorted({LABEL_BLOCKS[kind] for kind, _ in self.blocks if kind in LABEL_BLOCKS})
+
+    def figures(self):
+        """Return the figure blocks' content, in order."""
+        return [value for kind, value in self.blocks if kind == 'figure']
+
+    def data_files(self):
+        """Return the paths of the CSV files the section's tables read."""
+        return [value['path'] for kind, value in self.blocks if kind == 'csv_table']
+
+def parse_block(section_id, block):
+    """Return (type, value) for one YAML block."""
+    if isinstance(block, str):
+        kind, value = block, None
+    elif isinstance(block, dict) and len(block) == 1:
+        (kind, value), = block.items()
+    else:
+        raise ValueError(f"Section '{section_id}': a block must be a name or a one-key mapping, got {block!r}")
+    if kind not in BLOCK_TYPES:
+        raise ValueError(f"Section '{section_id}': unknown block type '{kind}'")
+    if (value is None) != (kind in EMPTY_BLOCKS):
+        raise ValueError(f"Section '{section_id}': block '{kind}' has the wrong content")
+    return kind, value
+
+def load_content(path=CONTENT_PATH):
+    """Parse the manual content into a tuple of Sections."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    sections = []
+    seen = set()
+    for entry in data['sections']:
+        section_id = entry['id']
+        if section_id in seen:
+            raise ValueError(f"Duplicate section id: {section_id}")
+        seen.add(section_id)
+        blocks = [parse_block(section_id, block) for block in entry['blocks']]
+        # CSV paths are relative to the content file
+        blocks = [(kind, dict(value, path=os.path.join(base_dir, value['path'])) if kind == 'csv_table' else value)
+                  for kind, value in blocks]
+        sections.append(Section(section_id, tuple(blocks)))
+    return tuple(sections)
+
+def catalog_sections(csv_path, columns=None):
+    """Return the appendix Sections listing the items of a StockItem CSV export.
+
+    The table is a section of its own: it reads the same in every language,
+    so localized builds render it once. columns defaults to the
+    CATALOG_COLUMNS present in the file, or every column if it has none of
+    them.
+    """
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        available = next(csv.reader(f), [])
+    if columns is None:
+        columns = [name for name in CATALOG_COLUMNS if name in available] or available
+    missing = [name for name in columns if name not in available]
+    if missing:
+        raise ValueError(f"{csv_path} has no column(s) {', '.join(missing)}")
+    return (
+        Section('appendix-catalog', (
+            ('page_break', None),
+            ('heading', {'text': 'Appendix A. Item Catalog', 'level': 1}),
+            ('paragraph', 'Stock items and the barcodes the scanner looks up for them.'),
+        )),
+        Section('appendix-catalog-table', (
+            ('csv_table', {'path': os.path.abspath(csv_path), 'columns': list(columns)}),
+        )),
+    )
+
+def csv_table_rows(table_spec):
+    """Yield the chosen columns of each row of a csv_table block's file."""
+    with open(table_spec['path'], 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        available = next(reader)
+        indices = [available.index(name) for name in table_spec['columns']]
+        for row in reader:
+            if row:
+                yield [row[i] if i < len(row) else None for i in indices]
@@ -0,0 +1,140 @@
+"""
+HTML output for the manual.
+
+Renders the sections parsed from manual.yaml into one self-contained web
+page: the (preprocessed) screenshots are embedded as data URIs and the
+styling is inline, so the file can be uploaded or mailed on its own. Page
+breaks become rules on screen and real page breaks when printed.
+"""
+import base64
+import html
+import mimetypes
+import os
+
+from manual_content import DEFAULT_LABELS, csv_table_rows
+
+STYLE = """
+body { font-family: Calibri, "Segoe UI", Helvetica, Arial, sans-serif; font-size: 11pt; color: #000;
+       max-width: 8.5in; margin: 0 auto; padding: 1in; }
+h1.title { font-size: 26pt; color: #17365D; text-align: center; font-weight: normal; }
+h2 { font-size: 14pt; color: #365F91; }
+h3 { font-size: 13pt; color: #4F81BD; }
+p.subtitle { font-size: 18pt; color: #008080; text-align: center; }
+p.byline { font-size: 12pt; font-style: italic; text-align: center; }
+p.issue { font-size: 12pt; font-weight: bold; }
+.spacer { height: 1em; }
+.step { background: #E0F7FA; border: 1px solid #000; padding: 4px 6px; font-weight: bold; margin-bottom: 1em; }
+.callout-label { color: #C80000; font-weight: bold; }
+figure { text-align: center; margin: 0 0 1em 0; }
+figure img { max-width: 100%; height: auto; }
+figcaption { font-size: 10pt; font-style: italic; color: #646464; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #000; padding: 2px 6px; text-align: left; vertical-align: top; }
+th { background: #008080; color: #FFF; }
+hr.page-break { border: 0; border-top: 1px dashed #BBB; margin: 2em 0; }
+@media print { body { padding: 0; } hr.page-break { border: 0; margin: 0; page-break-after: always; } }
+"""
+
+class HtmlState:
+    """Per-section state shared by the block renderers."""
+
+    def __init__(self, figure_paths, images, labels):
+        self.figure_paths = figure_paths
+        self.images = images
+        self.labels = labels
+        self.step = 0
+
+def image_uri(path, images):
+    """Return a data: URI for an image file, encoding each file once."""
+    uri = images.get(path)
+    if uri is None:
+        mime = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        with open(path, 'rb') as f:
+            uri = images[path] = f"data:{mime};base64,{base64.b64encode(f.read()).decode('ascii')}"
+    return uri
+
+def _cells(tag, row):
+    return ''.join(f'<{tag}>{html.escape(text or "")}</{tag}>' for text in row)
+
+def write_table(out, header, rows):
+    out.write(f'<table>\n<thead><tr>{_cells("th", header)}</tr></thead>\n<tbody>\n')
+    for row in rows:
+        out.write(f'<tr>{_cells("td", row)}</tr>\n')
+    out.write('</tbody>\n</table>\n')
+
+def write_heading(out, value, state):
+    level = value['level'] + 1  # h1 is the title
+    out.write(f'<h{level}>{html.escape(value["text"])}</h{level}>\n')
+    state.step = 0
+
+def write_step(out, text, state):
+    state.step += 1
+    text = state.labels['step'].format(number=state.step, text=text)
+    out.write(f'<div class="step">{html.escape(text)}</div>\n')
+
+def write_figure(out, figure, state):
+    path = state.figure_paths[figure['image']]
+    if not os.path.exists(path):
+        text = state.labels['image_not_found'].format(path=path)
+        out.write(f'<p style="text-align: center">{html.escape(text)}</p>\n')
+        return
+    width = figure.get('width', 5.5)
+    out.write(f'<figure><img src="{image_uri(path, state.images)}" style="width: {width}in" '
+              f'alt="{html.escape(figure["caption"])}">\n'
+              f'<figcaption>{html.escape(figure["caption"])}</figcaption></figure>\n')
+
+def write_list(tag):
+    def write(out, items, state):
+        out.write(f'<{tag}>\n' + ''.join(f'<li>{html.escape(item)}</li>\n' for item in items) + f'</{tag}>\n')
+    return write
+
+def write_issue(out, issue, state):
+    out.write(f'<p class="issue">{html.escape(issue["title"])}</p>\n')
+    write_list('ul')(out, issue['solutions'], state)
+
+def write_callout(out, callout, state):
+    out.write(f'<p><span class="callout-label">{html.escape(callout["label"])}</span>'
+              f'{html.escape(callout["text"])}</p>\n')
+
+def write_paragraph(css_class=None):
+    attribute = f' class="{css_class}"' if css_class else ''
+    def write(out, text, state):
+        out.write(f'<p{attribute}>{html.escape(text)}</p>\n')
+    return write
+
+BLOCK_WRITERS = {
+    'title': lambda out, text, state: out.write(f'<h1 class="title">{html.escape(text)}</h1>\n'),
+    'subtitle': write_paragraph('subtitle'),
+    'byline': write_paragraph('byline'),
+    'heading': write_heading,
+    'paragraph': write_paragraph(),
+    # Leading spaces indent the contents entries, so they are kept
+    'lines': lambda out, lines, state: out.write(''.join(
+        f'<p style="white-space: pre-wrap">{html.escape(line)}</p>\n' for line in lines)),
+    'bullets': write_list('ul'),
+    'numbered': write_list('ol'),
+    'step': write_step,
+    'figure': write_figure,
+    'table': lambda out, spec, state: write_table(out, spec['header'], spec['rows']),
+    'csv_table': lambda out, spec, state: write_table(out, spec['columns'], csv_table_rows(spec)),
+    'callout': write_callout,
+    'issue': write_issue,
+    'spacer': lambda out, value, state: out.write('<div class="spacer"></div>\n'),
+    'page_break': lambda out, value, state: out.write('<hr class="page-break">\n'),
+}
+
+def render_html(sections, figure_paths, output_path, labels=DEFAULT_LABELS):
+    """Write the sections as a single HTML page, titled by the first title block."""
+    images = {}
+    title = next((value for section in sections for kind, value in section.blocks if kind == 'title'), '')
+    with open(output_path, 'w', encoding='utf-8') as out:
+        out.write(f'<!DOCTYPE html>\n<html lang="{html.escape(labels["language"])}">\n<head>\n<meta charset="utf-8">\n'
+                  f'<title>{html.escape(title)}</title>\n<style>{STYLE}</style>\n</head>\n<body>\n')
+        for section in sections:
+            out.write(f'<section id="{html.escape(section.id)}">\n')
+            state = HtmlState(figure_paths, images, labels)
+            for kind, value in section.blocks:
+                BLOCK_WRITERS[kind](out, value, state)
+            out.write('</section>\n')
+        out.write('</body>\n</html>\n')
+    return output_path
@@ -0,0 +1,112 @@
+"""
+Localized builds of the manual.
+
+A string catalog (locales/<language>.yaml) maps each English string of
+manual.yaml to its translation, plus the few labels the renderers add
+themselves (step numbers, missing images):
+
+    language: es
+    name: Español
+    labels:
+      step: 'Paso {number}: {text}'
+    strings:
+      User Manual: Manual de usuario
+
+localize() swaps every piece of text in the parsed sections for its
+translation; strings missing from the catalog stay in English and are
+reported. Image names, CSV paths and column names are never translated.
+python create_manual.py --extract-strings locales/xx.yaml writes a catalog
+to start a new language from.
+"""
+from dataclasses import dataclass
+import os
+
+import yaml
+
+from manual_content import DEFAULT_LABELS, Section
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+SOURCE_LANGUAGE = DEFAULT_LABELS['language']
+
+# Keys of mapping blocks whose values are text; the rest (image, width,
+# level, path, columns) are kept as they are
+TEXT_KEYS = ('text', 'caption', 'header', 'rows', 'label', 'title', 'solutions')
+
+@dataclass
+class Catalog:
+    """The translations for one language."""
+    language: str
+    name: str
+    labels: dict
+    strings: dict
+
+def catalog_path(language):
+    return os.path.join(LOCALES_DIR, f"{language}.yaml")
+
+def available_languages():
+    """Return the languages with a catalog in locales/, sorted."""
+    if not os.path.isdir(LOCALES_DIR):
+        return []
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(LOCALES_DIR) if name.endswith('.yaml'))
+
+def load_catalog(language):
+    """Load locales/<language>.yaml."""
+    with open(catalog_path(language), 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f) or {}
+    unknown = set(data.get('labels') or {}) - set(DEFAULT_LABELS)
+    if unknown:
+        raise ValueError(f"{catalog_path(language)}: unknown label(s) {', '.join(sorted(unknown))}")
+    return Catalog(language, data.get('name', language),
+                   dict(DEFAULT_LABELS, **(data.get('labels') or {}), language=language),
+                   {str(key): str(value) for key, value in (data.get('strings') or {}).items()})
+
+def _map_text(value, translate):
+    """Apply translate to every string in a block's content."""
+    if isinstance(value, str):
+        return translate(value)
+    if isinstance(value, list):
+        return [_map_text(item, translate) for item in value]
+    if isinstance(value, dict):
+        return {key: _map_text(item, translate) if key in TEXT_KEYS else item for key, item in value.items()}
+    return value
+
+def localize(sections, catalog):
+    """Return (sections, missing): the sections translated by catalog and the
+    source strings it has no translation for."""
+    missing = set()
+    def translate(text):
+        if not text.strip():
+            return text
+        translated = catalog.strings.get(text)
+        if translated is None:
+            missing.add(text)
+            return text
+        return translated
+    localized = tuple(Section(section.id, tuple((kind, _map_text(value, translate)) for kind, value in section.blocks))
+                      for section in sections)
+    return localized, missing
+
+def source_strings(sections):
+    """Return every translatable string of the sections, in document order."""
+    strings = {}
+    def collect(text):
+        if text.strip():
+            strings.setdefault(text, None)
+        return text
+    for section in sections:
+        for _, value in section.blocks:
+            _map_text(value, collect)
+    return list(strings)
+
+def write_template(sections, path, language=None):
+    """Write a catalog for sections with every string left in English."""
+    language = language or os.path.splitext(os.path.basename(path))[0]
+    template = {
+        'language': language,
+        'name': language,
+        'labels': {key: value for key, value in DEFAULT_LABELS.items() if key != 'language'},
+        'strings': {text: text for text in source_strings(sections)},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(template, f, allow_unicode=True, sort_keys=False, width=120)
+    return len(template['strings'])
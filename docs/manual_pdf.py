@@ -0,0 +1,401 @@
+"""
+PDF output for the manual, written without any PDF library.
+
+PdfWriter assembles the file: pages, the four standard Helvetica fonts
+(WinAnsi encoded, so nothing is embedded) and image XObjects. JPEG
+screenshots, which is what image_prep produces by default, are copied into
+the PDF as they are; anything else is decoded once with Pillow and stored
+Flate compressed. PdfLayout flows the manual's blocks onto US Letter pages
+with the look of the DOCX: word-wrapped text, shaded step boxes, centred
+figures with captions and grid tables that repeat their header after a page
+break.
+
+Characters outside Windows-1252 (emoji, check marks) are dropped, as the
+standard fonts cannot show them.
+"""
+import os
+import re
+import zlib
+
+from PIL import Image
+
+from image_prep import flatten
+from manual_content import DEFAULT_LABELS, csv_table_rows
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, in points
+MARGIN = 72
+CAPTION_ROOM = 30
+
+FONTS = {
+    'regular': ('F1', 'Helvetica'),
+    'bold': ('F2', 'Helvetica-Bold'),
+    'italic': ('F3', 'Helvetica-Oblique'),
+    'bold-italic': ('F4', 'Helvetica-BoldOblique'),
+}
+
+# Advance widths (1/1000 em) of ' ' through '~' from the Helvetica AFM files;
+# the oblique faces share them
+_REGULAR_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+# Widths outside the ASCII table: the bullet, and an average for the rest
+_BULLET_WIDTH = 350
+_DEFAULT_WIDTH = 556
+
+BLACK = (0, 0, 0)
+GRAY = (100, 100, 100)
+TEAL = (0, 128, 128)
+RED = (200, 0, 0)
+WHITE = (255, 255, 255)
+TITLE_COLOR = (23, 54, 93)
+HEADING_COLORS = {1: (54, 95, 145), 2: (79, 129, 189)}
+STEP_FILL = (224, 247, 250)
+HEADER_FILL = TEAL
+
+def encode_text(text):
+    """Return text as Windows-1252 bytes, dropping what the standard fonts lack."""
+    return text.encode('cp1252', 'ignore')
+
+def text_width(data, font, size):
+    """Return the width in points of cp1252-encoded text."""
+    widths = _BOLD_WIDTHS if font.startswith('bold') else _REGULAR_WIDTHS
+    total = 0
+    for byte in data:
+        if 32 <= byte <= 126:
+            total += widths[byte - 32]
+        elif byte == 0x95:
+            total += _BULLET_WIDTH
+        else:
+            total += _DEFAULT_WIDTH
+    return total * size / 1000
+
+def _pdf_string(data):
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def _color(rgb):
+    return ' '.join(f'{c / 255:.3f}' for c in rgb)
+
+# ---------------------------------------------------------------------------
+# File structure
+# ---------------------------------------------------------------------------
+
+class PdfWriter:
+    """Collects PDF objects and writes them out with a cross-reference table."""
+
+    def __init__(self):
+        self.objects = []
+        self.catalog = self.reserve()
+        self.pages_obj = self.reserve()
+        self.resources = self.reserve()
+        self.fonts = {key: self.add(f'<< /Type /Font /Subtype /Type1 /BaseFont /{base} '
+                                    f'/Encoding /WinAnsiEncoding >>'.encode('ascii'))
+                      for key, (_, base) in FONTS.items()}
+        self.images = {}
+        self.pages = []
+
+    def reserve(self):
+        """Allocate an object number to fill in later."""
+        self.objects.append(None)
+        return len(self.objects)
+
+    def add(self, data, number=None):
+        """Store an object's bytes and return its number."""
+        if number is None:
+            number = self.reserve()
+        self.objects[number - 1] = data
+        return number
+
+    def add_stream(self, entries, data, compress=True):
+        if compress:
+            data = zlib.compress(data)
+            entries += ' /Filter /FlateDecode'
+        return self.add(f'<< {entries} /Length {len(data)} >>\nstream\n'.encode('ascii') + data + b'\nendstream')
+
+    def image(self, path):
+        """Return (name, width_px, height_px) for an image XObject, adding each file once."""
+        if path not in self.images:
+            with Image.open(path) as img:
+                size = img.size
+                if img.format == 'JPEG' and img.mode in ('RGB', 'L'):
+                    # Already compressed; PDF readers decode JPEG natively
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    color_space = 'DeviceRGB' if img.mode == 'RGB' else 'DeviceGray'
+                    number = self.add_stream(f'/Type /XObject /Subtype /Image /Width {size[0]} /Height {size[1]} '
+                                             f'/ColorSpace /{color_space} /BitsPerComponent 8 /Filter /DCTDecode',
+                                             data, compress=False)
+                else:
+                    number = self.add_stream(f'/Type /XObject /Subtype /Image /Width {size[0]} /Height {size[1]} '
+                                             f'/ColorSpace /DeviceRGB /BitsPerComponent 8',
+                                             flatten(img).tobytes())
+            self.images[path] = (f'Im{len(self.images) + 1}', number, size)
+        name, _, size = self.images[path]
+        return name, size[0], size[1]
+
+    def add_page(self, content):
+        contents = self.add_stream('', content)
+        self.pages.append(self.add(f'<< /Type /Page /Parent {self.pages_obj} 0 R '
+                                   f'/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+                                   f'/Resources {self.resources} 0 R /Contents {contents} 0 R >>'.encode('ascii')))
+
+    def save(self, output_path):
+        fonts = ' '.join(f'/{FONTS[key][0]} {number} 0 R' for key, number in self.fonts.items())
+        images = ' '.join(f'/{name} {number} 0 R' for name, number, _ in self.images.values())
+        self.add(f'<< /Font << {fonts} >> /XObject << {images} >> >>'.encode('ascii'), self.resources)
+        kids = ' '.join(f'{number} 0 R' for number in self.pages)
+        self.add(f'<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>'.encode('ascii'), self.pages_obj)
+        self.add(f'<< /Type /Catalog /Pages {self.pages_obj} 0 R >>'.encode('ascii'), self.catalog)
+
+        with open(output_path, 'wb') as f:
+            f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+            offsets = []
+            for number, data in enumerate(self.objects, 1):
+                offsets.append(f.tell())
+                f.write(f'{number} 0 obj\n'.encode('ascii') + data + b'\nendobj\n')
+            xref = f.tell()
+            f.write(f'xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n'.encode('ascii'))
+            f.write(''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('ascii'))
+            f.write(f'trailer\n<< /Size {len(self.objects) + 1} /Root {self.catalog} 0 R >>\n'
+                    f'startxref\n{xref}\n%%EOF\n'.encode('ascii'))
+
+# ---------------------------------------------------------------------------
+# Layout
+# ---------------------------------------------------------------------------
+
+# Words with the whitespace before them; a run's trailing whitespace is its
+# own token so it separates the run from the next one
+_TOKENS = re.compile(rb'\s*\S+|\s+$')
+
+def wrap(runs, size, width):
+    """Break runs of (text, font, color) into lines no wider than width.
+
+    Returns a list of (pieces, line_width), where pieces are (bytes, font,
+    color, x) tuples. Whitespace at a line break is dropped; a word wider
+    than the line is split between characters.
+    """
+    lines, line, x = [], [], 0
+    for text, font, color in runs:
+        for token in _TOKENS.findall(encode_text(text)):
+            if not line and lines:
+                token = token.lstrip()
+            token_width = text_width(token, font, size)
+            if line and x + token_width > width:
+                lines.append((line, x))
+                line, x = [], 0
+                token = token.lstrip()
+                token_width = text_width(token, font, size)
+            while len(token) > 1 and x + token_width > width:
+                cut = len(token) - 1
+                while cut > 1 and x + text_width(token[:cut], font, size) > width:
+                    cut -= 1
+                line.append((token[:cut], font, color, x))
+                lines.append((line, x + text_width(token[:cut], font, size)))
+                line, x, token = [], 0, token[cut:]
+                token_width = text_width(token, font, size)
+            if token:
+                line.append((token, font, color, x))
+                x += token_width
+    if line or not lines:
+        lines.append((line, x))
+    return lines
+
+class PdfLayout:
+    """Flows text, boxes, images and tables top to bottom over pages."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.ops = []
+        self.y = PAGE_HEIGHT - MARGIN
+        self.width = PAGE_WIDTH - 2 * MARGIN
+
+    @property
+    def at_top(self):
+        return not self.ops
+
+    def new_page(self):
+        self.writer.add_page('\n'.join(self.ops).encode('latin-1'))
+        self.ops = []
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure(self, height):
+        """Start a new page unless height points fit below the cursor."""
+        if self.y - height < MARGIN and not self.at_top:
+            self.new_page()
+
+    def finish(self):
+        if self.ops or not self.writer.pages:
+            self.new_page()
+
+    def rect(self, x, y, width, height, fill=None, stroke=False):
+        if fill is not None:
+            self.ops.append(f'{_color(fill)} rg {x:.2f} {y:.2f} {width:.2f} {height:.2f} re f')
+        if stroke:
+            self.ops.append(f'0 G 0.5 w {x:.2f} {y:.2f} {width:.2f} {height:.2f} re S')
+
+    def draw_line(self, pieces, x, baseline, size):
+        for data, font, color, offset in pieces:
+            self.ops.append(f'BT /{FONTS[font][0]} {size} Tf {_color(color)} rg {x + offset:.2f} {baseline:.2f} Td '
+                            f'{_pdf_string(data).decode("latin-1")} Tj ET')
+
+    def text(self, runs, size=11, align='left', indent=0, space_after=6, leading=1.25):
+        """Write a paragraph of (text, font, color) runs."""
+        line_height = size * leading
+        width = self.width - indent
+        for pieces, line_width in wrap(runs, size, width):
+            self.ensure(line_height)
+            self.y -= line_height
+            x = MARGIN + indent
+            if align == 'center':
+                x += (width - line_width) / 2
+            self.draw_line(pieces, x, self.y + size * 0.25, size)
+        self.y -= space_after
+
+    def box(self, runs, size, fill, padding=4, space_after=6):
+        """Write text in a shaded, outlined box the width of the page."""
+        lines = wrap(runs, size, self.width - 2 * padding)
+        line_height = size * 1.25
+        height = len(lines) * line_height + 2 * padding
+        self.ensure(height)
+        self.rect(MARGIN, self.y - height, self.width, height, fill=fill, stroke=True)
+        y = self.y - padding
+        for pieces, _ in lines:
+            y -= line_height
+            self.draw_line(pieces, MARGIN + padding, y + size * 0.25, size)
+        self.y -= height + space_after
+
+    def image(self, path, width):
+        """Draw an image centred at width points, scaled down to fit a page."""
+        name, px_width, px_height = self.writer.image(path)
+        height = width * px_height / px_width
+        usable = PAGE_HEIGHT - 2 * MARGIN - CAPTION_ROOM
+        if height > usable:
+            width, height = width * usable / height, usable
+        self.ensure(height + CAPTION_ROOM)  # keep the caption on the same page
+        x = MARGIN + (self.width - width) / 2
+        self.y -= height
+        self.ops.append(f'q {width:.2f} 0 0 {height:.2f} {x:.2f} {self.y:.2f} cm /{name} Do Q')
+        self.y -= 4
+
+    def table(self, header, rows, size=10, padding=3):
+        """Draw a grid table, repeating the shaded header row on each page."""
+        columns = len(header)
+        col_width = self.width / columns
+        line_height = size * 1.2
+
+        def layout_row(row, font, color):
+            cells = [wrap([(text or '', font, color)], size, col_width - 2 * padding) for text in row]
+            cells += [[([], 0)]] * (columns - len(cells))
+            return cells, max(len(lines) for lines in cells) * line_height + 2 * padding
+
+        def draw_row(cells, height, fill=None):
+            for i, lines in enumerate(cells):
+                x = MARGIN + i * col_width
+                self.rect(x, self.y - height, col_width, height, fill=fill, stroke=True)
+                y = self.y - padding
+                for pieces, _ in lines:
+                    y -= line_height
+                    self.draw_line(pieces, x + padding, y + size * 0.25, size)
+            self.y -= height
+
+        head = layout_row(header, 'bold', WHITE)
+        self.ensure(head[1] * 2)
+        draw_row(*head, fill=HEADER_FILL)
+        for row in rows:
+            cells, height = layout_row(row, 'regular', BLACK)
+            if self.y - height < MARGIN:
+                self.new_page()
+                draw_row(*head, fill=HEADER_FILL)
+            draw_row(cells, height)
+        self.y -= 6
+
+# ---------------------------------------------------------------------------
+# Blocks
+# ---------------------------------------------------------------------------
+
+class PdfState:
+    """Per-section state shared by the block renderers."""
+
+    def __init__(self, figure_paths, labels):
+        self.figure_paths = figure_paths
+        self.labels = labels
+        self.step = 0
+
+def draw_heading(layout, value, state):
+    size = 14 if value['level'] == 1 else 13
+    layout.ensure(size * 4)  # keep a heading with what follows
+    layout.y -= 12
+    layout.text([(value['text'], 'bold', HEADING_COLORS.get(value['level'], BLACK))], size, space_after=4)
+    state.step = 0
+
+def draw_step(layout, text, state):
+    state.step += 1
+    layout.box([(state.labels['step'].format(number=state.step, text=text), 'bold', BLACK)], 11, STEP_FILL)
+    layout.text([('', 'regular', BLACK)])
+
+def draw_figure(layout, figure, state):
+    path = state.figure_paths[figure['image']]
+    if os.path.exists(path):
+        layout.image(path, figure.get('width', 5.5) * 72)
+        layout.text([(figure['caption'], 'italic', GRAY)], 10, align='center')
+    else:
+        layout.text(plain(state.labels['image_not_found'].format(path=path)), align='center')
+    layout.text([('', 'regular', BLACK)])
+
+def draw_issue(layout, issue, state):
+    layout.text([(issue['title'], 'bold', BLACK)], 12)
+    for item in issue['solutions']:
+        layout.text([(f'• {item}', 'regular', BLACK)])
+    layout.text([('', 'regular', BLACK)])
+
+def draw_page_break(layout, value, state):
+    if not layout.at_top:
+        layout.new_page()
+
+def plain(text):
+    return [(text, 'regular', BLACK)]
+
+BLOCK_DRAWERS = {
+    'title': lambda layout, text, state: layout.text([(text, 'regular', TITLE_COLOR)], 26, align='center',
+                                                     space_after=12),
+    'subtitle': lambda layout, text, state: layout.text([(text, 'regular', TEAL)], 18, align='center'),
+    'byline': lambda layout, text, state: layout.text([(text, 'italic', BLACK)], 12, align='center'),
+    'heading': draw_heading,
+    'paragraph': lambda layout, text, state: layout.text(plain(text)),
+    'lines': lambda layout, lines, state: [layout.text(plain(line)) for line in lines],
+    'bullets': lambda layout, items, state: [layout.text(plain(f'• {item}')) for item in items],
+    'numbered': lambda layout, items, state: [layout.text(plain(f'{i}. {item}')) for i, item in enumerate(items, 1)],
+    'step': draw_step,
+    'figure': draw_figure,
+    'table': lambda layout, spec, state: layout.table(spec['header'], spec['rows']),
+    'csv_table': lambda layout, spec, state: layout.table(spec['columns'], csv_table_rows(spec)),
+    'callout': lambda layout, callout, state: layout.text([(callout['label'], 'bold', RED),
+                                                           (callout['text'], 'regular', BLACK)]),
+    'issue': draw_issue,
+    'spacer': lambda layout, value, state: layout.text(plain('')),
+    'page_break': draw_page_break,
+}
+
+def render_pdf(sections, figure_paths, output_path, labels=DEFAULT_LABELS):
+    """Write the sections as a PDF."""
+    writer = PdfWriter()
+    layout = PdfLayout(writer)
+    for section in sections:
+        state = PdfState(figure_paths, labels)
+        for kind, value in section.blocks:
+            BLOCK_DRAWERS[kind](layout, value, state)
+    layout.finish()
+    writer.save(output_path)
+    return output_path
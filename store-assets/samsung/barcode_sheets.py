@@ -0,0 +1,319 @@
+"""
+Headless barcode test sheets for the scanner app.
+
+Reads SKUs from a CSV (a StockItem export, or - for stdin) and lays out one
+label per row, the barcode with its caption below, on letter or A4 sheets
+written as numbered 1-bit PNG pages or one PDF. Unlike the WPF
+BarcodeGenerator this runs anywhere Python does, e.g. to make scan fixtures
+in CI for thousands of items.
+
+The CSV is read lazily and each page is drawn into one reused buffer and
+written before the next is started, so memory does not grow with the SKU
+count; the PDF writer only keeps an offset per object. Symbols come from
+barcode_symbols.py as module arrays and are scaled and stored into the page
+with NumPy, one array store per label.
+
+Run: python barcode_sheets.py items.csv [--output sheets.pdf] [--symbology qr]
+"""
+from dataclasses import dataclass
+from itertools import islice
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import build_trace
+from barcode_symbols import QR_LEVELS, SYMBOLOGIES, encode
+from build_trace import add_trace_argument, span
+
+# Page sizes in inches
+PAGE_SIZES = {
+    'letter': (8.5, 11.0),
+    'a4': (210 / 25.4, 297 / 25.4),
+}
+DEFAULT_OUTPUT = 'barcode-sheets.pdf'
+DEFAULT_GRID = (3, 10)  # columns x rows, like 1" x 2.5" address labels
+# The barcode value comes from the first of these columns the CSV has
+VALUE_COLUMNS = ('Barcode', 'InventoryID')
+CAPTION_COLUMN = 'InventoryID'
+
+@dataclass(frozen=True)
+class SheetLayout:
+    """Page geometry in pixels."""
+    page: str = 'letter'
+    dpi: int = 300
+    columns: int = DEFAULT_GRID[0]
+    rows: int = DEFAULT_GRID[1]
+    margin: float = 0.5  # inches
+    module: int = 3  # narrowest bar in pixels; shrunk when a code is too wide
+
+    @property
+    def size(self):
+        """Return the page (width, height)."""
+        width, height = PAGE_SIZES[self.page]
+        return round(width * self.dpi), round(height * self.dpi)
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def cells(self):
+        """Return the (x, y, width, height) of every label, row by row."""
+        width, height = self.size
+        margin = round(self.margin * self.dpi)
+        cell_width = (width - 2 * margin) // self.columns
+        cell_height = (height - 2 * margin) // self.rows
+        return [(margin + column * cell_width, margin + row * cell_height, cell_width, cell_height)
+                for row in range(self.rows) for column in range(self.columns)]
+
+def read_labels(stream, value_column=None, caption_column=CAPTION_COLUMN):
+    """Yield (line, value, caption) for each CSV row with a value.
+
+    Without a value_column each row uses the first of VALUE_COLUMNS it has
+    a value in, so items without a barcode get their inventory ID.
+    """
+    reader = csv.DictReader(stream)
+    header = reader.fieldnames or []
+    columns = [value_column] if value_column else [name for name in VALUE_COLUMNS if name in header]
+    if not columns or columns[0] not in header:
+        raise ValueError(f"CSV has no {value_column or ' or '.join(VALUE_COLUMNS)} column "
+                         f"(columns: {', '.join(header)})")
+    for row in reader:
+        value = next((row[name].strip() for name in columns if (row[name] or '').strip()), None)
+        if value:
+            yield reader.line_num, value, (row.get(caption_column) or value).strip()
+
+def load_font(size):
+    """Return a font of about size pixels, falling back to Pillow's bitmap font."""
+    try:
+        return ImageFont.load_default(size)
+    except (TypeError, OSError):  # Pillow < 10.1 or no FreeType
+        return ImageFont.load_default()
+
+class SheetRenderer:
+    """Draws pages of labels into one reused bitmap."""
+
+    def __init__(self, layout, symbology='auto', qr_level='M'):
+        self.layout = layout
+        self.symbology = symbology
+        self.qr_level = qr_level
+        self.cells = layout.cells()
+        width, height = layout.size
+        self.pixels = np.empty((height, width), dtype=np.uint8)
+        self.font = load_font(max(10, self.cells[0][3] // 8))
+        self.caption_height = self.font.getbbox('Ag')[3] + layout.dpi // 30
+
+    def symbol(self, value):
+        """Return the modules for value."""
+        if self.symbology == 'qr':
+            return SYMBOLOGIES['qr'](value, self.qr_level)
+        return encode(value, self.symbology)
+
+    def place(self, modules, box):
+        """Scale modules into box, centered, with one array store."""
+        x, y, width, height = box
+        if modules.ndim == 2:
+            scale = min(width, height) // len(modules)
+            if scale < 1:
+                raise ValueError('QR code too large for the label')
+            block = np.repeat(np.repeat(modules, scale, axis=0), scale, axis=1)
+        else:
+            scale = min(self.layout.module, width // len(modules))
+            if scale < 1:
+                raise ValueError(f'{len(modules)} modules too wide for the label')
+            block = np.broadcast_to(np.repeat(modules, scale), (height, len(modules) * scale))
+        top = y + (height - block.shape[0]) // 2
+        left = x + (width - block.shape[1]) // 2
+        self.pixels[top:top + block.shape[0], left:left + block.shape[1]] = np.where(block, 0, 255)
+
+    def render(self, labels):
+        """Draw up to one page of (line, value, caption) labels.
+
+        Returns the page as a (height, width) bool array, True for white, and
+        the (line, value, reason) of labels that could not be drawn. Those
+        leave their cell empty.
+        """
+        self.pixels.fill(255)
+        pad = self.layout.dpi // 20
+        captions, failed = [], []
+        for (line, value, caption), (x, y, width, height) in zip(labels, self.cells):
+            box = (x + pad, y + pad, width - 2 * pad, height - 2 * pad - self.caption_height)
+            try:
+                self.place(self.symbol(value), box)
+            except ValueError as e:
+                failed.append((line, value, str(e)))
+                continue
+            captions.append((x + width // 2, y + height - pad, caption))
+        page = Image.fromarray(self.pixels)
+        draw = ImageDraw.Draw(page)
+        for x, y, caption in captions:
+            draw.text((x, y), caption, fill=0, font=self.font, anchor='ms')
+        return np.asarray(page) >= 128, failed
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+class PngPages:
+    """Writes each page as <stem>-0001.png and so on."""
+
+    def __init__(self, path, dpi):
+        self.stem = os.path.splitext(path)[0]
+        self.dpi = dpi
+        self.count = 0
+
+    def add(self, page):
+        self.count += 1
+        path = f"{self.stem}-{self.count:04d}.png"
+        height, width = page.shape
+        image = Image.frombytes('1', (width, height), np.packbits(page, axis=1).tobytes())
+        image.save(path, dpi=(self.dpi, self.dpi))
+        return os.path.getsize(path)
+
+    def close(self):
+        pass
+
+class PdfPages:
+    """Writes a PDF one full-page bitmap at a time.
+
+    Objects go to the file as they are made; the page tree, which is object
+    2, is written at the end from the page object numbers.
+    """
+
+    def __init__(self, path, dpi):
+        self.file = open(path, 'wb')
+        self.dpi = dpi
+        self.offsets = {}
+        self.pages = []
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self.next_number = 3  # 1 is the catalog, 2 the page tree
+
+    def _write(self, number, body, stream=None):
+        self.offsets[number] = self.file.tell()
+        parts = [f'{number} 0 obj\n'.encode('ascii'), body]
+        if stream is not None:
+            parts += [b'\nstream\n', stream, b'\nendstream']
+        parts.append(b'\nendobj\n')
+        self.file.write(b''.join(parts))
+
+    def _reserve(self):
+        self.next_number += 1
+        return self.next_number - 1
+
+    def add(self, page):
+        start = self.file.tell()
+        image, content, number = self._reserve(), self._reserve(), self._reserve()
+        height, width = page.shape
+        data = zlib.compress(np.packbits(page, axis=1).tobytes(), 6)  # rows padded to bytes, 1 is white
+        self._write(image, (f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+                            f'/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /FlateDecode '
+                            f'/Length {len(data)} >>').encode('ascii'), data)
+        width, height = width * 72 / self.dpi, height * 72 / self.dpi
+        draw = f'q {width:.2f} 0 0 {height:.2f} 0 0 cm /Im0 Do Q'.encode('ascii')
+        self._write(content, f'<< /Length {len(draw)} >>'.encode('ascii'), draw)
+        self._write(number, (f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] '
+                             f'/Resources << /XObject << /Im0 {image} 0 R >> >> '
+                             f'/Contents {content} 0 R >>').encode('ascii'))
+        self.pages.append(number)
+        return self.file.tell() - start
+
+    def close(self):
+        self._write(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        kids = ' '.join(f'{number} 0 R' for number in self.pages)
+        self._write(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>'.encode('ascii'))
+        xref = self.file.tell()
+        count = self.next_number
+        lines = [f'xref\n0 {count}\n0000000000 65535 f \n']
+        lines += [f'{self.offsets[number]:010d} 00000 n \n' for number in range(1, count)]
+        lines.append(f'trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n')
+        self.file.write(''.join(lines).encode('ascii'))
+        self.file.close()
+
+def write_sheets(stream, output_path, layout=SheetLayout(), symbology='auto', qr_level='M',
+                 value_column=None, caption_column=CAPTION_COLUMN):
+    """Lay out the labels of a CSV stream onto sheets at output_path.
+
+    A .pdf path gets one PDF; otherwise numbered PNG pages are written
+    next to it. Returns (labels drawn, pages, failed) where failed lists
+    the (CSV line, value, reason) of rows that could not be encoded.
+    """
+    renderer = SheetRenderer(layout, symbology, qr_level)
+    writer_class = PdfPages if output_path.lower().endswith('.pdf') else PngPages
+    writer = writer_class(output_path, layout.dpi)
+    labels = read_labels(stream, value_column, caption_column)
+    drawn, pages, failed = 0, 0, []
+    try:
+        while True:
+            batch = list(islice(labels, layout.per_page))
+            if not batch:
+                break
+            pages += 1
+            with span('page', number=pages, labels=len(batch)) as traced:
+                page, page_failed = renderer.render(batch)
+                traced.set(bytes=writer.add(page))
+            drawn += len(batch) - len(page_failed)
+            failed += page_failed
+    finally:
+        writer.close()
+    return drawn, pages, failed
+
+def parse_grid(text):
+    """Parse COLUMNSxROWS."""
+    try:
+        columns, rows = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected COLUMNSxROWS, e.g. 3x10: {text}")
+    if columns < 1 or rows < 1:
+        raise argparse.ArgumentTypeError(f"grid must be at least 1x1: {text}")
+    return columns, rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Lay out barcode test sheets for the SKUs in a CSV.')
+    parser.add_argument('csv', help='CSV with a header row, e.g. a StockItem export; - reads stdin')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help=f'.pdf for one PDF, .png for numbered pages (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--symbology', choices=('auto',) + tuple(SYMBOLOGIES), default='auto',
+                        help='barcode type; auto uses EAN-13 for valid 12/13-digit values, else Code 128 '
+                             '(default: auto)')
+    parser.add_argument('--qr-level', choices=QR_LEVELS, default='M', help='QR error correction level (default: M)')
+    parser.add_argument('--column', help=f"column to encode (default: the first of {', '.join(VALUE_COLUMNS)})")
+    parser.add_argument('--caption-column', default=CAPTION_COLUMN,
+                        help=f'column printed under each code (default: {CAPTION_COLUMN}, else the value)')
+    parser.add_argument('--page', choices=sorted(PAGE_SIZES), default='letter', help='paper size (default: letter)')
+    parser.add_argument('--grid', type=parse_grid, default=DEFAULT_GRID, metavar='COLSxROWS',
+                        help=f'labels per page (default: {DEFAULT_GRID[0]}x{DEFAULT_GRID[1]})')
+    parser.add_argument('--dpi', type=int, default=300, help='page resolution (default: 300)')
+    parser.add_argument('--module', type=int, default=3, metavar='PX',
+                        help='narrowest bar width in pixels for linear codes (default: 3, 10 mil at 300 dpi)')
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    build_trace.start(args.trace)
+
+    layout = SheetLayout(args.page, args.dpi, args.grid[0], args.grid[1], module=args.module)
+    start = time.perf_counter()
+    if args.csv == '-':
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+    else:
+        stream = open(args.csv, 'r', encoding='utf-8-sig', newline='')
+    with stream:
+        try:
+            drawn, pages, failed = write_sheets(stream, args.output, layout, args.symbology, args.qr_level,
+                                                args.column, args.caption_column)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return 1
+    for line, value, reason in failed:
+        print(f"[SKIP] line {line}: {value}: {reason}")
+    print(f"[OK] Wrote {drawn} labels on {pages} pages in {time.perf_counter() - start:.2f}s: {args.output}"
+          + (f" ({len(failed)} skipped)" if failed else ''))
+    build_trace.finish()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
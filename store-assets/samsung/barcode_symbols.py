@@ -0,0 +1,459 @@
+"""
+Barcode encoders for the test sheets (see barcode_sheets.py).
+
+Each encoder turns a value into a module array: a 1-D bool array for the
+linear codes (Code 128, EAN-13) and a square 2-D one for QR, True for dark,
+quiet zones included. Scaling to pixels is a single np.repeat, so a sheet
+draws a whole symbol with one array store instead of one call per bar.
+
+QR codes use byte, alphanumeric or numeric mode, whichever fits the value,
+at the smallest version for the error correction level. The Reed-Solomon
+step runs over all of a symbol's blocks at once and the eight masks are
+applied and scored together.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Code 128
+# ---------------------------------------------------------------------------
+
+# Bar/space widths of symbol values 0-106; 106 is the stop pattern
+CODE128_WIDTHS = (
+    '212222', '222122', '222221', '121223', '121322', '131222', '122213', '122312', '132212', '221213',
+    '221312', '231212', '112232', '122132', '122231', '113222', '123122', '123221', '223211', '221132',
+    '221231', '213212', '223112', '312131', '311222', '321122', '321221', '312212', '322112', '322211',
+    '212123', '212321', '232121', '111323', '131123', '131321', '112313', '132113', '132311', '211313',
+    '231113', '231311', '112133', '112331', '132131', '113123', '113321', '133121', '313121', '211331',
+    '231131', '213113', '213311', '213131', '311123', '311321', '331121', '312113', '312311', '332111',
+    '314111', '221411', '431111', '111224', '111422', '121124', '121421', '141122', '141221', '112214',
+    '112412', '122114', '122411', '142112', '142211', '241211', '221114', '413111', '241112', '134111',
+    '111242', '121142', '121241', '114212', '124112', '124211', '411212', '421112', '421211', '212141',
+    '214121', '412121', '111143', '111341', '131141', '114113', '114311', '411113', '411311', '113141',
+    '114131', '311141', '411131', '211412', '211214', '211232', '2331112',
+)
+CODE128_CODE_C, CODE128_CODE_B = 99, 100
+CODE128_START_B, CODE128_START_C, CODE128_STOP = 104, 105, 106
+CODE128_QUIET = 10
+
+def _widths_to_modules(widths):
+    """Expand alternating bar/space widths, starting with a bar, to modules."""
+    widths = np.frombuffer(widths.encode('ascii'), dtype=np.uint8) - ord('0')
+    return np.repeat(np.arange(len(widths)) % 2 == 0, widths)
+
+CODE128_MODULES = [_widths_to_modules(widths) for widths in CODE128_WIDTHS]
+
+def _digit_run(text, start):
+    """Return the length of the run of ASCII digits at text[start:]."""
+    end = start
+    while end < len(text) and '0' <= text[end] <= '9':
+        end += 1
+    return end - start
+
+def code128_values(text):
+    """Return the symbol values for text, check value and stop included.
+
+    Printable ASCII is encoded in code set B, switching to code set C for
+    digit runs long enough to save space (4 at either end, 6 in between).
+    """
+    if not text or any(not ' ' <= char <= '~' for char in text):
+        raise ValueError(f"Code 128 needs printable ASCII: {text!r}")
+    values = []
+    code_c = False
+    i = 0
+    while i < len(text):
+        run = _digit_run(text, i)
+        at_edge = i == 0 or i + run == len(text)
+        if not code_c and (run >= 6 or (run >= 4 and at_edge) or (run == len(text) and run % 2 == 0)):
+            if run % 2:  # an odd digit goes in code set B first
+                if not values:
+                    values.append(CODE128_START_B)
+                values.append(ord(text[i]) - 32)
+                i += 1
+                run -= 1
+            values.append(CODE128_CODE_C if values else CODE128_START_C)
+            code_c = True
+        if code_c:
+            if run >= 2:
+                values.append(int(text[i:i + 2]))
+                i += 2
+                continue
+            values.append(CODE128_CODE_B)
+            code_c = False
+        if not values:
+            values.append(CODE128_START_B)
+        values.append(ord(text[i]) - 32)
+        i += 1
+    check = (values[0] + sum(position * value for position, value in enumerate(values[1:], 1))) % 103
+    return values + [check, CODE128_STOP]
+
+def code128(text):
+    """Return the Code 128 modules for text."""
+    quiet = np.zeros(CODE128_QUIET, dtype=bool)
+    return np.concatenate([quiet] + [CODE128_MODULES[value] for value in code128_values(text)] + [quiet])
+
+# ---------------------------------------------------------------------------
+# EAN-13
+# ---------------------------------------------------------------------------
+
+# Left-hand odd-parity (L) digit patterns; R is the complement and G the reversed R
+EAN_L = np.array([[int(bit) for bit in pattern] for pattern in
+                  ('0001101', '0011001', '0010011', '0111101', '0100011',
+                   '0110001', '0101111', '0111011', '0110111', '0001011')], dtype=bool)
+EAN_R = ~EAN_L
+EAN_G = EAN_R[:, ::-1]
+# Which of the six left digits use G, by the implied first digit
+EAN_PARITY = ('LLLLLL', 'LLGLGG', 'LLGGLG', 'LLGGGL', 'LGLLGG', 'LGGLLG', 'LGGGLL', 'LGLGLG', 'LGLGGL', 'LGGLGL')
+EAN_QUIET = (11, 7)
+
+def ean13_check_digit(digits):
+    """Return the check digit for the first 12 digits."""
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits[:12]))
+    return str(-total % 10)
+
+def ean13_value(value):
+    """Return the 13-digit code for 12 digits or a valid 13-digit code."""
+    if not value.isascii() or not value.isdigit() or len(value) not in (12, 13):
+        raise ValueError(f"EAN-13 needs 12 or 13 digits: {value!r}")
+    check = ean13_check_digit(value)
+    if len(value) == 13 and value[12] != check:
+        raise ValueError(f"EAN-13 check digit of {value} should be {check}")
+    return value[:12] + check
+
+def ean13(value):
+    """Return the EAN-13 modules for value."""
+    digits = np.frombuffer(ean13_value(value).encode('ascii'), dtype=np.uint8) - ord('0')
+    use_g = np.array([parity == 'G' for parity in EAN_PARITY[digits[0]]])
+    left = np.where(use_g[:, None], EAN_G[digits[1:7]], EAN_L[digits[1:7]])
+    guard, center = np.array([1, 0, 1], dtype=bool), np.array([0, 1, 0, 1, 0], dtype=bool)
+    return np.concatenate([np.zeros(EAN_QUIET[0], dtype=bool), guard, left.ravel(), center,
+                           EAN_R[digits[7:]].ravel(), guard, np.zeros(EAN_QUIET[1], dtype=bool)])
+
+def is_ean13(value):
+    """Return True when value encodes as EAN-13."""
+    try:
+        ean13_value(value)
+    except ValueError:
+        return False
+    return True
+
+# ---------------------------------------------------------------------------
+# QR code
+# ---------------------------------------------------------------------------
+
+QR_LEVELS = ('L', 'M', 'Q', 'H')
+QR_FORMAT_BITS = {'L': 1, 'M': 0, 'Q': 3, 'H': 2}
+QR_QUIET = 4
+
+# Per version 1-40 (index 0 unused): error correction codewords per block and block count
+QR_ECC_PER_BLOCK = {
+    'L': (0, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28,
+          28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    'M': (0, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26,
+          26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    'Q': (0, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30,
+          28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    'H': (0, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28,
+          30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+}
+QR_BLOCKS = {
+    'L': (0, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8,
+          8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25),
+    'M': (0, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16,
+          17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    'Q': (0, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20,
+          23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    'H': (0, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25,
+          25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81),
+}
+
+QR_ALPHANUMERIC = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:'
+# Mode indicator and character count bits for versions 1-9, 10-26 and 27-40
+QR_MODES = {
+    'numeric': (0x1, (10, 12, 14)),
+    'alphanumeric': (0x2, (9, 11, 13)),
+    'byte': (0x4, (8, 16, 16)),
+}
+
+def _gf_tables():
+    """Return exp/log tables and the full product table of GF(256) mod 0x11D."""
+    exp = np.zeros(512, dtype=np.int32)
+    log = np.zeros(256, dtype=np.int32)
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11D
+    exp[255:510] = exp[:255]
+    a, b = np.meshgrid(np.arange(256), np.arange(256), indexing='ij')
+    product = exp[(log[a] + log[b]) % 255].astype(np.uint8)
+    product[0, :] = product[:, 0] = 0
+    return product
+
+GF_MUL = _gf_tables()
+
+@lru_cache(maxsize=None)
+def rs_divisor(degree):
+    """Return the Reed-Solomon generator polynomial of degree, highest term dropped."""
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = int(GF_MUL[result[j], root])
+            if j + 1 < degree:
+                result[j] ^= result[j + 1]
+        root = int(GF_MUL[root, 2])
+    return np.array(result, dtype=np.uint8)
+
+def rs_remainders(blocks, degree):
+    """Return the error correction codewords of each row of blocks.
+
+    Rows are data blocks left-padded with zeros to a common length, which
+    leaves their remainders unchanged; every block advances one codeword
+    per step.
+    """
+    divisor = rs_divisor(degree)
+    remainder = np.zeros((len(blocks), degree), dtype=np.uint8)
+    for column in blocks.T:
+        factor = column ^ remainder[:, 0]
+        remainder[:, :-1] = remainder[:, 1:]
+        remainder[:, -1] = 0
+        remainder ^= GF_MUL[divisor[None, :], factor[:, None]]
+    return remainder
+
+def qr_raw_codewords(version):
+    """Return the number of data and error correction codewords in a version."""
+    modules = (16 * version + 128) * version + 64
+    if version >= 2:
+        count = version // 7 + 2
+        modules -= (25 * count - 10) * count - 55
+        if version >= 7:
+            modules -= 36
+    return modules // 8
+
+def qr_data_codewords(version, level):
+    return qr_raw_codewords(version) - QR_ECC_PER_BLOCK[level][version] * QR_BLOCKS[level][version]
+
+def qr_mode(text):
+    """Return the most compact single mode for text."""
+    if text.isascii() and text.isdigit():
+        return 'numeric'
+    if all(char in QR_ALPHANUMERIC for char in text):
+        return 'alphanumeric'
+    return 'byte'
+
+def _qr_segment(text, mode):
+    """Return (payload bits as '0'/'1', character count) for text in mode."""
+    if mode == 'numeric':
+        groups = [text[i:i + 3] for i in range(0, len(text), 3)]
+        return ''.join(format(int(group), f'0{len(group) * 3 + 1}b') for group in groups), len(text)
+    if mode == 'alphanumeric':
+        values = [QR_ALPHANUMERIC.index(char) for char in text]
+        pairs = [values[i:i + 2] for i in range(0, len(values), 2)]
+        return ''.join(format(pair[0] * 45 + pair[1], '011b') if len(pair) == 2 else format(pair[0], '06b')
+                       for pair in pairs), len(text)
+    data = text.encode('utf-8')
+    return ''.join(format(byte, '08b') for byte in data), len(data)
+
+def qr_codewords(text, level='M'):
+    """Return (version, data codewords) for the smallest version holding text."""
+    mode = qr_mode(text)
+    indicator, count_bits = QR_MODES[mode]
+    payload, count = _qr_segment(text, mode)
+    for version in range(1, 41):
+        width = count_bits[0 if version < 10 else 1 if version < 27 else 2]
+        capacity = qr_data_codewords(version, level) * 8
+        if count < 1 << width and 4 + width + len(payload) <= capacity:
+            break
+    else:
+        raise ValueError(f"Too long for a QR code at level {level}: {len(text)} characters")
+    bits = format(indicator, '04b') + format(count, f'0{width}b') + payload
+    bits += '0' * min(4, capacity - len(bits))
+    bits += '0' * (-len(bits) % 8)
+    data = np.packbits(np.frombuffer(bits.encode('ascii'), dtype=np.uint8) - ord('0'))
+    padding = np.resize(np.array([0xEC, 0x11], dtype=np.uint8), capacity // 8 - len(data))
+    return version, np.concatenate([data, padding])
+
+def qr_interleave(data, version, level):
+    """Split data into blocks, add error correction and interleave the codewords."""
+    count = QR_BLOCKS[level][version]
+    degree = QR_ECC_PER_BLOCK[level][version]
+    short_length = qr_raw_codewords(version) // count - degree
+    short_count = count - qr_raw_codewords(version) % count
+    # One row per block; short blocks get a leading zero and a hole at the end
+    blocks = np.zeros((count, short_length + 1), dtype=np.uint8)
+    present = np.ones(blocks.shape, dtype=bool)
+    present[:short_count, -1] = False
+    blocks[:short_count, 1:] = data[:short_count * short_length].reshape(short_count, short_length)
+    blocks[short_count:] = data[short_count * short_length:].reshape(count - short_count, short_length + 1)
+    ecc = rs_remainders(blocks, degree)
+    blocks[:short_count] = np.roll(blocks[:short_count], -1, axis=1)
+    return np.concatenate([blocks.T[present.T], ecc.T.ravel()])
+
+def qr_alignment_positions(version):
+    if version == 1:
+        return []
+    count = version // 7 + 2
+    step = 26 if version == 32 else (version * 4 + count * 2 + 1) // (count * 2 - 2) * 2
+    size = version * 4 + 17
+    return [6] + [size - 7 - i * step for i in reversed(range(count - 1))]
+
+def _bch(value, bits, generator):
+    """Return value followed by its BCH remainder."""
+    remainder = value
+    degree = generator.bit_length() - 1
+    for _ in range(bits):
+        remainder = (remainder << 1) ^ ((remainder >> (degree - 1)) * generator)
+    return value << degree | remainder
+
+@lru_cache(maxsize=None)
+def qr_template(version):
+    """Return (modules, is_function, data_order) for a version.
+
+    modules holds the finder, timing and alignment patterns and the version
+    information; format information is left for qr_symbol. data_order is
+    the (row, column) index arrays of the codeword bits in placement order.
+    """
+    size = version * 4 + 17
+    modules = np.zeros((size, size), dtype=bool)
+    is_function = np.zeros((size, size), dtype=bool)
+
+    def put(rows, columns, dark):
+        modules[rows, columns] = dark
+        is_function[rows, columns] = True
+
+    index = np.arange(size)
+    put(6, index, index % 2 == 0)
+    put(index, 6, index % 2 == 0)
+    offsets = np.arange(-4, 5)
+    ring = np.maximum(np.abs(offsets)[:, None], np.abs(offsets)[None, :])
+    for row, column in ((3, 3), (3, size - 4), (size - 4, 3)):
+        rows, columns = np.meshgrid(row + offsets, column + offsets, indexing='ij')
+        inside = (rows >= 0) & (rows < size) & (columns >= 0) & (columns < size)
+        put(rows[inside], columns[inside], ((ring != 2) & (ring != 4))[inside])
+    positions = qr_alignment_positions(version)
+    last = len(positions) - 1
+    for i, row in enumerate(positions):
+        for j, column in enumerate(positions):
+            if (i, j) in ((0, 0), (0, last), (last, 0)):
+                continue
+            put(slice(row - 2, row + 3), slice(column - 2, column + 3), ring[2:7, 2:7] != 1)
+    # Format information areas, filled per mask, and the dark module
+    put(8, np.r_[0:6, 7:9, size - 8:size], False)
+    put(np.r_[0:6, 7, size - 7:size], 8, False)
+    put(size - 8, 8, True)
+    if version >= 7:
+        bits = _bch(version, 12, 0x1F25)
+        block = np.array([bits >> i & 1 for i in range(18)], dtype=bool).reshape(6, 3)
+        put(slice(0, 6), slice(size - 11, size - 8), block)
+        put(slice(size - 11, size - 8), slice(0, 6), block.T)
+
+    # Codeword placement: two-module columns from the right, alternately upward
+    # and downward, skipping the vertical timing pattern
+    rows, columns = [], []
+    for right in range(size - 1, 0, -2):
+        if right <= 6:
+            right -= 1
+        upward = (right + 1) & 2 == 0
+        vertical = index[::-1] if upward else index
+        rows.append(np.repeat(vertical, 2))
+        columns.append(np.tile([right, right - 1], size))
+    rows, columns = np.concatenate(rows), np.concatenate(columns)
+    free = ~is_function[rows, columns]
+    return modules, is_function, (rows[free], columns[free])
+
+def qr_masks(size):
+    """Return the eight data masks as a (8, size, size) bool array."""
+    y, x = np.indices((size, size))
+    return np.stack([
+        (x + y) % 2 == 0,
+        y % 2 == 0,
+        x % 3 == 0,
+        (x + y) % 3 == 0,
+        (x // 3 + y // 2) % 2 == 0,
+        x * y % 2 + x * y % 3 == 0,
+        (x * y % 2 + x * y % 3) % 2 == 0,
+        ((x + y) % 2 + x * y % 3) % 2 == 0,
+    ])
+
+QR_FINDER_CORE = np.array([1, 0, 1, 1, 1, 0, 1], dtype=bool)
+
+def qr_penalties(candidates):
+    """Return the mask penalty score of each (n, size, size) candidate symbol."""
+    count, size = candidates.shape[:2]
+    lines = np.concatenate([candidates, candidates.transpose(0, 2, 1)], axis=1)
+    # Runs of five or more modules of one color. Each line's boundaries end
+    # with a marker past its last module, so the step to the next line's
+    # first boundary counts as a run of one and scores nothing.
+    bounds = np.ones((count, 2 * size, size + 1), dtype=bool)
+    bounds[:, :, 1:-1] = lines[:, :, 1:] != lines[:, :, :-1]
+    starts = np.flatnonzero(bounds)
+    runs = np.diff(starts)
+    owner = starts[:-1] // bounds[0].size
+    score = np.bincount(owner, weights=np.where(runs >= 5, runs - 2, 0), minlength=count).astype(np.int64)
+    # 2x2 blocks of one color
+    same = ((candidates[:, :-1, :-1] == candidates[:, 1:, :-1]) & (candidates[:, :-1, :-1] == candidates[:, :-1, 1:])
+            & (candidates[:, :-1, :-1] == candidates[:, 1:, 1:]))
+    score += 3 * same.sum(axis=(1, 2))
+    # Finder-like 1:1:3:1:1 patterns with four light modules on either side
+    padded = np.zeros((count, 2 * size, size + 8), dtype=bool)
+    padded[:, :, 4:-4] = lines
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 15, axis=2)
+    core = (windows[..., 4:11] == QR_FINDER_CORE).all(axis=3)
+    light = ~windows[..., :4].any(axis=3) | ~windows[..., 11:].any(axis=3)
+    score += 40 * (core & light).sum(axis=(1, 2))
+    # Balance of dark and light modules
+    dark = candidates.sum(axis=(1, 2)) * 100 / (size * size)
+    score += 10 * (np.abs(dark - 50) // 5).astype(np.int64)
+    return score
+
+def qr_format_bits(level, mask):
+    bits = _bch(QR_FORMAT_BITS[level] << 3 | mask, 10, 0x537) ^ 0x5412
+    return np.array([bits >> i & 1 for i in range(15)], dtype=bool)
+
+def _put_format(symbols, bits):
+    """Write 15 format bits (one row per symbol) into both copies."""
+    size = symbols.shape[1]
+    # Around the top-left finder: down column 8, then leftwards along row 8
+    symbols[:, np.r_[0:6, 7, 8], 8] = bits[:, :8]
+    symbols[:, 8, [7, 5, 4, 3, 2, 1, 0]] = bits[:, 8:]
+    # Split between the other two finders
+    symbols[:, 8, size - 1 - np.arange(8)] = bits[:, :8]
+    symbols[:, size - 7:, 8] = bits[:, 8:]
+
+def qr(text, level='M', mask=None):
+    """Return the QR modules for text at an error correction level.
+
+    The mask with the lowest penalty is used unless one is given.
+    """
+    version, data = qr_codewords(text, level)
+    modules, is_function, order = qr_template(version)
+    codewords = qr_interleave(data, version, level)
+    bits = np.unpackbits(codewords).astype(bool)
+    base = modules.copy()
+    base[order[0][:len(bits)], order[1][:len(bits)]] = bits
+    masks = range(8) if mask is None else [mask]
+    candidates = base[None] ^ (qr_masks(len(base))[list(masks)] & ~is_function)
+    _put_format(candidates, np.stack([qr_format_bits(level, m) for m in masks]))
+    best = candidates[int(np.argmin(qr_penalties(candidates)))] if mask is None else candidates[0]
+    return np.pad(best, QR_QUIET)
+
+# ---------------------------------------------------------------------------
+# Symbologies
+# ---------------------------------------------------------------------------
+
+SYMBOLOGIES = {
+    'code128': code128,
+    'ean13': ean13,
+    'qr': qr,
+}
+
+def encode(value, symbology):
+    """Return the modules of value in a symbology; auto picks EAN-13 for
+    valid 12/13-digit values and Code 128 otherwise."""
+    if symbology == 'auto':
+        symbology = 'ean13' if is_ean13(value) else 'code128'
+    return SYMBOLOGIES[symbology](value)
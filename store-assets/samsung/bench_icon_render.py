@@ -0,0 +1,41 @@
+"""
+Compare the ImageDraw and NumPy icon render engines.
+Run: python bench_icon_render.py [sizes...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from create_icon import render_icon
+
+DEFAULT_SIZES = [512, 1024, 4096]
+
+def best_time(func, repeat):
+    """Return the best wall time of several runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+
+    print(f"{'Size':>6} {'draw (ms)':>10} {'numpy (ms)':>11} {'speedup':>8}  identical")
+    print("-" * 50)
+
+    for size in sizes:
+        repeat = 5 if size <= 1024 else 2
+        identical = np.array_equal(
+            np.asarray(render_icon(size, 'draw')),
+            np.asarray(render_icon(size, 'numpy'))
+        )
+        draw_time = best_time(lambda: render_icon(size, 'draw'), repeat)
+        numpy_time = best_time(lambda: render_icon(size, 'numpy'), repeat)
+        print(f"{size:>6} {draw_time * 1000:>10.2f} {numpy_time * 1000:>11.2f} "
+              f"{draw_time / numpy_time:>7.1f}x  {'yes' if identical else 'NO'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+"""
+Build every release asset from one entry point, as a dependency graph.
+
+Each node runs one asset script in its own process and declares the files it
+reads and the paths it writes:
+
+    icons             create_icon.py        -> icon_NxN.png in this folder
+    svg               generate_icons.py     -> the same files, drawn from app_icon.svg
+    check_icons       check_icons.py        reads the icons above
+    bundle[PLATFORM]  build_icon_bundle.py  -> store-assets/icon-bundle/PLATFORM
+    manual[LANGUAGE]  docs/create_manual.py -> the manual in each --format
+
+icons and svg write the same files, so svg only runs when it is named. A
+node's inputs include its script and every local module the script imports,
+found by reading the imports, so an edit to shared code such as png_encode.py
+reaches every node that uses it. A node runs after the nodes whose outputs it
+reads; naming a node also builds those.
+
+Independent nodes run at the same time, up to --workers processes. When more
+nodes are ready than there are free workers, the one with the longest chain of
+work after it starts first, so the build takes about as long as its critical
+path. Each node runs its script with one worker, so the limit holds overall.
+
+A node is skipped when its command and the contents of its inputs hash to the
+key recorded after its last successful run, and its outputs are as that run
+left them. Keys and wall times are kept in .asset-build.json at the project
+root. --dry-run prints what would run and the critical path, estimated from
+the recorded times.
+
+Run: python build_assets.py [NODE ...] [--workers N] [--dry-run] [--force]
+"""
+import argparse
+import ast
+import glob
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from graphlib import CycleError, TopologicalSorter
+
+from icon_jobs import resolve_workers
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+DOCS_DIR = os.path.join(PROJECT_ROOT, 'docs')
+BUNDLE_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'icon-bundle')
+STATE_PATH = os.path.join(PROJECT_ROOT, '.asset-build.json')
+
+# The committed Galaxy Store icons, written by both icon nodes
+ICON_SIZES = (512, 256, 192, 144, 128, 96, 72, 48)
+MANUAL_STEM = os.path.join(DOCS_DIR, 'Acumatica_Inventory_Scanner_Manual')
+SOURCE_LANGUAGE = 'en'
+
+# create_manual.OUTPUT_FORMATS, without importing python-docx here
+MANUAL_FORMATS = ('docx', 'html', 'pdf')
+
+# Critical path estimate for a node that has never run, in seconds
+DEFAULT_ESTIMATE = 1.0
+
+@dataclass(frozen=True)
+class Node:
+    """One build step: a script run with arguments, the files it reads and the paths it writes.
+
+    ``inputs`` are data files or directories besides the script and the
+    modules it imports; modules are looked up in ``search_path``. Outputs may
+    be directories.
+    """
+    name: str
+    script: str
+    args: tuple = ()
+    inputs: tuple = ()
+    outputs: tuple = ()
+    search_path: tuple = (SCRIPT_DIR,)
+
+    def command(self):
+        return (sys.executable, self.script) + self.args
+
+# ---------------------------------------------------------------------------
+# Declaration
+# ---------------------------------------------------------------------------
+
+def bundle_inputs(manifest_path, platform):
+    """Return the manifest and the SVG files of the layers one platform uses."""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    spec = manifest['platforms'][platform]
+    layers = {spec[key] for key in ('layer', 'foreground', 'background') if key in spec}
+    svgs = sorted(os.path.join(PROJECT_ROOT, manifest['layers'][layer]['path']) for layer in layers
+                  if manifest['layers'][layer]['renderer'] == 'svg')
+    return (manifest_path,) + tuple(svgs)
+
+def manual_languages():
+    """Return the source language and every language with a catalog in docs/locales."""
+    catalogs = glob.glob(os.path.join(DOCS_DIR, 'locales', '*.yaml'))
+    return [SOURCE_LANGUAGE] + sorted(os.path.splitext(os.path.basename(path))[0] for path in catalogs)
+
+def declare_nodes(args):
+    """Return {name: Node} for every asset this script can build."""
+    icons = tuple(os.path.join(SCRIPT_DIR, f"icon_{size}x{size}.png") for size in ICON_SIZES)
+    sizes = tuple(arg for size in ICON_SIZES for arg in ('--size', str(size)))
+    png = ('--png', args.png, '--no-png-stats')
+    svg_path = os.path.join(PROJECT_ROOT, 'AcumaticaInventoryScanner', 'Resources', 'Images', 'app_icon.svg')
+    nodes = [
+        Node('icons', os.path.join(SCRIPT_DIR, 'create_icon.py'), sizes + png, outputs=icons),
+        Node('svg', os.path.join(SCRIPT_DIR, 'generate_icons.py'), sizes + png + ('--backend', args.backend),
+             inputs=(svg_path,), outputs=icons),
+        Node('check_icons', os.path.join(SCRIPT_DIR, 'check_icons.py'), ('--png', args.png), inputs=icons),
+    ]
+    manifest = os.path.join(SCRIPT_DIR, 'icon_bundle.json')
+    with open(manifest, 'r', encoding='utf-8') as f:
+        platforms = list(json.load(f)['platforms'])
+    for platform in platforms:
+        nodes.append(Node(f"bundle[{platform}]", os.path.join(SCRIPT_DIR, 'build_icon_bundle.py'),
+                          ('--platform', platform, '--backend', args.backend) + png,
+                          inputs=bundle_inputs(manifest, platform),
+                          outputs=(os.path.join(BUNDLE_DIR, platform),)))
+    formats = tuple(dict.fromkeys(args.formats or ['docx']))
+    for language in manual_languages():
+        suffix = '' if language == SOURCE_LANGUAGE else f"_{language}"
+        inputs = (os.path.join(DOCS_DIR, 'manual.yaml'), os.path.join(DOCS_DIR, 'images'))
+        if language != SOURCE_LANGUAGE:
+            inputs += (os.path.join(DOCS_DIR, 'locales', f"{language}.yaml"),)
+        nodes.append(Node(f"manual[{language}]", os.path.join(DOCS_DIR, 'create_manual.py'),
+                          ('--language', language, '--workers', '1')
+                          + tuple(arg for fmt in formats for arg in ('--format', fmt)),
+                          inputs=inputs, outputs=tuple(f"{MANUAL_STEM}{suffix}.{fmt}" for fmt in formats),
+                          search_path=(DOCS_DIR, SCRIPT_DIR)))
+    return {node.name: node for node in nodes}
+
+# Built when no node is named; svg writes the same files as icons
+DEFAULT_EXCLUDED = {'svg'}
+
+# ---------------------------------------------------------------------------
+# Inputs and outputs
+# ---------------------------------------------------------------------------
+
+_imports = {}
+
+def local_imports(path):
+    """Return the top-level module names a Python file imports, including inside functions."""
+    if path not in _imports:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.add(node.module.split('.')[0])
+        _imports[path] = names
+    return _imports[path]
+
+def script_files(script, search_path):
+    """Return the script and every local module it reaches through its imports."""
+    found, pending = [], [script]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.append(path)
+        for name in local_imports(path):
+            for directory in search_path:
+                module = os.path.join(directory, f"{name}.py")
+                if os.path.exists(module):
+                    pending.append(module)
+                    break
+    return sorted(found)
+
+def files_under(path):
+    """Return the files a path stands for: itself, or everything under a directory."""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+
+def node_inputs(node):
+    """Return every file the node reads, scripts first."""
+    files = script_files(node.script, node.search_path)
+    for path in node.inputs:
+        files += files_under(path)
+    return files
+
+_digests = {}
+
+def content_digest(path):
+    """Return a file's SHA-256, reusing it while the file's size and mtime are unchanged."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    token = (st.st_size, st.st_mtime_ns)
+    cached = _digests.get(path)
+    if cached is None or cached[0] != token:
+        with open(path, 'rb') as f:
+            cached = _digests[path] = (token, hashlib.sha256(f.read()).hexdigest())
+    return cached[1]
+
+def node_key(node):
+    """Hash the node's command and the contents of everything it reads."""
+    payload = json.dumps({
+        'command': [os.path.relpath(node.script, PROJECT_ROOT)] + list(node.args),
+        'inputs': {os.path.relpath(path, PROJECT_ROOT): content_digest(path) for path in node_inputs(node)},
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def output_snapshot(node):
+    """Return {path: [mtime_ns, size]} for the node's output files, None where missing."""
+    snapshot = {}
+    for output in node.outputs:
+        for path in files_under(output):
+            try:
+                st = os.stat(path)
+                snapshot[os.path.relpath(path, PROJECT_ROOT)] = [st.st_mtime_ns, st.st_size]
+            except OSError:
+                snapshot[os.path.relpath(path, PROJECT_ROOT)] = None
+    return snapshot
+
+def missing_outputs(node):
+    return [path for path in node.outputs if not os.path.exists(path)]
+
+# ---------------------------------------------------------------------------
+# Graph
+# ---------------------------------------------------------------------------
+
+def overlaps(node, path):
+    """Return True if the node writes path, something inside it, or a directory holding it."""
+    return any(path == output or path.startswith(output + os.sep) or output.startswith(path + os.sep)
+               for output in node.outputs)
+
+def select_nodes(nodes, names):
+    """Return {name: dependencies} for the named nodes and the nodes that write their inputs.
+
+    A file written by a named node comes from that node; otherwise from a
+    default node. Raises ValueError if two candidates write the same path.
+    """
+    wanted = list(names) or [name for name in nodes if name not in DEFAULT_EXCLUDED]
+    candidates = wanted + [name for name in nodes if name not in wanted and name not in DEFAULT_EXCLUDED]
+    graph, pending = {}, list(wanted)
+    while pending:
+        name = pending.pop(0)
+        if name in graph:
+            continue
+        node = nodes[name]
+        deps = set()
+        for path in node.inputs:
+            producer = next((other for other in candidates if other != name and overlaps(nodes[other], path)), None)
+            if producer is not None:
+                deps.add(producer)
+        graph[name] = deps
+        pending += sorted(deps)
+    for name, other in itertools.combinations(sorted(graph), 2):
+        clash = set(nodes[name].outputs) & set(nodes[other].outputs)
+        if clash:
+            raise ValueError(f"{name} and {other} both write {os.path.relpath(min(clash), PROJECT_ROOT)}")
+    return graph
+
+def dependents(graph):
+    """Invert {name: dependencies} into {name: nodes that depend on it}."""
+    inverse = {name: set() for name in graph}
+    for name, deps in graph.items():
+        for dep in deps:
+            inverse[dep].add(name)
+    return inverse
+
+def chain_lengths(graph, order, durations):
+    """Return, per node, the longest run of durations from it through its dependents."""
+    after = dependents(graph)
+    chains = {}
+    for name in reversed(order):
+        chains[name] = durations[name] + max((chains[child] for child in after[name]), default=0.0)
+    return chains
+
+def critical_path(graph, order, durations):
+    """Return (nodes, seconds) for the longest chain of durations in the graph."""
+    chains = chain_lengths(graph, order, durations)
+    after = dependents(graph)
+    if not chains:
+        return [], 0.0
+    name = max(order, key=chains.get)
+    path = [name]
+    while any(chains[child] for child in after[name]):
+        name = max(after[name], key=chains.get)
+        path.append(name)
+    return [name for name in path if durations[name]], chains[path[0]]
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+
+def load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'nodes': {}}
+
+def save_state(path, state):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def up_to_date(node, key, state):
+    """Return True if the node's last successful run had this key and left its outputs as they are now."""
+    record = state['nodes'].get(node.name)
+    return (record is not None and record.get('key') == key and not missing_outputs(node)
+            and record['outputs'] == output_snapshot(node))
+
+def estimate(name, state):
+    """Return the node's last recorded wall time, or DEFAULT_ESTIMATE if it never ran."""
+    return state['nodes'].get(name, {}).get('seconds', DEFAULT_ESTIMATE)
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+def run_node(node):
+    """Run one node's script and return (returncode, output, seconds)."""
+    start = time.perf_counter()
+    proc = subprocess.run(node.command(), cwd=os.path.dirname(node.script), capture_output=True, text=True)
+    return proc.returncode, proc.stdout + proc.stderr, time.perf_counter() - start
+
+def dry_run(nodes, graph, order, state, force):
+    """Print what a build would run and its critical path."""
+    stale, durations = set(), {}
+    print(f"{'Node':<20} {'Status':<28} {'Estimate':>9}")
+    print("-" * 59)
+    for name in order:
+        node = nodes[name]
+        upstream = sorted(graph[name] & stale)
+        if upstream:
+            status = f"run after {', '.join(upstream)}"
+        elif force or not up_to_date(node, node_key(node), state):
+            status = 'run'
+        else:
+            print(f"{name:<20} up to date")
+            durations[name] = 0.0
+            continue
+        stale.add(name)
+        durations[name] = estimate(name, state)
+        known = name in state['nodes']
+        print(f"{name:<20} {status:<28} {durations[name]:>8.2f}{'s' if known else '?'}")
+    print("-" * 59)
+    if not stale:
+        print("Everything is up to date")
+        return
+    path, seconds = critical_path(graph, order, durations)
+    print(f"Critical path: {' -> '.join(path)} ({seconds:.2f} s)")
+    print(f"{len(stale)} nodes to run, {sum(durations.values()):.2f} s of work ('?' = never built, "
+          f"{DEFAULT_ESTIMATE:.0f} s assumed)")
+
+def build(nodes, graph, order, state, workers, force, verbose):
+    """Run the stale nodes of the graph, independent ones concurrently. Returns the failed node names."""
+    durations = {name: estimate(name, state) for name in order}
+    chains = chain_lengths(graph, order, durations)
+    sorter = TopologicalSorter(graph)
+    sorter.prepare()
+    failed, blocked, ran = set(), set(), {}
+    ready, running = [], {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while sorter.is_active():
+            for name in sorter.get_ready():
+                node = nodes[name]
+                if graph[name] & (failed | blocked):
+                    blocked.add(name)
+                    print(f"[BUILD] {name}: skipped, needs {', '.join(sorted(graph[name] & (failed | blocked)))}")
+                    sorter.done(name)
+                    continue
+                key = node_key(node)
+                if not force and up_to_date(node, key, state):
+                    print(f"[BUILD] {name}: up to date")
+                    sorter.done(name)
+                    continue
+                # Longest remaining chain first
+                heapq.heappush(ready, (-chains[name], name, key))
+            while ready and len(running) < workers:
+                _, name, key = heapq.heappop(ready)
+                running[pool.submit(run_node, nodes[name])] = (name, key)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                node = nodes[name]
+                returncode, output, seconds = future.result()
+                missing = missing_outputs(node) if returncode == 0 else []
+                if verbose or returncode or missing:
+                    sys.stdout.write(output)
+                if returncode or missing:
+                    failed.add(name)
+                    # Keep the time for estimates, but not a key that would mark it up to date
+                    state['nodes'][name] = {'seconds': seconds}
+                    save_state(STATE_PATH, state)
+                    reason = f"exit status {returncode}" if returncode else \
+                        f"did not write {', '.join(os.path.relpath(p, PROJECT_ROOT) for p in missing)}"
+                    print(f"[BUILD] {name}: FAILED ({reason}) after {seconds:.2f} s")
+                else:
+                    ran[name] = seconds
+                    state['nodes'][name] = {'key': key, 'outputs': output_snapshot(node), 'seconds': seconds}
+                    save_state(STATE_PATH, state)
+                    print(f"[BUILD] {name}: built in {seconds:.2f} s")
+                sorter.done(name)
+
+    elapsed = time.perf_counter() - start
+    print("-" * 40)
+    if ran:
+        path, seconds = critical_path(graph, order, {name: ran.get(name, 0.0) for name in order})
+        print(f"Built {len(ran)} nodes in {elapsed:.2f} s on {workers} workers "
+              f"({sum(ran.values()):.2f} s of work; critical path {' -> '.join(path)}, {seconds:.2f} s)")
+    elif not failed:
+        print("Everything is up to date")
+    if failed:
+        print(f"[BUILD] Failed: {', '.join(sorted(failed))}"
+              + (f"; not built: {', '.join(sorted(blocked))}" if blocked else ''))
+    return failed | blocked
+
+def main(argv=None):
+    from icon_backends import AUTO, BACKENDS, FASTEST_FIRST
+    from png_encode import DEFAULT_PRESET, PRESETS
+
+    parser = argparse.ArgumentParser(description="Build the icons, icon bundle and manual as a dependency graph.")
+    parser.add_argument('nodes', nargs='*', metavar='NODE',
+                        help='node to build with the nodes it depends on, repeatable (default: all but svg)')
+    parser.add_argument('--workers', type=int, default=0, metavar='N',
+                        help='nodes run at the same time, 0 for one per CPU (default: 0)')
+    parser.add_argument('--dry-run', action='store_true', help='print what would run and the critical path')
+    parser.add_argument('--force', action='store_true', help='run every selected node, even when up to date')
+    parser.add_argument('--list', action='store_true', help='list the nodes with their inputs and outputs')
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every node's output, not only failures")
+    parser.add_argument('--png', choices=PRESETS, default=DEFAULT_PRESET,
+                        help=f'PNG encoding preset (default: {DEFAULT_PRESET})')
+    parser.add_argument('--backend', choices=(AUTO,) + tuple(BACKENDS), default=AUTO,
+                        help=f"rasterizer backend for svg and the bundle (default: {AUTO}, the first "
+                             f"available of {', '.join(FASTEST_FIRST)})")
+    parser.add_argument('--format', action='append', choices=MANUAL_FORMATS, dest='formats',
+                        help='manual output format, repeatable (default: docx)')
+    args = parser.parse_args(argv)
+
+    nodes = declare_nodes(args)
+    unknown = [name for name in args.nodes if name not in nodes]
+    if unknown:
+        parser.error(f"unknown node(s): {', '.join(unknown)} (choose from {', '.join(nodes)})")
+    try:
+        graph = select_nodes(nodes, args.nodes)
+        order = list(TopologicalSorter(graph).static_order())
+    except (ValueError, CycleError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.list:
+        for name in order:
+            node = nodes[name]
+            print(f"{name}: {' '.join(os.path.relpath(arg, PROJECT_ROOT) if os.path.isabs(arg) else arg for arg in node.command()[1:])}")
+            if graph[name]:
+                print(f"  after:   {', '.join(sorted(graph[name]))}")
+            print(f"  reads:   {len(node_inputs(node))} files")
+            for output in node.outputs:
+                print(f"  writes:  {os.path.relpath(output, PROJECT_ROOT)}")
+        return 0
+
+    state = load_state(STATE_PATH)
+    if args.dry_run:
+        dry_run(nodes, graph, order, state, args.force)
+        return 0
+    workers = resolve_workers(args.workers)
+    failed = build(nodes, graph, order, state, workers, args.force, args.verbose)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
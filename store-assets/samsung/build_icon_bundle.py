@@ -0,0 +1,340 @@
+"""
+Build every platform's app icons from icon_bundle.json in one pass.
+
+The manifest names the artwork layers (the full icon and the Android adaptive
+foreground/background) and, per platform, which layer is needed at which
+sizes. Each (layer, size) is rendered and encoded once, however many platforms
+ask for it, and the bytes are written to every target. Platform metadata
+(adaptive-icon XML, the iOS Contents.json, a Windows VisualElements snippet)
+is generated alongside.
+
+Run: python build_icon_bundle.py [--platform android --platform ios] [--output DIR]
+"""
+from dataclasses import dataclass
+import argparse
+import json
+import os
+import sys
+import time
+
+import build_trace
+
+from PIL import Image, ImageChops, ImageDraw
+
+from build_trace import add_trace_argument, span
+from icon_backends import AUTO, add_backend_argument, get_backend, load_svg
+from icon_pyramid import DEFAULT_SUPERSAMPLE, IconPyramid, add_pyramid_arguments, master_size
+from png_encode import PngEncoder, add_encoder_arguments, encoder_from_args
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+DEFAULT_MANIFEST = os.path.join(SCRIPT_DIR, 'icon_bundle.json')
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'icon-bundle')
+
+@dataclass(frozen=True)
+class Target:
+    """One output file: a layer at one size (several for an .ico)."""
+    path: str
+    layer: str
+    sizes: tuple
+    mask: str = None
+
+# ---------------------------------------------------------------------------
+# Platforms: each turns its manifest entry into (targets, metadata files)
+# ---------------------------------------------------------------------------
+
+def plan_samsung(spec):
+    targets = [Target(f"samsung/icon_{size}x{size}.png", spec['layer'], (size,)) for size in spec['sizes']]
+    return targets, {}
+
+def plan_android(spec):
+    name = spec['name']
+    targets = []
+    for density, scale in spec['densities'].items():
+        folder = f"android/mipmap-{density}"
+        legacy = round(spec['legacy_dp'] * scale)
+        adaptive = round(spec['adaptive_dp'] * scale)
+        targets += [
+            Target(f"{folder}/{name}.png", spec['layer'], (legacy,)),
+            Target(f"{folder}/{name}_round.png", spec['layer'], (legacy,), mask='circle'),
+            Target(f"{folder}/{name}_foreground.png", spec['foreground'], (adaptive,)),
+            Target(f"{folder}/{name}_background.png", spec['background'], (adaptive,)),
+        ]
+    if spec.get('play_store'):
+        size = spec['play_store']
+        targets.append(Target(f"android/play_store_{size}.png", spec['layer'], (size,)))
+
+    adaptive_icon = (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<adaptive-icon xmlns:android="http://schemas.android.com/apk/res/android">\n'
+        f'    <background android:drawable="@mipmap/{name}_background"/>\n'
+        f'    <foreground android:drawable="@mipmap/{name}_foreground"/>\n'
+        '</adaptive-icon>\n'
+    )
+    metadata = {
+        f"android/mipmap-anydpi-v26/{name}.xml": adaptive_icon,
+        f"android/mipmap-anydpi-v26/{name}_round.xml": adaptive_icon,
+    }
+    return targets, metadata
+
+def plan_ios(spec):
+    folder = f"ios/{spec['appiconset']}"
+    targets = {}
+    images = []
+    for icon in spec['icons']:
+        for scale in icon['scales']:
+            pixels = round(icon['size'] * scale)
+            filename = f"AppIcon-{pixels}.png"
+            targets.setdefault(filename, Target(f"{folder}/{filename}", spec['layer'], (pixels,)))
+            images.append({
+                'filename': filename,
+                'idiom': icon['idiom'],
+                'scale': f"{scale}x",
+                'size': f"{icon['size']:g}x{icon['size']:g}",
+            })
+    contents = {'images': images, 'info': {'author': 'xcode', 'version': 1}}
+    return list(targets.values()), {f"{folder}/Contents.json": json.dumps(contents, indent=2) + '\n'}
+
+def plan_windows(spec):
+    targets = []
+    for tile, size in spec['tiles'].items():
+        for scale in spec['scales']:
+            targets.append(Target(f"windows/Images/{tile}.scale-{scale}.png", spec['layer'],
+                                  (round(size * scale / 100),)))
+    ico = spec.get('ico')
+    if ico:
+        targets.append(Target(f"windows/{ico['name']}", spec['layer'], tuple(sorted(ico['sizes']))))
+
+    # Package.appxmanifest resolves the scale-NNN qualifiers itself
+    def logo(tile):
+        return f'{tile}="Images\\{tile}.png"' if tile in spec['tiles'] else ''
+
+    visual_elements = (
+        '<uap:VisualElements\n'
+        '  DisplayName="$placeholder$"\n'
+        '  Description="$placeholder$"\n'
+        f'  {logo("Square150x150Logo")}\n'
+        f'  {logo("Square44x44Logo")}\n'
+        '  BackgroundColor="transparent">\n'
+        f'  <uap:DefaultTile {logo("Square71x71Logo")} {logo("Square310x310Logo")} />\n'
+        '</uap:VisualElements>\n'
+    )
+    return targets, {'windows/VisualElements.xml': visual_elements}
+
+PLATFORMS = {
+    'samsung': plan_samsung,
+    'android': plan_android,
+    'ios': plan_ios,
+    'windows': plan_windows,
+}
+
+def plan_bundle(manifest, platforms=None):
+    """Return (targets, metadata) for the selected platforms of a manifest."""
+    targets, metadata = [], {}
+    for platform, spec in manifest['platforms'].items():
+        if platforms and platform not in platforms:
+            continue
+        if platform not in PLATFORMS:
+            raise ValueError(f"Unknown platform in manifest: {platform}")
+        platform_targets, platform_metadata = PLATFORMS[platform](spec)
+        targets += platform_targets
+        metadata.update(platform_metadata)
+    return targets, metadata
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def layer_renderer(spec, backend=AUTO):
+    """Return a size -> RGBA image function for one manifest layer."""
+    if spec['renderer'] == 'scene':
+        import create_icon
+        return lambda size: create_icon.render_icon(size, variant=spec.get('variant', 'default'))
+    if spec['renderer'] == 'svg':
+        source = load_svg(os.path.join(PROJECT_ROOT, spec['path']))
+        rasterizer = get_backend(backend, [source])
+        return lambda size: rasterizer.rasterize(source, size)
+    raise ValueError(f"Unknown layer renderer: {spec['renderer']}")
+
+def circle_mask(img):
+    """Return a copy of img clipped to an antialiased circle."""
+    # Draw the circle at 4x and downsample for smooth edges
+    scale = 4
+    mask = Image.new('L', (img.width * scale, img.height * scale), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, mask.width - 1, mask.height - 1), fill=255)
+    mask = mask.resize(img.size, Image.Resampling.LANCZOS)
+    out = img.copy()
+    out.putalpha(ImageChops.multiply(img.getchannel('A'), mask))
+    return out
+
+class RenderCache:
+    """Renders each (layer, size) once and keeps the result in memory.
+
+    With ``pyramid`` every layer is rendered once at a supersampled master
+    edge covering all of its sizes, and the sizes are resampled from it;
+    sizes in ``redraw`` are always rendered directly. ``encoded`` holds the
+    PNG encoding of each (layer, size, mask) for builds that reuse the cache.
+    """
+
+    def __init__(self, layers, pyramid=False, supersample=DEFAULT_SUPERSAMPLE, redraw=(), backend=AUTO):
+        self.layers = layers
+        self.backend = backend
+        self.pyramid = pyramid
+        self.supersample = supersample
+        self.redraw = set(redraw)
+        self.renders = 0
+        self._renderers = {}
+        self._pyramids = {}
+        self._sizes = {}
+        self._images = {}
+        self.encoded = {}
+
+    def forget(self, layers):
+        """Drop everything rendered for the given layers, e.g. after their sources changed."""
+        for layer in layers:
+            self._renderers.pop(layer, None)
+            self._pyramids.pop(layer, None)
+        self._images = {key: img for key, img in self._images.items() if key[0] not in layers}
+        self.encoded = {key: data for key, data in self.encoded.items() if key[0] not in layers}
+
+    def plan(self, targets):
+        """Record which sizes each layer needs, to size the pyramid masters."""
+        for target in targets:
+            self._sizes.setdefault(target.layer, set()).update(target.sizes)
+
+    def _render(self, layer, size):
+        if layer not in self._renderers:
+            if layer not in self.layers:
+                raise ValueError(f"Unknown layer: {layer}")
+            self._renderers[layer] = layer_renderer(self.layers[layer], self.backend)
+        self.renders += 1
+        with span('render', layer=layer, size=size):
+            return self._renderers[layer](size)
+
+    def get(self, layer, size, mask=None):
+        """Return the image for a layer at a size, rendering it on first use."""
+        key = (layer, size, mask)
+        if key not in self._images:
+            if mask == 'circle':
+                img = circle_mask(self.get(layer, size))
+            elif mask is not None:
+                raise ValueError(f"Unknown mask: {mask}")
+            elif self.pyramid and size not in self.redraw:
+                if layer not in self._pyramids:
+                    sizes = [s for s in self._sizes.get(layer, {size}) if s not in self.redraw] or [size]
+                    self._pyramids[layer] = IconPyramid(self._render(layer, master_size(sizes, self.supersample)))
+                img = self._pyramids[layer].get(size)
+            else:
+                img = self._render(layer, size)
+            self._images[key] = img
+        return self._images[key]
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def write_file(output_dir, relative_path, data):
+    """Write bytes to a path under output_dir, creating folders as needed."""
+    path = os.path.join(output_dir, relative_path)
+    with span('save', path=relative_path, bytes=len(data)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+def build_bundle(manifest, output_dir, platforms=None, encoder=None, pyramid=False,
+                 supersample=DEFAULT_SUPERSAMPLE, redraw=(), backend=AUTO, cache=None):
+    """Render, encode and write every target of the manifest.
+
+    A RenderCache from an earlier build of the same manifest and options can
+    be passed in to reuse its images and encodings. Returns (written, failed,
+    renders): file counts and the number of rasterizations performed.
+    """
+    encoder = encoder or PngEncoder()
+    targets, metadata = plan_bundle(manifest, platforms)
+    if cache is None:
+        cache = RenderCache(manifest['layers'], pyramid, supersample, redraw, backend)
+    renders = cache.renders
+    cache.plan(targets)
+
+    # Group PNG targets so each (layer, size, mask) is encoded once
+    groups = {}
+    icos = []
+    for target in targets:
+        if target.path.endswith('.ico'):
+            icos.append(target)
+        else:
+            groups.setdefault((target.layer, target.sizes[0], target.mask), []).append(target.path)
+
+    written = failed = 0
+    for (layer, size, mask), paths in groups.items():
+        try:
+            if (layer, size, mask) not in cache.encoded:
+                cache.encoded[layer, size, mask] = encoder.encode(cache.get(layer, size, mask))
+            data, stats = cache.encoded[layer, size, mask]
+        except Exception as e:
+            print(f"[ERROR] Failed: {layer} {size}x{size}: {e}")
+            failed += len(paths)
+            continue
+        print(f"[OK] {layer} {size}x{size}{' ' + mask if mask else ''} ({stats.describe()})")
+        for relative_path in paths:
+            write_file(output_dir, relative_path, data)
+            print(f"       -> {relative_path}")
+            written += 1
+
+    for target in icos:
+        try:
+            frames = [cache.get(target.layer, size) for size in target.sizes]
+            path = os.path.join(output_dir, target.path)
+            with span('save', path=target.path) as traced:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Largest frame first: Pillow skips ICO sizes bigger than the base image
+                frames[-1].save(path, format='ICO', sizes=[(s, s) for s in target.sizes],
+                                append_images=frames[:-1])
+                traced.set(bytes=os.path.getsize(path))
+        except Exception as e:
+            print(f"[ERROR] Failed: {target.path}: {e}")
+            failed += 1
+            continue
+        print(f"[OK] {target.layer} {', '.join(map(str, target.sizes))} -> {target.path}")
+        written += 1
+
+    for relative_path, text in metadata.items():
+        write_file(output_dir, relative_path, text.encode('utf-8'))
+        print(f"[OK] Metadata: {relative_path}")
+        written += 1
+    return written, failed, cache.renders - renders
+
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build every platform's app icons from one manifest.")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help='bundle manifest (default: icon_bundle.json)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_DIR, metavar='DIR',
+                        help='output directory (default: store-assets/icon-bundle)')
+    parser.add_argument('--platform', action='append', choices=sorted(PLATFORMS),
+                        help='only build this platform, repeatable (default: all in the manifest)')
+    add_backend_argument(parser)
+    add_pyramid_arguments(parser)
+    add_encoder_arguments(parser)
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    build_trace.start(args.trace)
+
+    manifest = load_manifest(args.manifest)
+    print(f"Manifest: {args.manifest}")
+    print(f"Output directory: {args.output}")
+    print("-" * 40)
+
+    start = time.perf_counter()
+    written, failed, renders = build_bundle(manifest, args.output, args.platform, encoder_from_args(args),
+                                            args.pyramid, args.supersample, args.redraw, args.backend)
+    print("-" * 40)
+    print(f"[OK] Wrote {written}/{written + failed} files from {renders} renders "
+          f"in {time.perf_counter() - start:.2f}s: {args.output}")
+    build_trace.finish()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Opt-in build tracing for the asset scripts.
+
+Expensive steps are wrapped in ``with span('encode', size=512) as s:``.
+Unless the script was started with --trace, span() hands back one shared
+no-op object, so an untraced build pays a function call and a None check
+per step. While tracing, each span records its wall time, the process's
+peak RSS when it ends and any arguments set on it (s.set(bytes=...) for
+files written). Worker processes trace their jobs into a list that comes
+back with the results and is merged by the parent (see icon_jobs).
+
+finish() writes the spans as Chrome trace JSON, which chrome://tracing and
+https://ui.perfetto.dev open, and prints the costliest span names and
+individual spans. Times are inclusive of nested spans. docs/create_manual.py
+imports this module from here too.
+"""
+from contextlib import contextmanager
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TOP_COSTS = 10
+
+# The running Tracer, or None when tracing is off
+_active = None
+
+def peak_rss_kb():
+    """Return this process's peak resident set size in KiB, if known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+class Tracer:
+    """Collects finished spans as Chrome trace events."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.events = []
+        self.root = None
+
+class Span:
+    """One timed step; the event is recorded when the block exits."""
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.args['peak_rss_kb'] = peak_rss_kb()
+        self.tracer.events.append({
+            'name': self.name, 'cat': self.cat, 'ph': 'X',
+            'ts': self.start / 1000, 'dur': (end - self.start) / 1000,
+            'pid': os.getpid(), 'tid': threading.get_ident(), 'args': self.args,
+        })
+        return False
+
+    def set(self, **args):
+        """Attach values to the span, e.g. bytes=len(data)."""
+        self.args.update(args)
+
+class _NoSpan:
+    """What span() returns when tracing is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+NO_SPAN = _NoSpan()
+
+def span(name, cat='build', **args):
+    """Return a context manager timing one step; a shared no-op unless tracing."""
+    tracer = _active
+    if tracer is None:
+        return NO_SPAN
+    return Span(tracer, name, cat, args)
+
+def enabled():
+    """Return True while tracing."""
+    return _active is not None
+
+# ---------------------------------------------------------------------------
+# Worker processes
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def collect(traced):
+    """Trace the block into a fresh event list when traced, for a worker job.
+
+    Yields the list (None when not traced) to send back to the parent. A
+    forked worker inherits the parent's tracer, so it is swapped out here.
+    """
+    global _active
+    if not traced:
+        yield None
+        return
+    previous, _active = _active, Tracer()
+    try:
+        yield _active.events
+    finally:
+        _active = previous
+
+def merge(events):
+    """Add events traced in a worker process."""
+    if _active is not None and events:
+        _active.events.extend(events)
+
+# ---------------------------------------------------------------------------
+# Script entry points
+# ---------------------------------------------------------------------------
+
+def start(path, name=None):
+    """Start tracing the rest of the script when path is set."""
+    global _active
+    if not path:
+        return
+    _active = Tracer(path)
+    _active.root = Span(_active, name or os.path.basename(sys.argv[0]), 'script',
+                        {'argv': ' '.join(sys.argv[1:])}).__enter__()
+
+def finish(top=TOP_COSTS):
+    """Stop tracing, write the trace file and print the top costs."""
+    global _active
+    tracer = _active
+    if tracer is None:
+        return
+    tracer.root.__exit__(None, None, None)
+    _active = None
+    write_trace(tracer.events, tracer.path)
+    print_summary(tracer.events, top)
+    print(f"Trace: {len(tracer.events)} spans written to {tracer.path}")
+
+def write_trace(events, path):
+    """Write events as a Chrome trace JSON file."""
+    names = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+              'args': {'name': 'main' if pid == os.getpid() else f'worker {pid}'}}
+             for pid in sorted({event['pid'] for event in events})]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': names + events, 'displayTimeUnit': 'ms'}, f)
+
+def _label(event):
+    """Return the span's name with its identifying arguments."""
+    details = [f"{key}={value}" for key, value in event['args'].items()
+               if key not in ('peak_rss_kb', 'bytes', 'argv')]
+    return f"{event['name']} {' '.join(details)}".strip()
+
+def print_summary(events, top=TOP_COSTS):
+    """Print span names by total time, then the slowest single spans."""
+    totals = {}
+    for event in events:
+        entry = totals.setdefault(event['name'], [0, 0.0, 0.0, 0, 0])
+        entry[0] += 1
+        entry[1] += event['dur']
+        entry[2] = max(entry[2], event['dur'])
+        entry[3] += event['args'].get('bytes') or 0
+        entry[4] = max(entry[4], event['args'].get('peak_rss_kb') or 0)
+
+    print()
+    print(f"{'Span':<24} {'count':>6} {'total ms':>10} {'max ms':>9} {'bytes':>12} {'peak MB':>8}")
+    print("-" * 74)
+    for name, (count, total, longest, written, peak) in sorted(totals.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"{name:<24} {count:>6} {total / 1000:>10.1f} {longest / 1000:>9.1f} "
+              f"{(f'{written:,}' if written else '-'):>12} {peak / 1024:>8.1f}")
+    print()
+    print("Slowest spans:")
+    for event in sorted((e for e in events if e['cat'] != 'script'), key=lambda e: -e['dur'])[:top]:
+        print(f"  {event['dur'] / 1000:>9.1f} ms  {_label(event)}")
+
+def add_trace_argument(parser):
+    """Add the --trace option to a parser."""
+    parser.add_argument('--trace', metavar='PATH',
+                        help='record a Chrome trace (JSON) of the build here and print the top costs')
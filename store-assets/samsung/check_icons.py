@@ -0,0 +1,335 @@
+"""
+Golden-image check for the icon scripts.
+
+Renders every committed icon_NxN.png size through create_icon.create_icon()
+and generate_icons.generate_icon() into a scratch directory, then compares
+all of them with the committed files in one batched NumPy pass. Each icon gets
+its max and mean channel error and the number of pixels that differ; icons
+over the tolerance get a diff heatmap (golden | render | heatmap) in
+--diff-dir and the script exits with status 1.
+
+The committed icons are drawn by create_icon.py, so the create_icon targets
+must match them exactly. The cairosvg and resvg targets draw app_icon.svg
+itself, which is never pixel-identical: they run whenever their backend is
+installed and are skipped otherwise, and their errors are only reported
+unless --svg-tolerance is given. generate_icon[pillow] draws the same scene as
+create_icon[numpy] through generate_icons.py and is only run when named.
+Fully transparent pixels compare equal whatever their color channels hold.
+A target named with --target that cannot run fails the check, as does a run
+in which every target was skipped.
+
+When cairosvg is checked, a small SVG with a mask, a pattern and a clip path
+is also drawn at several sizes from one parsed tree and compared with a fresh
+svg2png of each size, since cairosvg rewrites those nodes while drawing.
+
+Run: python check_icons.py [--target NAME ...] [--tolerance N] [--svg-tolerance N] [--png PRESET]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+import numpy as np
+from PIL import Image
+
+import create_icon
+import generate_icons
+from icon_backends import SVG_DPI, BackendUnavailable, SvgSource, get_backend, load_svg
+from png_encode import DEFAULT_PRESET, PRESETS, PngEncoder
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+DEFAULT_DIFF_DIR = '.icon-diffs'
+GOLDEN_PATTERN = re.compile(r'icon_(\d+)x\1\.png$')
+
+# Strip height for the tiled target; small enough that every size is split
+TILE_ROWS = 32
+
+# ---------------------------------------------------------------------------
+# Targets: name -> (kind, option); each writes one icon per size
+# ---------------------------------------------------------------------------
+
+TARGETS = {
+    'create_icon[numpy]': ('create_icon', 'numpy'),
+    'create_icon[draw]': ('create_icon', 'draw'),
+    'create_icon[tiled]': ('tiled', 'numpy'),
+    'generate_icon[pillow]': ('generate_icon', 'pillow'),  # create_icon's scene through generate_icons.py
+    'generate_icon[cairosvg]': ('generate_icon', 'cairosvg'),
+    'generate_icon[resvg]': ('generate_icon', 'resvg'),
+}
+# Targets that draw the SVG rather than the golden scene; report-only without --svg-tolerance
+SVG_TARGETS = ('generate_icon[cairosvg]', 'generate_icon[resvg]')
+DEFAULT_TARGETS = ('create_icon[numpy]', 'create_icon[draw]', 'create_icon[tiled]') + SVG_TARGETS
+
+# Drawn from one parsed tree by the cairosvg reuse check; cairosvg rewrites
+# the mask, pattern and clip path nodes while painting them
+REUSE_NAME = 'cairosvg[tree reuse]'
+REUSE_SIZES = (48, 96, 48)
+REUSE_SVG = b'''<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64" viewBox="0 0 64 64">
+  <defs>
+    <mask id="hole"><rect width="64" height="64" fill="white"/><circle cx="32" cy="32" r="12" fill="black"/></mask>
+    <pattern id="stripes" width="8" height="8" patternUnits="userSpaceOnUse">
+      <rect width="4" height="8" fill="#00a0e0"/>
+    </pattern>
+    <clipPath id="corner"><path d="M0 0 H48 V48 Z"/></clipPath>
+  </defs>
+  <rect width="64" height="64" fill="url(#stripes)" mask="url(#hole)"/>
+  <circle cx="32" cy="32" r="30" fill="#e04000" opacity="0.5" clip-path="url(#corner)"/>
+</svg>
+'''
+
+def target_writer(name, encoder, svg_path):
+    """Return a function writing the target's icon for (size, output_path), or raise BackendUnavailable."""
+    kind, option = TARGETS[name]
+    if kind == 'create_icon':
+        return lambda size, path: create_icon.create_icon(size, path, option, encoder=encoder)
+    if kind == 'tiled':
+        tiled = replace(encoder, tile_rows=TILE_ROWS)
+        return lambda size, path: create_icon.create_icon(size, path, option, encoder=tiled)
+    get_backend(option, [load_svg(svg_path)])
+    return lambda size, path: generate_icons.generate_icon(svg_path, path, size, encoder, option)
+
+def slug(name):
+    """Turn a target name into a file name part, e.g. create_icon[numpy] -> create-icon-numpy."""
+    return re.sub(r'[^a-z0-9]+', '-', name).strip('-')
+
+def find_goldens(golden_dir):
+    """Return {size: path} for the committed icon_NxN.png files, largest first."""
+    goldens = {}
+    for path in glob.glob(os.path.join(golden_dir, 'icon_*.png')):
+        match = GOLDEN_PATTERN.search(os.path.basename(path))
+        if match:
+            goldens[int(match.group(1))] = path
+    return dict(sorted(goldens.items(), reverse=True))
+
+def load_rgba(path):
+    """Decode a PNG to an (h, w, 4) array with fully transparent pixels zeroed."""
+    return rgba_array(Image.open(path))
+
+def rgba_array(image):
+    """Return an image as an (h, w, 4) array with fully transparent pixels zeroed."""
+    pixels = np.asarray(image.convert('RGBA'))
+    return np.where(pixels[..., 3:] == 0, 0, pixels).astype(np.uint8)
+
+def check_tree_reuse(scratch):
+    """Draw REUSE_SVG at each of REUSE_SIZES from one parsed tree and compare with fresh svg2png output.
+
+    Returns (size, max_error, mean_error, differing) per size; raises
+    BackendUnavailable without cairosvg.
+    """
+    backend = get_backend('cairosvg')
+    path = os.path.join(scratch, 'tree_reuse.svg')
+    with open(path, 'wb') as f:
+        f.write(REUSE_SVG)
+    source = SvgSource(path)
+    results = []
+    for size in REUSE_SIZES:
+        reused = rgba_array(backend.rasterize(source, size)).astype(np.int16)
+        png = backend.cairosvg.svg2png(bytestring=REUSE_SVG, dpi=SVG_DPI, output_width=size, output_height=size)
+        fresh = rgba_array(Image.open(io.BytesIO(png)))
+        diff = np.abs(reused - fresh)
+        results.append((size, int(diff.max()), float(diff.mean()), int((diff.max(axis=2) > 0).sum())))
+    return results
+
+# ---------------------------------------------------------------------------
+# Comparison
+# ---------------------------------------------------------------------------
+
+def compare_batch(golden, renders, counts):
+    """Compare every target's renders with the goldens at once.
+
+    ``golden`` is the goldens' pixels concatenated into a (pixels, 4) array
+    and ``renders`` the targets' renders laid out the same way, as a
+    (targets, pixels, 4) array; ``counts`` is each golden's pixel count.
+    Returns (pixel_error, max_error, mean_error, differing): the per-pixel
+    max channel error and, per (target, icon), the max and mean channel error
+    and the number of pixels with any channel off.
+    """
+    diff = np.abs(renders.astype(np.int16) - golden)
+    pixel_error = diff.max(axis=2)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    max_error = np.maximum.reduceat(pixel_error, starts, axis=1)
+    channel_sums = np.add.reduceat(diff.sum(axis=2, dtype=np.int64), starts, axis=1)
+    mean_error = channel_sums / (np.asarray(counts) * 4)
+    differing = np.add.reduceat((pixel_error > 0).astype(np.int64), starts, axis=1)
+    return pixel_error, max_error, mean_error, differing
+
+def heat_colors():
+    """Return a 256-entry black -> red -> yellow -> white color ramp."""
+    t = np.linspace(0, 1, 256)[:, None]
+    return (np.clip(3 * t - np.arange(3), 0, 1) * 255).astype(np.uint8)
+
+def checkerboard(height, width, cell=8):
+    """Return an RGB checkerboard, so transparency shows in the diff panels."""
+    ys, xs = np.indices((height, width))
+    shade = np.where((ys // cell + xs // cell) % 2, 204, 255).astype(np.float32)
+    return np.repeat(shade[..., None], 3, axis=2)
+
+def flatten(rgba, background):
+    """Composite an RGBA array over an RGB background."""
+    alpha = rgba[..., 3:] / 255.0
+    return (rgba[..., :3] * alpha + background * (1 - alpha)).astype(np.uint8)
+
+def save_heatmap(path, golden, render, pixel_error):
+    """Save golden, render and a heatmap of their per-pixel error side by side.
+
+    Unchanged pixels show the golden dimmed; changed ones are colored by their
+    error relative to the largest in the icon.
+    """
+    height, width = pixel_error.shape
+    background = checkerboard(height, width)
+    dimmed = flatten(golden, background) // 4
+    scale = 255.0 / max(1, int(pixel_error.max()))
+    heat = heat_colors()[(pixel_error * scale).astype(np.uint8)]
+    heat = np.where(pixel_error[..., None] > 0, heat, dimmed)
+    panels = np.concatenate([flatten(golden, background), flatten(render, background), heat], axis=1)
+    Image.fromarray(panels, 'RGB').save(path)
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def render_targets(names, sizes, encoder, svg_path, scratch):
+    """Write every target's icons to scratch; return {name: {size: path}} and the skipped targets."""
+    written, skipped = {}, {}
+    for name in names:
+        try:
+            write = target_writer(name, encoder, svg_path)
+        except BackendUnavailable as e:
+            skipped[name] = str(e)
+            continue
+        paths = written[name] = {}
+        for size in sizes:
+            path = os.path.join(scratch, f"{slug(name)}_{size}.png")
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                ok = write(size, path)
+            if not ok:
+                raise RuntimeError(f"{name} failed at {size}px:\n{log.getvalue().strip()}")
+            paths[size] = path
+    return written, skipped
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare freshly rendered icons with the committed ones.")
+    parser.add_argument('--target', action='append', choices=list(TARGETS),
+                        help=f"renderer to check, may be repeated (default: {', '.join(DEFAULT_TARGETS)})")
+    parser.add_argument('--tolerance', type=int, default=0,
+                        help='largest channel error allowed per pixel (default: 0, exact)')
+    parser.add_argument('--svg-tolerance', type=int,
+                        help=f"largest channel error allowed for {', '.join(SVG_TARGETS)} "
+                             '(default: report their errors without failing)')
+    parser.add_argument('--png', choices=PRESETS, default=DEFAULT_PRESET,
+                        help=f'PNG encoding preset the scripts write with (default: {DEFAULT_PRESET})')
+    parser.add_argument('--golden-dir', default=SCRIPT_DIR, help='directory of the golden icon_NxN.png files')
+    parser.add_argument('--diff-dir', help=f'where failing heatmaps are saved (default: {DEFAULT_DIFF_DIR}/ '
+                                           'next to this script)')
+    parser.add_argument('--svg', help='SVG for the generate_icon targets (default: the app icon SVG)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    goldens = find_goldens(args.golden_dir)
+    if not goldens:
+        print(f"Error: no icon_NxN.png files in {args.golden_dir}")
+        return 1
+    names = args.target or list(DEFAULT_TARGETS)
+    svg_path = args.svg or generate_icons.default_svg_path(PROJECT_ROOT)
+    sizes = list(goldens)
+    golden_images = [load_rgba(goldens[size]) for size in sizes]
+    counts = [image.shape[0] * image.shape[1] for image in golden_images]
+    golden = np.concatenate([image.reshape(-1, 4) for image in golden_images])
+
+    with tempfile.TemporaryDirectory() as scratch:
+        written, skipped = render_targets(names, sizes, PngEncoder(args.png), svg_path, scratch)
+        checked = [name for name in names if name in written]
+        reuse = check_tree_reuse(scratch) if 'generate_icon[cairosvg]' in written else ()
+        # Renders of the wrong shape are reported and left equal to the golden
+        renders = np.broadcast_to(golden, (len(checked),) + golden.shape).copy()
+        renders_by_icon, wrong_shape = {}, {}
+        offset = 0
+        for i, (size, count) in enumerate(zip(sizes, counts)):
+            for t, name in enumerate(checked):
+                image = load_rgba(written[name][size])
+                if image.shape != golden_images[i].shape:
+                    wrong_shape[name, size] = image.shape
+                    continue
+                renders[t, offset:offset + count] = image.reshape(-1, 4)
+                renders_by_icon[name, size] = image
+            offset += count
+
+    pixel_error, max_error, mean_error, differing = compare_batch(golden, renders, counts)
+
+    print(f"{'Target':<24} {'Size':>5} {'max err':>8} {'mean err':>9} {'differing':>10}")
+    print("-" * 62)
+    failures = []
+    for t, name in enumerate(checked):
+        tolerance = args.svg_tolerance if name in SVG_TARGETS else args.tolerance
+        offset = 0
+        for i, (size, count) in enumerate(zip(sizes, counts)):
+            if (name, size) in wrong_shape and tolerance is None:
+                print(f"{name:<24} {size:>5} rendered {wrong_shape[name, size]}, "
+                      f"golden {golden_images[i].shape}  info")
+            elif (name, size) in wrong_shape:
+                print(f"{name:<24} {size:>5} FAIL rendered {wrong_shape[name, size]}, "
+                      f"golden {golden_images[i].shape}")
+                failures.append((name, size, None))
+            else:
+                failed = tolerance is not None and max_error[t, i] > tolerance
+                status = 'info' if tolerance is None else 'FAIL' if failed else 'ok'
+                print(f"{name:<24} {size:>5} {max_error[t, i]:>8} {mean_error[t, i]:>9.4f} "
+                      f"{differing[t, i]:>10}  {status}")
+                if failed:
+                    height, width = golden_images[i].shape[:2]
+                    errors = pixel_error[t, offset:offset + count].reshape(height, width)
+                    failures.append((name, size, errors))
+            offset += count
+    for size, max_err, mean_err, count in reuse:
+        print(f"{REUSE_NAME:<24} {size:>5} {max_err:>8} {mean_err:>9.4f} {count:>10}  {'FAIL' if count else 'ok'}")
+    reuse_failures = [size for size, _, _, count in reuse if count]
+    for name, reason in skipped.items():
+        print(f"{name:<24} skipped ({reason.splitlines()[0]})")
+    print("-" * 62)
+
+    if args.target and skipped:
+        print(f"[FAIL] {', '.join(skipped)} could not run; install the backend or leave the target out")
+        return 1
+    if not checked:
+        print("[FAIL] every target was skipped, so nothing was compared")
+        return 1
+
+    reported = [name for name in checked if name in SVG_TARGETS and args.svg_tolerance is None]
+    total = (len(checked) - len(reported)) * len(sizes)
+    elapsed = time.perf_counter() - start
+    if not failures and not reuse_failures:
+        if reported:
+            note = f", {len(reported) * len(sizes)} SVG renders reported only"
+        elif any(name in SVG_TARGETS for name in checked):
+            note = f", SVG targets {args.svg_tolerance}"
+        else:
+            note = ''
+        print(f"[OK] {total} icons match {len(sizes)} goldens (tolerance {args.tolerance}{note}) "
+              f"in {elapsed:.2f} s")
+        return 0
+
+    if reuse_failures:
+        print(f"[FAIL] {REUSE_NAME}: sizes {', '.join(map(str, reuse_failures))} differ from a fresh svg2png")
+    if failures:
+        diff_dir = args.diff_dir or os.path.join(SCRIPT_DIR, DEFAULT_DIFF_DIR)
+        os.makedirs(diff_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(diff_dir, 'diff_*.png')):
+            os.remove(stale)
+        for name, size, errors in failures:
+            if errors is None:
+                continue
+            path = os.path.join(diff_dir, f"diff_{slug(name)}_{size}.png")
+            save_heatmap(path, golden_images[sizes.index(size)], renders_by_icon[name, size], errors)
+        print(f"[FAIL] {len(failures)}/{total} icons differ from the goldens; heatmaps in {diff_dir}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
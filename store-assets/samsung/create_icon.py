@@ -1,130 +1,185 @@
 """
 Create app icon using PIL (no Cairo dependency).
+The artwork itself is described in icon_scene.py.
 """
-from PIL import Image, ImageDraw
+from PIL import __version__ as PILLOW_VERSION
+from functools import partial
+import argparse
 import os
+import sys
 
-def create_icon(size, output_path):
+import build_trace
+import icon_pyramid
+import icon_scene
+from build_trace import add_trace_argument, span
+from icon_cache import DEFAULT_CACHE_DIR, IconCache, add_cache_arguments, cache_keys, file_digest
+from icon_jobs import add_worker_argument, run_jobs
+from icon_pyramid import DEFAULT_SUPERSAMPLE, add_pyramid_arguments, build_icons
+from png_encode import PngEncoder, add_encoder_arguments, add_tile_argument, encoder_from_args
+from icon_scene import VARIANTS, SceneRenderer, compile_scene, default_engine, rasterize
+
+def render_icon(size, engine=None, variant='default'):
+    """Render the icon (or one of its VARIANTS) as an RGBA image using the given engine."""
+    with span('render', size=size, variant=variant):
+        variant = VARIANTS[variant]
+        if variant.overlays:
+            return SceneRenderer(engine).render(variant, size)
+        return rasterize(compile_scene(variant.scene, size), engine)
+
+def render_strips(size, rows, engine=None, variant='default'):
+    """Return a function yielding the icon as RGBA strips of rows rows (see PngEncoder.save_strips)."""
+    renderer = SceneRenderer(engine)
+    return lambda: renderer.strips(VARIANTS[variant], size, rows)
+
+def save_icon(img, output_path, encoder=None):
+    """Encode and save a rendered icon and report it."""
+    stats = (encoder or PngEncoder()).save(img, output_path)
+    print(f"[OK] Created: {output_path} ({img.width}x{img.height}, {stats.describe()})")
+
+def save_icon_strips(size, output_path, engine, variant, encoder):
+    """Render and save an icon strip by strip and report it."""
+    with span('render', size=size, variant=variant, tile_rows=encoder.tile_rows):
+        strips = render_strips(size, encoder.tile_rows, engine, variant)
+        stats = encoder.save_strips(strips, size, size, output_path)
+    print(f"[OK] Created: {output_path} ({size}x{size}, {stats.describe()})")
+
+def create_icon(size, output_path, engine=None, variant='default', encoder=None):
     """Create a barcode scanner icon at the specified size."""
-    
-    # Create image with teal gradient background
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Background gradient (teal to dark teal)
-    for y in range(size):
-        # Gradient from #00838F to #004D54
-        r = int(0 + (0 - 0) * y / size)
-        g = int(131 - (131 - 77) * y / size)
-        b = int(143 - (143 - 84) * y / size)
-        draw.line([(0, y), (size, y)], fill=(r, g, b, 255))
-    
-    # Calculate proportions
-    margin = int(size * 0.12)
-    bar_area_top = int(size * 0.20)
-    bar_area_bottom = int(size * 0.65)
-    bar_area_height = bar_area_bottom - bar_area_top
-    
-    # Draw barcode bars (white)
-    bar_positions = [0.15, 0.22, 0.28, 0.35, 0.42, 0.48, 0.55, 0.62, 0.68, 0.75, 0.82]
-    bar_widths = [0.03, 0.02, 0.04, 0.02, 0.03, 0.02, 0.04, 0.02, 0.03, 0.02, 0.03]
-    
-    for pos, width in zip(bar_positions, bar_widths):
-        x = int(size * pos)
-        w = int(size * width)
-        draw.rectangle(
-            [x, bar_area_top, x + w, bar_area_bottom],
-            fill=(255, 255, 255, 240)
-        )
-    
-    # Scanner frame corners (cyan)
-    corner_color = (0, 229, 255, 255)
-    corner_length = int(size * 0.12)
-    corner_thickness = int(size * 0.02)
-    
-    frame_left = margin
-    frame_right = size - margin
-    frame_top = int(size * 0.12)
-    frame_bottom = int(size * 0.72)
-    
-    # Top-left corner
-    draw.rectangle([frame_left, frame_top, frame_left + corner_length, frame_top + corner_thickness], fill=corner_color)
-    draw.rectangle([frame_left, frame_top, frame_left + corner_thickness, frame_top + corner_length], fill=corner_color)
-    
-    # Top-right corner
-    draw.rectangle([frame_right - corner_length, frame_top, frame_right, frame_top + corner_thickness], fill=corner_color)
-    draw.rectangle([frame_right - corner_thickness, frame_top, frame_right, frame_top + corner_length], fill=corner_color)
-    
-    # Bottom-left corner
-    draw.rectangle([frame_left, frame_bottom - corner_thickness, frame_left + corner_length, frame_bottom], fill=corner_color)
-    draw.rectangle([frame_left, frame_bottom - corner_length, frame_left + corner_thickness, frame_bottom], fill=corner_color)
-    
-    # Bottom-right corner
-    draw.rectangle([frame_right - corner_length, frame_bottom - corner_thickness, frame_right, frame_bottom], fill=corner_color)
-    draw.rectangle([frame_right - corner_thickness, frame_bottom - corner_length, frame_right, frame_bottom], fill=corner_color)
-    
-    # Scanning line (red)
-    scan_line_y = int(size * 0.42)
-    scan_line_height = int(size * 0.015)
-    draw.rectangle(
-        [frame_left, scan_line_y, frame_right, scan_line_y + scan_line_height],
-        fill=(255, 82, 82, 255)
-    )
-    
-    # Box icon at bottom left
-    box_size = int(size * 0.10)
-    box_x = int(size * 0.35)
-    box_y = int(size * 0.78)
-    draw.rectangle(
-        [box_x, box_y, box_x + box_size, box_y + box_size],
-        fill=(255, 255, 255, 230),
-        outline=(0, 131, 143, 255),
-        width=2
-    )
-    # Box top fold
-    draw.polygon(
-        [(box_x + 2, box_y + box_size//3), 
-         (box_x + box_size//2, box_y + 2), 
-         (box_x + box_size - 2, box_y + box_size//3)],
-        fill=(0, 131, 143, 200)
-    )
-    
-    # Checkmark circle at bottom right
-    check_x = int(size * 0.55)
-    check_y = int(size * 0.78)
-    check_size = int(size * 0.10)
-    draw.ellipse(
-        [check_x, check_y, check_x + check_size, check_y + check_size],
-        fill=(76, 175, 80, 255)
-    )
-    # Checkmark
-    check_points = [
-        (check_x + check_size * 0.25, check_y + check_size * 0.5),
-        (check_x + check_size * 0.42, check_y + check_size * 0.68),
-        (check_x + check_size * 0.75, check_y + check_size * 0.32)
-    ]
-    draw.line(check_points[:2], fill=(255, 255, 255, 255), width=max(2, int(size * 0.02)))
-    draw.line(check_points[1:], fill=(255, 255, 255, 255), width=max(2, int(size * 0.02)))
-    
-    # Save
-    img.save(output_path, 'PNG')
-    print(f"[OK] Created: {output_path} ({size}x{size})")
+    try:
+        with span('icon', size=size, variant=variant):
+            if encoder is not None and encoder.tile_rows:
+                save_icon_strips(size, output_path, engine, variant, encoder)
+            else:
+                save_icon(render_icon(size, engine, variant), output_path, encoder)
+        return True
+    except Exception as e:
+        print(f"[ERROR] Failed: {output_path}: {e}")
+        return False
+
+def create_icon_variants(size, outputs, engine=None, encoder=None):
+    """Create one size of several variants from a shared base raster.
 
-def main():
+    ``outputs`` is a list of (variant, output_path). Returns a success flag per output.
+    With ``encoder.tile_rows`` each variant is rendered in strips instead.
+    """
+    if encoder is not None and encoder.tile_rows:
+        return [create_icon(size, output_path, engine, variant, encoder) for variant, output_path in outputs]
+    renderer = SceneRenderer(engine)
+    results = []
+    for variant, output_path in outputs:
+        try:
+            with span('icon', size=size, variant=variant):
+                with span('render', size=size, variant=variant):
+                    img = renderer.render(VARIANTS[variant], size)
+                save_icon(img, output_path, encoder)
+            results.append(True)
+        except Exception as e:
+            print(f"[ERROR] Failed: {output_path}: {e}")
+            results.append(False)
+    return results
+
+def create_icon_set(outputs, engine=None, supersample=DEFAULT_SUPERSAMPLE, redraw=(), master_edge=None,
+                    variant='default', encoder=None):
+    """Create every (output_path, size) from one supersampled master.
+
+    Returns a success flag per output.
+    """
+    paths = {size: output_path for output_path, size in outputs}
+    render = partial(render_icon, engine=engine, variant=variant)
+    done = set()
+    try:
+        with span('icon_set', variant=variant, sizes=len(paths)):
+            for size, img in build_icons(render, list(paths), supersample, redraw, master_edge):
+                with span('icon', size=size, variant=variant):
+                    save_icon(img, paths[size], encoder)
+                done.add(size)
+    except Exception as e:
+        print(f"[ERROR] Failed: {e}")
+    return [size in done for _, size in outputs]
+
+def renderer_version(engine=None, variant='default'):
+    """Identify the drawing code, so any change to it invalidates the cache."""
+    if engine is None:
+        engine = default_engine()
+    modules = [__file__, icon_scene.__file__, icon_pyramid.__file__]
+    if icon_scene.icon_raster is not None:
+        modules.append(icon_scene.icon_raster.__file__)
+    return f"create_icon/{variant}/{engine}/pillow-{PILLOW_VERSION}/{file_digest(modules)}"
+
+def icon_filename(size, variant):
+    """Return the output file name of a variant at a size."""
+    if variant == 'default':
+        return f"icon_{size}x{size}.png"
+    return f"icon_{size}x{size}_{variant}.png"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create app icons using PIL.")
+    parser.add_argument('--engine', choices=['numpy', 'draw'],
+                        help='render engine (default: numpy when installed)')
+    parser.add_argument('--variant', action='append', choices=sorted(VARIANTS),
+                        help='variant to create, may be repeated (default: default)')
+    parser.add_argument('--size', type=int, action='append', dest='sizes',
+                        help='icon size to create, may be repeated (default: 512 down to 48)')
+    add_pyramid_arguments(parser)
+    add_worker_argument(parser)
+    add_cache_arguments(parser)
+    add_encoder_arguments(parser)
+    add_tile_argument(parser)
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    if args.pyramid and args.tile_rows:
+        parser.error("--tile-rows cannot be combined with --pyramid, which resamples whole images")
+    encoder = encoder_from_args(args)
+    build_trace.start(args.trace)
+    
     script_dir = os.path.dirname(os.path.abspath(__file__))
+    cache = IconCache(args.cache_dir or os.path.join(script_dir, DEFAULT_CACHE_DIR), args.force)
+    variants = args.variant or ['default']
     
     # Create icons at various sizes
-    sizes = [512, 256, 192, 144, 128, 96, 72, 48]
+    sizes = args.sizes or [512, 256, 192, 144, 128, 96, 72, 48]
     
     print("Creating app icons...")
     print("-" * 40)
     
-    for size in sizes:
-        output_path = os.path.join(script_dir, f"icon_{size}x{size}.png")
-        create_icon(size, output_path)
-    
+    cached_count = 0
+    pending = {}
+    master_edge = None
+    for variant in variants:
+        outputs = [(os.path.join(script_dir, icon_filename(size, variant)), size) for size in sizes]
+        keyed, master_edge = cache_keys(outputs, '', renderer_version(args.engine, variant), args)
+        count, pending[variant] = cache.partition(keyed)
+        cached_count += count
+    
+    if args.pyramid:
+        # One master feeds every size of a variant, so each variant is a single job
+        jobs = [([(output_path, size) for output_path, size, _ in pending[variant]],
+                 args.engine, args.supersample, args.redraw, master_edge, variant, encoder)
+                for variant in variants if pending[variant]]
+        done = [(output_path, key) for variant in variants for output_path, _, key in pending[variant]]
+        results = [ok for flags in run_jobs(create_icon_set, jobs, args.workers) for ok in flags]
+    else:
+        # Variants of one size share their base raster, so each size is a single job
+        by_size = {}
+        for variant in variants:
+            for output_path, size, key in pending[variant]:
+                by_size.setdefault(size, []).append((variant, output_path, key))
+        jobs = [(size, [(variant, output_path) for variant, output_path, _ in by_size[size]], args.engine, encoder)
+                for size in sizes if size in by_size]
+        done = [(output_path, key) for size in sizes for _, output_path, key in by_size.get(size, [])]
+        results = [ok for flags in run_jobs(create_icon_variants, jobs, args.workers) for ok in flags]
+    
+    for (output_path, key), ok in zip(done, results):
+        if ok:
+            cache.store(output_path, key)
+    cache.save()
+    
+    success_count = cached_count + sum(results)
+    total = len(sizes) * len(variants)
     print("-" * 40)
-    print(f"[OK] All icons created in: {script_dir}")
+    print(f"[OK] Created {success_count}/{total} icons in: {script_dir} ({cached_count} cached)")
+    build_trace.finish()
+    return 0 if success_count == total else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
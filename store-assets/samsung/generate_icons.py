@@ -1,60 +1,152 @@
 """
 Generate app store icons from SVG source.
-Run: pip install cairosvg pillow
+Run: pip install cairosvg pillow (or use --backend pillow, or resvg on PATH)
 Then: python generate_icons.py
 """
 
+import argparse
 import os
 import sys
+import time
 
-try:
-    from PIL import Image
-    import cairosvg
-    from io import BytesIO
-except ImportError:
-    print("Installing required packages...")
-    os.system("pip install cairosvg pillow")
-    from PIL import Image
-    import cairosvg
-    from io import BytesIO
+from PIL import __version__ as PILLOW_VERSION
 
-def generate_icon(svg_path, output_path, size):
+import build_trace
+import icon_backends
+import icon_pyramid
+from build_trace import add_trace_argument, span
+from icon_backends import BackendUnavailable, add_backend_argument, get_backend, load_svg
+from icon_cache import DEFAULT_CACHE_DIR, IconCache, add_cache_arguments, cache_keys, file_digest
+from icon_jobs import add_worker_argument, run_jobs
+from icon_pyramid import IconPyramid, add_pyramid_arguments, master_size
+from png_encode import PngEncoder, add_encoder_arguments, add_tile_argument, encoder_from_args
+
+def rasterize(svg_path, size, backend=None):
+    """Rasterize the SVG to an RGBA image of size x size."""
+    source = load_svg(svg_path)
+    rasterizer = get_backend(backend, [source])
+    with span('rasterize', backend=rasterizer.name, size=size, source=source.name):
+        return rasterizer.rasterize(source, size)
+
+def save_icon(img, output_path, encoder=None):
+    """Encode and save a rasterized icon and report it."""
+    stats = (encoder or PngEncoder()).save(img, output_path)
+    print(f"✓ Generated: {output_path} ({img.width}x{img.height}, {stats.describe()})")
+
+def save_icon_strips(svg_path, output_path, size, encoder, backend=None):
+    """Rasterize the SVG and save it strip by strip, as far as the backend allows, and report it."""
+    source = load_svg(svg_path)
+    rasterizer = get_backend(backend, [source])
+    with span('rasterize', backend=rasterizer.name, size=size, source=source.name, tile_rows=encoder.tile_rows):
+        strips = rasterizer.strips(source, size, encoder.tile_rows)
+        stats = encoder.save_strips(strips, size, size, output_path)
+    print(f"✓ Generated: {output_path} ({size}x{size}, {stats.describe()})")
+
+def generate_icon(svg_path, output_path, size, encoder=None, backend=None):
     """Convert SVG to PNG at specified size"""
     try:
-        # Convert SVG to PNG bytes
-        png_data = cairosvg.svg2png(
-            url=svg_path,
-            output_width=size,
-            output_height=size
-        )
-        
-        # Open with PIL and save
-        img = Image.open(BytesIO(png_data))
-        img = img.convert('RGBA')
-        img.save(output_path, 'PNG')
-        print(f"✓ Generated: {output_path} ({size}x{size})")
+        with span('icon', size=size, path=os.path.basename(output_path)):
+            if encoder is not None and encoder.tile_rows:
+                save_icon_strips(svg_path, output_path, size, encoder, backend)
+            else:
+                save_icon(rasterize(svg_path, size, backend), output_path, encoder)
         return True
     except Exception as e:
         print(f"✗ Error generating {output_path}: {e}")
         return False
 
-def main():
-    # Paths
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(script_dir))
+def generate_icon_set(svg_path, outputs, supersample, redraw=(), master_edge=None, encoder=None, backend=None):
+    """Generate every (output_path, size) from one supersampled rasterization.
+
+    Returns a success flag per output. Sizes in ``redraw`` are rasterized
+    directly from the SVG instead of being downsampled.
+    """
+    if master_edge is None:
+        master_edge = master_size([s for _, s in outputs if s not in redraw] or [1], supersample)
+    
+    pyramid = None
+    results = []
+    for output_path, size in outputs:
+        if size in redraw:
+            results.append(generate_icon(svg_path, output_path, size, encoder, backend))
+            continue
+        try:
+            with span('icon', size=size, path=os.path.basename(output_path)):
+                if pyramid is None:
+                    pyramid = IconPyramid(rasterize(svg_path, master_edge, backend))
+                save_icon(pyramid.get(size), output_path, encoder)
+            results.append(True)
+        except Exception as e:
+            print(f"✗ Error generating {output_path}: {e}")
+            results.append(False)
+    return results
+
+def renderer_version(backend):
+    """Identify the rasterizer and this script, so changes to either invalidate the cache."""
+    code = file_digest([__file__, icon_backends.__file__, icon_pyramid.__file__])
+    return f"generate_icons/{backend.name}-{backend.version()}/pillow-{PILLOW_VERSION}/{code}"
+
+def default_svg_path(project_root):
+    """Return the app icon SVG, falling back to the adaptive icon foreground."""
     svg_path = os.path.join(project_root, "AcumaticaInventoryScanner", "Resources", "Images", "app_icon.svg")
     
     # Alternative SVG path
     if not os.path.exists(svg_path):
         svg_path = os.path.join(project_root, "AcumaticaInventoryScanner", "Resources", "AppIcon", "appiconfg.svg")
+    return svg_path
+
+def output_filename(filename, source, suffixed):
+    """Name an output, adding the source name when several sources are built."""
+    if not suffixed:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{source.name}{ext}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate app store icons from SVG source.")
+    parser.add_argument('--svg', action='append', metavar='PATH',
+                        help='SVG source, repeatable; several sources get suffixed file names '
+                             '(default: app_icon.svg)')
+    parser.add_argument('--size', type=int, action='append', dest='sizes',
+                        help='icon size to generate, repeatable (default: the Galaxy Store sizes)')
+    add_backend_argument(parser)
+    add_pyramid_arguments(parser)
+    add_worker_argument(parser)
+    add_cache_arguments(parser)
+    add_encoder_arguments(parser)
+    add_tile_argument(parser)
+    add_trace_argument(parser)
+    args = parser.parse_args(argv)
+    if args.pyramid and args.tile_rows:
+        parser.error("--tile-rows cannot be combined with --pyramid, which resamples whole images")
+    encoder = encoder_from_args(args)
+    build_trace.start(args.trace)
+    
+    # Paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+    svg_paths = args.svg or [default_svg_path(project_root)]
     
-    print(f"Source SVG: {svg_path}")
+    for svg_path in svg_paths:
+        print(f"Source SVG: {svg_path}")
     print(f"Output directory: {script_dir}")
     print()
     
-    if not os.path.exists(svg_path):
-        print(f"Error: SVG file not found at {svg_path}")
+    for svg_path in svg_paths:
+        if not os.path.exists(svg_path):
+            print(f"Error: SVG file not found at {svg_path}")
+            sys.exit(1)
+    
+    sources = [load_svg(svg_path) for svg_path in svg_paths]
+    start = time.perf_counter()
+    try:
+        backend = get_backend(args.backend, sources)
+        renderer = renderer_version(backend)
+    except BackendUnavailable as e:
+        print(f"Error: {e}")
         sys.exit(1)
+    print(f"Rasterizer: {backend.name} (loaded in {(time.perf_counter() - start) * 1000:.0f} ms)")
+    print()
     
     # Required icon sizes for Samsung Galaxy Store
     sizes = {
@@ -66,24 +158,57 @@ def main():
         "icon_72x72.png": 72,
         "icon_48x48.png": 48,
     }
+    if args.sizes:
+        sizes = {f"icon_{size}x{size}.png": size for size in args.sizes}
     
     print("Generating icons...")
     print("-" * 40)
     
-    success_count = 0
-    for filename, size in sizes.items():
-        output_path = os.path.join(script_dir, filename)
-        if generate_icon(svg_path, output_path, size):
-            success_count += 1
+    cache = IconCache(args.cache_dir or os.path.join(script_dir, DEFAULT_CACHE_DIR), args.force)
+    
+    cached_count = 0
+    pending_by_source = []
+    for source in sources:
+        outputs = [(os.path.join(script_dir, output_filename(filename, source, len(sources) > 1)), size)
+                   for filename, size in sizes.items()]
+        keyed, master_edge = cache_keys(outputs, source.digest, renderer, args)
+        cached, pending = cache.partition(keyed)
+        cached_count += cached
+        if pending:
+            pending_by_source.append((source.path, pending, master_edge))
+    
+    pending = [entry for _, source_pending, _ in pending_by_source for entry in source_pending]
+    if args.pyramid:
+        # One master feeds every size of a source, so each source is a single job
+        jobs = [(svg_path, [(output_path, size) for output_path, size, _ in source_pending],
+                 args.supersample, args.redraw, master_edge, encoder, backend.name)
+                for svg_path, source_pending, master_edge in pending_by_source]
+        results = [ok for source_results in run_jobs(generate_icon_set, jobs, args.workers)
+                   for ok in source_results]
+    else:
+        jobs = [(svg_path, output_path, size, encoder, backend.name)
+                for svg_path, source_pending, _ in pending_by_source
+                for output_path, size, _ in source_pending]
+        results = run_jobs(generate_icon, jobs, args.workers)
+    
+    for (output_path, _, key), ok in zip(pending, results):
+        if ok:
+            cache.store(output_path, key)
+    cache.save()
     
+    total = len(sizes) * len(sources)
+    success_count = cached_count + sum(results)
     print("-" * 40)
-    print(f"Generated {success_count}/{len(sizes)} icons")
+    print(f"Generated {success_count}/{total} icons ({cached_count} cached)")
+    build_trace.finish()
     
     if success_count == 0:
-        print("\nNote: If cairosvg fails, you can manually convert the SVG using:")
+        print(f"\nNote: If {backend.name} fails, you can manually convert the SVG using:")
         print("  - Online converter: https://cloudconvert.com/svg-to-png")
         print("  - Inkscape: File > Export PNG Image")
-        print(f"\nSource SVG: {svg_path}")
+        for svg_path in svg_paths:
+            print(f"\nSource SVG: {svg_path}")
+    return 0 if success_count == total else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
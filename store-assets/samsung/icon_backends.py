@@ -0,0 +1,318 @@
+"""
+Rasterizer backends for the SVG icon scripts.
+
+    resvg     the resvg command-line renderer, when it is on PATH
+    cairosvg  cairosvg, which needs the Cairo C library
+    pillow    the Pillow scene from icon_scene.py; ignores the SVG and draws
+              the built-in create_icon artwork in place of app_icon.svg
+
+``auto`` picks the first available backend in FASTEST_FIRST that can draw
+every source. pillow is never picked automatically, since its artwork is not
+the SVG's; it only runs when named, and warns that it is drawing the scene.
+Backend libraries are imported only when a backend is checked or used, and
+nothing is installed at runtime: an unavailable backend raises
+BackendUnavailable with the command that would provide it.
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # NumPy not installed, decode through cairo's PNG writer
+    np = None
+
+# resvg is a native renderer; cairosvg walks the tree in Python. The Pillow
+# scene is left out: it draws create_icon's artwork, not the SVG.
+FASTEST_FIRST = ('resvg', 'cairosvg')
+AUTO = 'auto'
+
+# CSS pixels per inch cairosvg assumes, as in svg2png
+SVG_DPI = 96
+
+class BackendUnavailable(ImportError):
+    """The requested backend cannot run in this environment."""
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+class SvgSource:
+    """An SVG file read once; backends keep their parsed form in ``parsed``."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.digest = hashlib.sha256(self.data).hexdigest()
+        self.parsed = {}
+
+    @property
+    def name(self):
+        """The file name without extension, used to tell outputs apart."""
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+# Sources loaded in this process; worker processes fill their own
+_SOURCES = {}
+
+def load_svg(svg_path):
+    """Return the SvgSource for a path, reading it at most once per process."""
+    st = os.stat(svg_path)
+    token = (os.path.abspath(svg_path), st.st_size, st.st_mtime_ns)
+    source = _SOURCES.get(token)
+    if source is None:
+        source = _SOURCES[token] = SvgSource(svg_path)
+    return source
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class Backend(ABC):
+    """Base class: a named way of turning an SvgSource into an RGBA image."""
+    name = None
+    install_hint = None
+
+    def __init__(self):
+        self._checked = None
+
+    def available(self):
+        """Return True if the backend can run; the check runs once."""
+        if self._checked is None:
+            try:
+                self._load()
+                self._checked = True
+            except (ImportError, OSError):
+                self._checked = False
+        return self._checked
+
+    def require(self):
+        """Raise BackendUnavailable unless the backend can run."""
+        if not self.available():
+            raise BackendUnavailable(f"Rasterizer backend '{self.name}' is not available; {self.install_hint}")
+
+    def supports(self, source):
+        """Return True if the backend can draw this source."""
+        return True
+
+    @abstractmethod
+    def _load(self):
+        """Import or locate the renderer; raise ImportError or OSError if it is missing."""
+
+    @abstractmethod
+    def version(self):
+        """Identify the backend build, so upgrades invalidate cached icons."""
+
+    @abstractmethod
+    def rasterize(self, source, size):
+        """Rasterize the source to an RGBA image of size x size."""
+
+    def strips(self, source, size, rows):
+        """Return a function yielding the rasterized source as RGBA strips of ``rows`` rows.
+
+        The function can be called more than once. This default rasterizes
+        the whole image up front; backends that can do better override it.
+        """
+        if np is None:
+            raise RuntimeError("Tiled rendering needs NumPy")
+        pixels = np.asarray(self.rasterize(source, size))
+        return lambda: (pixels[top:top + rows] for top in range(0, size, rows))
+
+class CairoSvgBackend(Backend):
+    """cairosvg, drawing each size from one parsed tree.
+
+    cairosvg writes back onto the parsed nodes while drawing: computed
+    attributes, cached vertices and image sizes, and the tags of masks and
+    patterns, which it turns into groups to paint them. Every node's
+    attributes and instance state (tag included) are snapshotted after
+    parsing and put back before each render; each size then draws from a
+    pristine tree.
+    """
+    name = 'cairosvg'
+    install_hint = "run: pip install cairosvg (and install the Cairo library)"
+
+    def _load(self):
+        import cairosvg
+        self.cairosvg = cairosvg
+
+    def version(self):
+        self.require()
+        return self.cairosvg.__version__
+
+    def tree(self, source):
+        """Return the source's parsed tree, parsing on first use and resetting after."""
+        parsed = source.parsed.get(self.name)
+        if parsed is None:
+            tree = self.cairosvg.parser.Tree(bytestring=source.data, url=source.path)
+            parsed = source.parsed[self.name] = (tree, [(node, dict(node), dict(vars(node)))
+                                                        for node in _walk(tree)])
+        else:
+            for node, attributes, state in parsed[1]:
+                node.clear()
+                node.update(attributes)
+                vars(node).clear()
+                vars(node).update(state)
+        return parsed[0]
+
+    def rasterize(self, source, size):
+        self.require()
+        surface = self.cairosvg.surface.PNGSurface(self.tree(source), None, SVG_DPI,
+                                                   output_width=size, output_height=size)
+        return surface_image(surface.cairo)
+
+    def strips(self, source, size, rows):
+        # cairosvg draws whole surfaces; strips are converted from its buffer
+        # one at a time, so no RGBA copy of the full image is made
+        if np is None:
+            raise RuntimeError("Tiled rendering needs NumPy")
+        self.require()
+        surface = self.cairosvg.surface.PNGSurface(self.tree(source), None, SVG_DPI,
+                                                   output_width=size, output_height=size)
+        return lambda: surface_strips(surface.cairo, rows)
+
+def _walk(node):
+    yield node
+    for child in node.children:
+        yield from _walk(child)
+
+def surface_image(cairo_surface):
+    """Convert a drawn cairo ARGB32 surface to an RGBA image.
+
+    The pixel buffer is read in place and un-premultiplied with cairo's own
+    rounding, so the result matches what cairo's PNG writer would have
+    produced without compressing and decompressing a PNG in between.
+    """
+    cairo_surface.flush()
+    if np is None:
+        buf = BytesIO()
+        cairo_surface.write_to_png(buf)
+        buf.seek(0)
+        return Image.open(buf).convert('RGBA')
+    return Image.fromarray(unpremultiply(surface_words(cairo_surface)), 'RGBA')
+
+def surface_words(cairo_surface):
+    """Return the (height, width) uint32 view of a cairo ARGB32 surface's pixels."""
+    # ARGB32 pixels are native-endian words: alpha in the top byte
+    width, height = cairo_surface.get_width(), cairo_surface.get_height()
+    stride = cairo_surface.get_stride()
+    words = np.frombuffer(cairo_surface.get_data(), dtype=np.uint32)
+    return words.reshape(height, stride // 4)[:, :width]
+
+def unpremultiply(words):
+    """Convert premultiplied ARGB32 words to a (height, width, 4) RGBA array."""
+    alpha = words >> 24
+    rgba = np.empty(words.shape + (4,), dtype=np.uint8)
+    rgba[..., 3] = alpha
+    # Same rounding as cairo's unpremultiply_data(); premultiplied channels
+    # never exceed alpha, so fully transparent pixels come out as 0
+    half, divisor = alpha // 2, np.maximum(alpha, 1)
+    for channel, shift in enumerate((16, 8, 0)):
+        rgba[..., channel] = (((words >> shift) & 0xFF) * 255 + half) // divisor
+    return rgba
+
+def surface_strips(cairo_surface, rows):
+    """Yield a drawn cairo surface as RGBA arrays of ``rows`` rows, converting one strip at a time."""
+    cairo_surface.flush()
+    words = surface_words(cairo_surface)
+    for top in range(0, len(words), rows):
+        yield unpremultiply(words[top:top + rows])
+
+class ResvgBackend(Backend):
+    """The resvg command-line renderer, one process per size."""
+    name = 'resvg'
+    install_hint = "install resvg (e.g. cargo install resvg) and put it on PATH"
+    _version = None
+
+    def _load(self):
+        self.executable = shutil.which('resvg')
+        if self.executable is None:
+            raise OSError("resvg not found on PATH")
+
+    def version(self):
+        self.require()
+        if self._version is None:
+            result = subprocess.run([self.executable, '--version'], capture_output=True, text=True, check=True)
+            self._version = result.stdout.strip()
+        return self._version
+
+    def rasterize(self, source, size):
+        self.require()
+        # -c writes the PNG to stdout; the SVG is read from stdin
+        result = subprocess.run(
+            [self.executable, '--width', str(size), '--height', str(size),
+             '--resources-dir', os.path.dirname(os.path.abspath(source.path)), '-', '-c'],
+            input=source.data, capture_output=True, check=True
+        )
+        img = Image.open(BytesIO(result.stdout))
+        return img.convert('RGBA')
+
+class PillowBackend(Backend):
+    """The icon_scene artwork, standing in for the SVGs it was drawn from."""
+    name = 'pillow'
+    install_hint = "run: pip install pillow"
+
+    # SVG file name (without extension) -> icon_scene variant that draws it
+    SCENES = {'app_icon': 'default'}
+    _warned = False
+
+    def _load(self):
+        import create_icon
+        self.create_icon = create_icon
+
+    def scene(self, source):
+        """Return the variant standing in for the source, warning once that the SVG is not read."""
+        self.require()
+        if not self.supports(source):
+            raise ValueError(f"The pillow backend has no scene for {source.path}")
+        if not PillowBackend._warned:
+            PillowBackend._warned = True
+            print(f"Warning: the pillow backend ignores {os.path.basename(source.path)} and draws the "
+                  f"icon_scene artwork instead; edits to the SVG will not show up")
+        return self.SCENES[source.name]
+
+    def version(self):
+        self.require()
+        return self.create_icon.renderer_version()
+
+    def supports(self, source):
+        return source.name in self.SCENES
+
+    def rasterize(self, source, size):
+        return self.create_icon.render_icon(size, variant=self.scene(source))
+
+    def strips(self, source, size, rows):
+        return self.create_icon.render_strips(size, rows, variant=self.scene(source))
+
+BACKENDS = {backend.name: backend for backend in (ResvgBackend(), CairoSvgBackend(), PillowBackend())}
+
+def get_backend(name=AUTO, sources=()):
+    """Return a ready backend by name, or the fastest one that can draw every source.
+
+    Raises BackendUnavailable if the named backend cannot run or, for
+    ``auto``, if no backend can.
+    """
+    if name and name != AUTO:
+        backend = BACKENDS[name]
+        backend.require()
+        return backend
+    for candidate in FASTEST_FIRST:
+        backend = BACKENDS[candidate]
+        if all(backend.supports(source) for source in sources) and backend.available():
+            return backend
+    names = ', '.join(os.path.basename(source.path) for source in sources)
+    hints = '; '.join(f"{name}: {BACKENDS[name].install_hint}"
+                      for name in FASTEST_FIRST if not BACKENDS[name].available())
+    raise BackendUnavailable(f"No rasterizer backend can draw {names or 'SVG'} ({hints}); "
+                             f"--backend pillow draws the icon_scene artwork in place of "
+                             f"{', '.join(f'{n}.svg' for n in PillowBackend.SCENES)}, not the SVG itself")
+
+def add_backend_argument(parser):
+    """Add the --backend option to a parser."""
+    parser.add_argument('--backend', choices=(AUTO,) + tuple(BACKENDS), default=AUTO,
+                        help=f"rasterizer backend (default: {AUTO}, the first available of "
+                             f"{', '.join(FASTEST_FIRST)}; pillow draws the icon_scene artwork, not the SVG)")
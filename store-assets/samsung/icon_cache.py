@@ -0,0 +1,181 @@
+"""
+Content-addressed incremental cache for generated icons.
+
+Every output is keyed by a hash of its inputs: source bytes, size, renderer
+version and render parameters. The manifest remembers which key produced each
+output file, so an unchanged output is skipped after a single stat() call.
+Rendered PNGs are also kept under objects/<key>.png, so switching back to an
+earlier configuration restores files by copying instead of rendering.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from icon_pyramid import master_size
+
+DEFAULT_CACHE_DIR = '.icon-cache'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Unreferenced objects older than this are evicted
+MAX_AGE_DAYS = 30
+
+def file_digest(paths):
+    """Return a SHA-256 hex digest over the contents of the given files."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def cache_key(source_digest, size, renderer, params):
+    """Return the cache key for one output."""
+    payload = json.dumps({
+        'source': source_digest,
+        'size': size,
+        'renderer': renderer,
+        'params': params,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def cache_keys(outputs, source_digest, renderer, args):
+    """Key each (output_path, size) under the --pyramid, --tile-rows and --png options in args.
+
+    Returns the (output_path, size, key) list and the pyramid master size,
+    which is fixed by the full size list so partial rebuilds match full ones.
+    """
+    master_edge = master_size([size for _, size in outputs if size not in args.redraw] or [1],
+                              args.supersample)
+    keyed = []
+    for output_path, size in outputs:
+        if args.pyramid and size not in args.redraw:
+            params = {'mode': 'pyramid', 'master': master_edge}
+        elif getattr(args, 'tile_rows', 0):
+            params = {'mode': 'tiled'}
+        else:
+            params = {'mode': 'direct'}
+        params['png'] = args.png
+        keyed.append((output_path, size, cache_key(source_digest, size, renderer, params)))
+    return keyed, master_edge
+
+class IconCache:
+    """Manifest of generated outputs plus a store of rendered PNGs."""
+
+    def __init__(self, cache_dir, force=False):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.force = force
+        self.outputs = {}
+        self.objects = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get('version') != MANIFEST_VERSION:
+            return
+        self.outputs = manifest.get('outputs', {})
+        self.objects = manifest.get('objects', {})
+
+    def _entry_name(self, output_path):
+        return os.path.relpath(os.path.abspath(output_path), os.path.abspath(self.cache_dir))
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, f"{key}.png")
+
+    def is_fresh(self, output_path, key):
+        """Return True if output_path was produced from key and is untouched."""
+        if self.force:
+            return False
+        entry = self.outputs.get(self._entry_name(output_path))
+        if not entry or entry['key'] != key:
+            return False
+        try:
+            st = os.stat(output_path)
+        except OSError:
+            return False
+        return st.st_size == entry['bytes'] and st.st_mtime_ns == entry['mtime_ns']
+
+    def restore(self, output_path, key):
+        """Copy a previously rendered object to output_path. Returns True on a hit."""
+        if self.force or key not in self.objects:
+            return False
+        try:
+            shutil.copyfile(self._object_path(key), output_path)
+        except OSError:
+            del self.objects[key]
+            return False
+        self._record(output_path, key)
+        return True
+
+    def store(self, output_path, key):
+        """Record a freshly rendered output and keep a copy of it."""
+        os.makedirs(self.objects_dir, exist_ok=True)
+        shutil.copyfile(output_path, self._object_path(key))
+        self._record(output_path, key)
+
+    def _record(self, output_path, key):
+        st = os.stat(output_path)
+        self.outputs[self._entry_name(output_path)] = {
+            'key': key,
+            'bytes': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+        }
+        self.objects[key] = {'bytes': st.st_size, 'last_used': time.time()}
+
+    def partition(self, outputs):
+        """Split (output_path, size, key) outputs into (cached_count, pending).
+
+        Up-to-date outputs are skipped and known keys are restored from the
+        object store; only the pending list still needs rendering.
+        """
+        cached_count = 0
+        pending = []
+        for output_path, size, key in outputs:
+            if self.is_fresh(output_path, key):
+                print(f"[CACHED] Up to date: {output_path}")
+                cached_count += 1
+            elif self.restore(output_path, key):
+                print(f"[CACHED] Restored: {output_path} ({size}x{size})")
+                cached_count += 1
+            else:
+                pending.append((output_path, size, key))
+        return cached_count, pending
+
+    def evict(self, max_age_days=MAX_AGE_DAYS):
+        """Delete objects no output refers to that have not been used recently."""
+        referenced = {entry['key'] for entry in self.outputs.values()}
+        cutoff = time.time() - max_age_days * 86400
+        for key, entry in list(self.objects.items()):
+            if key not in referenced and entry['last_used'] < cutoff:
+                try:
+                    os.remove(self._object_path(key))
+                except OSError:
+                    pass
+                del self.objects[key]
+
+    def save(self):
+        """Evict stale objects and write the manifest atomically."""
+        self.evict()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'outputs': self.outputs,
+                'objects': self.objects,
+            }, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+def add_cache_arguments(parser):
+    """Add the --force and --cache-dir options to a parser."""
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the cache and regenerate every icon')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help=f'cache location (default: {DEFAULT_CACHE_DIR} in the output directory)')
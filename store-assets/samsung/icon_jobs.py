@@ -0,0 +1,54 @@
+"""
+Process-pool execution for per-size icon jobs.
+
+Each job's console output is captured in the worker and replayed by the
+parent in job order, so parallel runs print exactly what a serial run would.
+When tracing, each worker's spans come back the same way.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import io
+import os
+import sys
+
+import build_trace
+
+def resolve_workers(workers):
+    """Return the worker count to use; 0 means one per CPU."""
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def _run_captured(job):
+    """Run one (func, args, traced) job in a worker and return (result, output, spans)."""
+    func, args, traced = job
+    output = io.StringIO()
+    with redirect_stdout(output), build_trace.collect(traced) as spans:
+        result = func(*args)
+    return result, output.getvalue(), spans
+
+def run_jobs(func, jobs, workers=1):
+    """Run func(*args) for each args tuple and return the results in order.
+
+    With more than one worker the jobs are fanned out to a process pool;
+    output is still printed job by job, in the order the jobs were given.
+    """
+    jobs = list(jobs)
+    workers = min(resolve_workers(workers), len(jobs))
+    if workers <= 1:
+        return [func(*args) for args in jobs]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        traced = build_trace.enabled()
+        for result, output, spans in pool.map(_run_captured, [(func, args, traced) for args in jobs]):
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            build_trace.merge(spans)
+            results.append(result)
+    return results
+
+def add_worker_argument(parser):
+    """Add the --workers option to a parser."""
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help='number of worker processes, 0 for one per CPU (default: 1)')
@@ -0,0 +1,71 @@
+"""
+Render-once resampling pyramid for icon sets.
+
+One supersampled master is rendered, halved repeatedly with a box filter and
+each requested size is taken from the nearest level with a final Lanczos
+resize. Levels are built lazily and shared by every size that needs them.
+"""
+from PIL import Image
+
+DEFAULT_SUPERSAMPLE = 2
+
+# Final Lanczos step always shrinks by at least this factor
+REDUCING_GAP = 2
+
+class IconPyramid:
+    """Successive 2x reductions of a square master image."""
+
+    def __init__(self, master):
+        self.levels = [master]
+
+    def level_for(self, size):
+        """Return the smallest level that is still REDUCING_GAP times larger than size."""
+        while self.levels[-1].width // 2 >= size * REDUCING_GAP:
+            self.levels.append(self.levels[-1].reduce(2))
+        for level in reversed(self.levels):
+            if level.width >= size * REDUCING_GAP:
+                return level
+        return self.levels[0]
+
+    def get(self, size):
+        """Return the icon resampled to size x size."""
+        level = self.level_for(size)
+        if level.width == size:
+            return level.copy()
+        return level.resize((size, size), Image.LANCZOS)
+
+def master_size(sizes, supersample=DEFAULT_SUPERSAMPLE):
+    """Return the master edge length needed for the largest requested size."""
+    return max(sizes) * supersample
+
+def build_icons(render, sizes, supersample=DEFAULT_SUPERSAMPLE, redraw=(), master_edge=None):
+    """Yield (size, image) for each size, rendering the master only once.
+
+    ``render(size)`` must return an RGBA image. Sizes listed in ``redraw``
+    are rendered directly instead, for sizes where hinting matters. Pass
+    ``master_edge`` to keep the master size of a larger set when only part
+    of it is rebuilt.
+    """
+    pyramid = None
+    for size in sizes:
+        if size in redraw:
+            yield size, render(size)
+            continue
+        if pyramid is None:
+            if master_edge is None:
+                master_edge = master_size([s for s in sizes if s not in redraw], supersample)
+            pyramid = IconPyramid(render(master_edge))
+        yield size, pyramid.get(size)
+
+def parse_sizes(value):
+    """Parse a comma-separated list of sizes such as '48,72'."""
+    return {int(part) for part in value.split(',') if part.strip()}
+
+def add_pyramid_arguments(parser):
+    """Add the --pyramid, --supersample and --redraw options to a parser."""
+    parser.add_argument('--pyramid', action='store_true',
+                        help='render one supersampled master and downsample it to every size')
+    parser.add_argument('--supersample', type=int, default=DEFAULT_SUPERSAMPLE,
+                        help=f'master size as a multiple of the largest icon (default: {DEFAULT_SUPERSAMPLE})')
+    parser.add_argument('--redraw', type=parse_sizes, default=set(), metavar='SIZES',
+                        help='comma-separated sizes to render directly in pyramid mode, e.g. 48,72')
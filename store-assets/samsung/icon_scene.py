@@ -0,0 +1,464 @@
+"""
+Declarative description of the scanner icon artwork.
+
+A Scene is a background gradient, a list of axis-aligned fill layers and a
+list of badge shapes, all positioned as fractions of the icon size.
+compile_scene() turns a scene into pixel geometry for one size (cached per
+scene and size), rasterize() paints compiled geometry, and SceneRenderer keeps
+one rasterized base per scene and size so variants that only add overlays are
+rendered from a copy instead of being drawn again.
+"""
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+try:
+    import icon_raster
+except ImportError:  # NumPy not installed, fall back to ImageDraw
+    icon_raster = None
+
+TEAL = (0, 131, 143, 255)
+WHITE = (255, 255, 255, 255)
+
+# ---------------------------------------------------------------------------
+# Layers (fractions of the icon size)
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Gradient:
+    """Vertical background gradient between two RGB colors."""
+    top: tuple
+    bottom: tuple
+
+@dataclass(frozen=True)
+class Bars:
+    """Barcode bars at fractional x positions, spanning top to bottom."""
+    positions: tuple
+    widths: tuple
+    top: float
+    bottom: float
+    color: tuple
+
+    def compile(self, size):
+        top = int(size * self.top)
+        bottom = int(size * self.bottom)
+        boxes = []
+        for pos, width in zip(self.positions, self.widths):
+            x = int(size * pos)
+            boxes.append(([x, top, x + int(size * width), bottom], self.color))
+        return boxes
+
+@dataclass(frozen=True)
+class FrameCorners:
+    """Four L-shaped scanner frame corners."""
+    inset: float
+    top: float
+    bottom: float
+    length: float
+    thickness: float
+    color: tuple
+
+    def compile(self, size):
+        length = int(size * self.length)
+        thickness = int(size * self.thickness)
+        left = int(size * self.inset)
+        right = size - left
+        top = int(size * self.top)
+        bottom = int(size * self.bottom)
+        boxes = [
+            # Top-left corner
+            [left, top, left + length, top + thickness],
+            [left, top, left + thickness, top + length],
+            # Top-right corner
+            [right - length, top, right, top + thickness],
+            [right - thickness, top, right, top + length],
+            # Bottom-left corner
+            [left, bottom - thickness, left + length, bottom],
+            [left, bottom - length, left + thickness, bottom],
+            # Bottom-right corner
+            [right - length, bottom - thickness, right, bottom],
+            [right - thickness, bottom - length, right, bottom],
+        ]
+        return [(box, self.color) for box in boxes]
+
+@dataclass(frozen=True)
+class ScanLine:
+    """Horizontal scanning line between the frame insets."""
+    inset: float
+    y: float
+    height: float
+    color: tuple
+
+    def compile(self, size):
+        left = int(size * self.inset)
+        y = int(size * self.y)
+        return [([left, y, size - left, y + int(size * self.height)], self.color)]
+
+@dataclass(frozen=True)
+class BoxBadge:
+    """Parcel badge: an outlined square with a folded lid."""
+    x: float
+    y: float
+    size: float
+    fill: tuple
+    outline: tuple
+    fold: tuple
+
+    def compile(self, size):
+        return BoxShape(self, int(size * self.x), int(size * self.y), int(size * self.size))
+
+@dataclass(frozen=True)
+class CheckBadge:
+    """Round badge with a checkmark."""
+    x: float
+    y: float
+    size: float
+    fill: tuple
+    mark: tuple
+    stroke: float
+
+    def compile(self, size):
+        return CheckShape(self, int(size * self.x), int(size * self.y), int(size * self.size),
+                          max(2, int(size * self.stroke)))
+
+@dataclass(frozen=True)
+class Outline:
+    """One-pixel rectangle outline, e.g. a debug guide."""
+    left: float
+    top: float
+    right: float
+    bottom: float
+    color: tuple
+
+    def compile(self, size):
+        box = [int(size * self.left), int(size * self.top),
+               int(size * self.right), int(size * self.bottom)]
+        return OutlineShape(box, self.color)
+
+# ---------------------------------------------------------------------------
+# Compiled shapes (pixel geometry for one size)
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class BoxShape:
+    layer: BoxBadge
+    x: int
+    y: int
+    size: int
+
+    def bounds(self):
+        # The lid polygon reaches 2px outside the box at tiny sizes
+        return self.x - 2, self.y - 2, self.x + self.size + 3, self.y + self.size + 3
+
+    def draw(self, draw, origin=(0, 0)):
+        box_x = self.x - origin[0]
+        box_y = self.y - origin[1]
+        box_size = self.size
+        draw.rectangle(
+            [box_x, box_y, box_x + box_size, box_y + box_size],
+            fill=self.layer.fill,
+            outline=self.layer.outline,
+            width=2
+        )
+        # Box top fold
+        draw.polygon(
+            [(box_x + 2, box_y + box_size//3),
+             (box_x + box_size//2, box_y + 2),
+             (box_x + box_size - 2, box_y + box_size//3)],
+            fill=self.layer.fold
+        )
+
+@dataclass(frozen=True)
+class CheckShape:
+    layer: CheckBadge
+    x: int
+    y: int
+    size: int
+    stroke: int
+
+    def bounds(self):
+        pad = self.stroke + 2
+        return self.x - pad, self.y - pad, self.x + self.size + pad + 1, self.y + self.size + pad + 1
+
+    def draw(self, draw, origin=(0, 0)):
+        check_x = self.x - origin[0]
+        check_y = self.y - origin[1]
+        check_size = self.size
+        draw.ellipse(
+            [check_x, check_y, check_x + check_size, check_y + check_size],
+            fill=self.layer.fill
+        )
+        # Checkmark
+        check_points = [
+            (check_x + check_size * 0.25, check_y + check_size * 0.5),
+            (check_x + check_size * 0.42, check_y + check_size * 0.68),
+            (check_x + check_size * 0.75, check_y + check_size * 0.32)
+        ]
+        draw.line(check_points[:2], fill=self.layer.mark, width=self.stroke)
+        draw.line(check_points[1:], fill=self.layer.mark, width=self.stroke)
+
+@dataclass(frozen=True)
+class OutlineShape:
+    box: list
+    color: tuple
+
+    def bounds(self):
+        x0, y0, x1, y1 = self.box
+        return x0, y0, x1 + 1, y1 + 1
+
+    def draw(self, draw, origin=(0, 0)):
+        x0, y0, x1, y1 = self.box
+        ox, oy = origin
+        draw.rectangle([x0 - ox, y0 - oy, x1 - ox, y1 - oy], outline=self.color)
+
+# ---------------------------------------------------------------------------
+# Scenes
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Scene:
+    """Background, fill layers and badge shapes, painted in that order."""
+    background: Gradient
+    fills: tuple
+    shapes: tuple
+
+@dataclass(frozen=True)
+class CompiledScene:
+    """Pixel geometry of a scene at one size."""
+    size: int
+    background: Gradient
+    fills: tuple
+    shapes: tuple
+
+    def shape_bounds(self):
+        """Return the [x0, y0, x1, y1) region touched by the shapes, clipped to the icon."""
+        if not self.shapes:
+            return 0, 0, 0, 0
+        boxes = [shape.bounds() for shape in self.shapes]
+        x0 = max(min(b[0] for b in boxes), 0)
+        y0 = max(min(b[1] for b in boxes), 0)
+        x1 = min(max(b[2] for b in boxes), self.size)
+        y1 = min(max(b[3] for b in boxes), self.size)
+        return x0, y0, x1, y1
+
+@lru_cache(maxsize=256)
+def compile_scene(scene, size):
+    """Compile a scene into pixel geometry for one size."""
+    fills = []
+    for layer in scene.fills:
+        fills.extend(layer.compile(size))
+    shapes = tuple(layer.compile(size) for layer in scene.shapes)
+    return CompiledScene(size, scene.background, tuple(fills), shapes)
+
+SCANNER_ICON = Scene(
+    # Background gradient from #00838F to #004D54
+    background=Gradient((0, 131, 143), (0, 77, 84)),
+    fills=(
+        Bars(
+            positions=(0.15, 0.22, 0.28, 0.35, 0.42, 0.48, 0.55, 0.62, 0.68, 0.75, 0.82),
+            widths=(0.03, 0.02, 0.04, 0.02, 0.03, 0.02, 0.04, 0.02, 0.03, 0.02, 0.03),
+            top=0.20, bottom=0.65, color=(255, 255, 255, 240)
+        ),
+        FrameCorners(inset=0.12, top=0.12, bottom=0.72, length=0.12, thickness=0.02,
+                     color=(0, 229, 255, 255)),
+        ScanLine(inset=0.12, y=0.42, height=0.015, color=(255, 82, 82, 255)),
+    ),
+    shapes=(
+        BoxBadge(x=0.35, y=0.78, size=0.10, fill=(255, 255, 255, 230), outline=TEAL,
+                 fold=(0, 131, 143, 200)),
+        CheckBadge(x=0.55, y=0.78, size=0.10, fill=(76, 175, 80, 255), mark=WHITE, stroke=0.02),
+    ),
+)
+
+# ---------------------------------------------------------------------------
+# Rasterization
+# ---------------------------------------------------------------------------
+
+def rasterize_draw(compiled):
+    """Paint compiled geometry with one ImageDraw call per row and per shape."""
+    size = compiled.size
+    top, bottom = compiled.background.top, compiled.background.bottom
+    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    for y in range(size):
+        color = tuple(int(t - (t - b) * y / size) for t, b in zip(top, bottom))
+        draw.line([(0, y), (size, y)], fill=color + (255,))
+
+    for box, color in compiled.fills:
+        draw.rectangle(box, fill=color)
+
+    for shape in compiled.shapes:
+        shape.draw(draw)
+    return img
+
+def rasterize_numpy(compiled):
+    """Paint every layer into one RGBA array and hand it to Pillow once."""
+    size = compiled.size
+    canvas = icon_raster.vertical_gradient(size, size, compiled.background.top, compiled.background.bottom)
+    icon_raster.composite(canvas, compiled.fills)
+
+    # Badges are drawn on a small patch so the full canvas is copied once
+    x0, y0, x1, y1 = compiled.shape_bounds()
+    if x0 < x1 and y0 < y1:
+        patch = Image.fromarray(canvas[y0:y1, x0:x1], 'RGBA')
+        draw = ImageDraw.Draw(patch)
+        for shape in compiled.shapes:
+            shape.draw(draw, origin=(x0, y0))
+        canvas[y0:y1, x0:x1] = patch
+
+    return Image.fromarray(canvas, 'RGBA')
+
+def shift_box(box, dx, dy):
+    """Move an [x0, y0, x1, y1] box left by dx and up by dy pixels."""
+    x0, y0, x1, y1 = box
+    return [x0 - dx, y0 - dy, x1 - dx, y1 - dy]
+
+def rasterize_region(compiled, box, engine=None):
+    """Paint the background and fill layers inside [x0, y0, x1, y1) as an RGBA image."""
+    x0, y0, x1, y1 = box
+    width, height = x1 - x0, y1 - y0
+    top, bottom = compiled.background.top, compiled.background.bottom
+    if engine is None:
+        engine = default_engine()
+    if engine == 'numpy':
+        canvas = icon_raster.vertical_gradient(width, height, top, bottom, first_row=y0, total_height=compiled.size)
+        icon_raster.composite(canvas, [(shift_box(fill, x0, y0), color) for fill, color in compiled.fills])
+        return Image.fromarray(canvas, 'RGBA')
+    if engine == 'draw':
+        img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        for y in range(y0, y1):
+            color = tuple(int(t - (t - b) * y / compiled.size) for t, b in zip(top, bottom))
+            draw.line([(0, y - y0), (width, y - y0)], fill=color + (255,))
+        for fill, color in compiled.fills:
+            draw.rectangle(shift_box(fill, x0, y0), fill=color)
+        return img
+    raise ValueError(f"Unknown render engine: {engine}")
+
+def shape_band(compiled, engine=None):
+    """Return the shape_bounds() region with its badges drawn, as rasterize_numpy draws it."""
+    x0, y0, x1, y1 = compiled.shape_bounds()
+    band = rasterize_region(compiled, (x0, y0, x1, y1), engine)
+    draw = ImageDraw.Draw(band)
+    for shape in compiled.shapes:
+        shape.draw(draw, origin=(x0, y0))
+    return band
+
+def rasterize_strip(compiled, first_row, rows, overlays=(), engine=None, band=None):
+    """Rasterize rows [first_row, first_row + rows) of compiled geometry as an RGBA image.
+
+    Overlay layers are drawn on top, as SceneRenderer.render() does. Badges
+    are drawn whole on their own band (pass ``band`` from shape_band() to
+    reuse it across strips) since Pillow draws wide lines differently when
+    they are clipped. Stacking the strips of a size gives the same pixels as
+    rasterizing the whole icon.
+    """
+    size = compiled.size
+    rows = min(rows, size - first_row)
+    img = rasterize_region(compiled, (0, first_row, size, first_row + rows), engine)
+    x0, y0, x1, y1 = compiled.shape_bounds()
+    overlap_top, overlap_bottom = max(y0, first_row), min(y1, first_row + rows)
+    if x0 < x1 and overlap_top < overlap_bottom:
+        if band is None:
+            band = shape_band(compiled, engine)
+        img.paste(band.crop((0, overlap_top - y0, x1 - x0, overlap_bottom - y0)), (x0, overlap_top - first_row))
+
+    draw = ImageDraw.Draw(img)
+    for layer in overlays:
+        overlay = layer.compile(size)
+        if isinstance(overlay, list):
+            for box, color in overlay:
+                draw.rectangle(shift_box(box, 0, first_row), fill=color)
+        else:
+            overlay.draw(draw, origin=(0, first_row))
+    return img
+
+def default_engine():
+    """Return the fastest engine available."""
+    return 'numpy' if icon_raster is not None else 'draw'
+
+def rasterize(compiled, engine=None):
+    """Rasterize compiled geometry with the given engine ('numpy' or 'draw')."""
+    if engine is None:
+        engine = default_engine()
+    if engine == 'numpy':
+        return rasterize_numpy(compiled)
+    if engine == 'draw':
+        return rasterize_draw(compiled)
+    raise ValueError(f"Unknown render engine: {engine}")
+
+# ---------------------------------------------------------------------------
+# Variants
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Variant:
+    """A scene plus overlay layers drawn on top of its cached raster."""
+    name: str
+    scene: Scene
+    overlays: tuple = ()
+
+LIGHT_ICON = replace(
+    SCANNER_ICON,
+    # Background gradient from #E0F7FA to #B2EBF2
+    background=Gradient((224, 247, 250), (178, 235, 242)),
+    fills=(replace(SCANNER_ICON.fills[0], color=(0, 96, 100, 240)),) + SCANNER_ICON.fills[1:],
+)
+
+VARIANTS = {
+    'default': Variant('default', SCANNER_ICON),
+    'light': Variant('light', LIGHT_ICON),
+    'debug': Variant('debug', SCANNER_ICON, overlays=(
+        # Scanner frame and badge row guides
+        Outline(0.12, 0.12, 0.88, 0.72, (255, 0, 255, 255)),
+        Outline(0.35, 0.78, 0.65, 0.88, (255, 0, 255, 255)),
+    )),
+}
+
+class SceneRenderer:
+    """Rasterize each scene once per size and derive variants from copies."""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self._bases = {}
+
+    def base(self, scene, size):
+        """Return the cached raster of a scene (do not modify it)."""
+        key = (scene, size)
+        if key not in self._bases:
+            self._bases[key] = rasterize(compile_scene(scene, size), self.engine)
+        return self._bases[key]
+
+    def render(self, variant, size):
+        """Return a new image of the variant at size x size."""
+        img = self.base(variant.scene, size)
+        if not variant.overlays:
+            return img.copy()
+        img = img.copy()
+        draw = ImageDraw.Draw(img)
+        for layer in variant.overlays:
+            compiled = layer.compile(size)
+            if isinstance(compiled, list):
+                for box, color in compiled:
+                    draw.rectangle(box, fill=color)
+            else:
+                compiled.draw(draw)
+        return img
+
+    def strips(self, variant, size, rows):
+        """Yield the variant at size x size as RGBA images of at most rows rows, top to bottom.
+
+        Only the badge band is kept while strips cross it, so memory stays
+        bounded by one strip plus the badges.
+        """
+        compiled = compile_scene(variant.scene, size)
+        _, band_top, _, band_bottom = compiled.shape_bounds()
+        band = None
+        for first_row in range(0, size, rows):
+            if band is None and band_top < first_row + rows and band_bottom > first_row:
+                band = shape_band(compiled, self.engine)
+            yield rasterize_strip(compiled, first_row, rows, variant.overlays, self.engine, band)
+            if first_row + rows >= band_bottom:
+                band = None
@@ -0,0 +1,428 @@
+"""
+PNG encoding stage for generated icons.
+
+Presets trade encode time for file size:
+
+    pillow    Pillow's default save, as the scripts did originally (default)
+    fast      Pillow at zlib level 1, for CI builds
+    balanced  lossless palette when the image has <= 256 colors (trying no
+              filter and per-row adaptive filters), otherwise Pillow's
+              adaptive encoder with alpha dropped when fully opaque
+    smallest  like balanced, but tries every filter strategy and two zlib
+              strategies at level 9 and keeps the smallest result
+
+balanced and smallest use the NumPy writer below; without NumPy they fall back
+to Pillow's optimizing encoder. Every preset is lossless, but only pillow keeps
+the committed icons' RGBA format, so it is the default and the others are
+opt-in. stream_png() writes images that arrive as strips of rows, for icons
+too large to hold whole.
+"""
+from dataclasses import dataclass
+from io import BytesIO
+import struct
+import time
+import zlib
+
+from build_trace import span
+
+try:
+    import numpy as np
+except ImportError:  # NumPy not installed, Pillow encodes everything
+    np = None
+
+PRESETS = ('pillow', 'fast', 'balanced', 'smallest')
+DEFAULT_PRESET = 'pillow'
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG color types
+COLOR_RGB = 2
+COLOR_PALETTE = 3
+COLOR_RGBA = 6
+
+# PNG row filter types, plus the per-row minimum-sum heuristic
+FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH = range(5)
+FILTER_ADAPTIVE = 'adaptive'
+
+@dataclass
+class EncodeStats:
+    """Result of encoding one image."""
+    bytes: int
+    seconds: float
+    layout: str
+    baseline_bytes: int = None
+
+    def describe(self):
+        """Return a short human-readable summary."""
+        parts = [f"{self.bytes:,} B", self.layout]
+        if self.baseline_bytes is not None:
+            parts.append(f"saved {self.baseline_bytes - self.bytes:,} B")
+        parts.append(f"{self.seconds * 1000:.1f} ms")
+        return ', '.join(parts)
+
+# ---------------------------------------------------------------------------
+# PNG writer
+# ---------------------------------------------------------------------------
+
+def chunk(tag, data):
+    """Return one length-prefixed, CRC-terminated PNG chunk."""
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+def header(width, height, bit_depth, color_type):
+    """Return the signature and IHDR chunk."""
+    ihdr = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    return PNG_SIGNATURE + chunk(b'IHDR', ihdr)
+
+def filter_rows(rows, bpp, filter_type, prior=None):
+    """Apply a PNG filter to a (height, stride) uint8 array of raw scanlines.
+
+    ``prior`` is the raw scanline above the first row, if any. Returns a
+    (height, stride + 1) array with the filter type byte in column 0.
+    """
+    height, stride = rows.shape
+    x = rows.astype(np.int16)
+    up = np.empty_like(x)
+    up[1:] = x[:-1]
+    up[0] = 0 if prior is None else prior
+    left = np.zeros_like(x)
+    left[:, bpp:] = x[:, :-bpp]
+    upleft = np.zeros_like(x)
+    upleft[:, bpp:] = up[:, :-bpp]
+
+    candidates = {
+        FILTER_NONE: lambda: x,
+        FILTER_SUB: lambda: x - left,
+        FILTER_UP: lambda: x - up,
+        FILTER_AVERAGE: lambda: x - (left + up) // 2,
+        FILTER_PAETH: lambda: x - paeth_predictor(left, up, upleft),
+    }
+
+    out = np.empty((height, stride + 1), dtype=np.uint8)
+    if filter_type == FILTER_ADAPTIVE:
+        # Minimum sum of absolute differences, the heuristic libpng uses
+        filtered = np.stack([candidates[f]().astype(np.uint8) for f in range(5)])
+        signed = filtered.view(np.int8).astype(np.int16)
+        choice = np.abs(signed).sum(axis=2).argmin(axis=0)
+        out[:, 0] = choice
+        out[:, 1:] = filtered[choice, np.arange(height)]
+    else:
+        out[:, 0] = filter_type
+        out[:, 1:] = candidates[filter_type]().astype(np.uint8)
+    return out
+
+def paeth_predictor(a, b, c):
+    """Vectorized Paeth predictor over int16 arrays."""
+    p = a + b - c
+    pa = np.abs(p - a)
+    pb = np.abs(p - b)
+    pc = np.abs(p - c)
+    return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+def order_palette(colors):
+    """Return RGBA color tuples as a palette array, colors with transparency
+    first so the tRNS chunk stays short."""
+    palette = np.array(sorted(colors), dtype=np.uint8)
+    return palette[np.argsort(palette[:, 3] == 255, kind='stable')]
+
+def palette_indexer(palette):
+    """Return a function mapping (height, width, 4) RGBA arrays to palette indices."""
+    keys = palette.view(np.uint32).ravel()
+
+    # Smallest modulus that maps every palette color to its own slot, so
+    # pixels are indexed with one modulo and one table lookup
+    modulus = len(keys)
+    while len(np.unique(keys % modulus)) < len(keys):
+        modulus += 1
+    lookup = np.zeros(modulus, dtype=np.uint8)
+    lookup[keys % modulus] = np.arange(len(keys), dtype=np.uint8)
+    return lambda rgba: lookup[rgba.view(np.uint32)[..., 0] % np.uint32(modulus)]
+
+def extract_palette(img, rgba):
+    """Return (palette, indices) if the image has at most 256 colors, else None."""
+    # Pillow counts colors in one hashed pass and gives up past 256
+    counted = img.getcolors(256)
+    if counted is None:
+        return None
+    palette = order_palette(color for _, color in counted)
+    return palette, palette_indexer(palette)(rgba)
+
+def palette_chunks(palette):
+    """Return the PLTE chunk, plus tRNS when some colors are translucent."""
+    data = chunk(b'PLTE', palette[:, :3].tobytes())
+    alphas = palette[:, 3]
+    translucent = int((alphas != 255).sum())
+    if translucent:
+        data += chunk(b'tRNS', alphas[:translucent].tobytes())
+    return data
+
+def palette_bit_depth(count):
+    """Return the smallest PNG bit depth that can index count colors."""
+    for depth in (1, 2, 4):
+        if count <= 1 << depth:
+            return depth
+    return 8
+
+def pack_indices(indices, depth):
+    """Pack (height, width) palette indices into scanlines of the given bit depth."""
+    if depth == 8:
+        return indices
+    height, width = indices.shape
+    per_byte = 8 // depth
+    padded = np.zeros((height, -(-width // per_byte) * per_byte), dtype=np.uint8)
+    padded[:, :width] = indices
+    groups = padded.reshape(height, -1, per_byte)
+    shifts = np.arange(per_byte - 1, -1, -1, dtype=np.uint8) * depth
+    return np.bitwise_or.reduce(groups << shifts, axis=2).astype(np.uint8)
+
+def image_layout(img):
+    """Choose the PNG layout for an image.
+
+    Returns (color_type, bit_depth, scanlines, bytes_per_pixel, extra_chunks, label).
+    """
+    img = img.convert('RGBA')
+    rgba = np.asarray(img)
+    extracted = extract_palette(img, rgba)
+    if extracted is not None:
+        palette, indices = extracted
+        depth = palette_bit_depth(len(palette))
+        return (COLOR_PALETTE, depth, pack_indices(indices, depth), 1, palette_chunks(palette),
+                f"palette {len(palette)} colors/{depth}-bit")
+    if (rgba[:, :, 3] == 255).all():
+        rgb = np.ascontiguousarray(rgba[:, :, :3])
+        return COLOR_RGB, 8, rgb.reshape(rgb.shape[0], -1), 3, b'', 'RGB'
+    return COLOR_RGBA, 8, rgba.reshape(rgba.shape[0], -1), 4, b'', 'RGBA'
+
+# Rows filtered and compressed per step, so temporaries stay small
+STRIP_ROWS = 64
+
+def write_png(width, height, layout, filter_type, level, strategy=zlib.Z_DEFAULT_STRATEGY):
+    """Encode an image_layout() result into PNG bytes."""
+    color_type, depth, scanlines, bpp, extra, _ = layout
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+    idat = []
+    for top in range(0, height, STRIP_ROWS):
+        prior = scanlines[top - 1] if top else None
+        strip = filter_rows(scanlines[top:top + STRIP_ROWS], bpp, filter_type, prior)
+        idat.append(compressor.compress(strip.tobytes()))
+    idat.append(compressor.flush())
+    return (header(width, height, depth, color_type) + extra
+            + chunk(b'IDAT', b''.join(idat)) + chunk(b'IEND', b''))
+
+# ---------------------------------------------------------------------------
+# Streaming writer
+# ---------------------------------------------------------------------------
+
+# Scanline bytes filtered per step, so temporaries stay small at any width
+FILTER_BYTES = 1 << 20
+# Compressed bytes collected before an IDAT chunk is written
+IDAT_BYTES = 1 << 18
+
+def scan_colors(strips):
+    """Return (palette or None, opaque) for an image given as RGBA strips.
+
+    Stops counting colors past 256 and stops reading once neither a palette
+    nor dropping alpha is possible.
+    """
+    colors = np.empty(0, dtype=np.uint32)
+    opaque = True
+    for strip in strips:
+        rgba = np.ascontiguousarray(strip)
+        opaque = opaque and bool((rgba[..., 3] == 255).all())
+        if colors is not None:
+            colors = np.union1d(colors, np.unique(rgba.view(np.uint32)))
+            if len(colors) > 256:
+                colors = None
+        if colors is None and not opaque:
+            break
+    if colors is None:
+        return None, opaque
+    return order_palette(map(tuple, colors.view(np.uint8).reshape(-1, 4))), opaque
+
+def best_filtered(compressor, rows, bpp, filters, prior):
+    """Return the filtered rows that add the fewest bytes to the compressed stream so far."""
+    if len(filters) == 1:
+        return filter_rows(rows, bpp, filters[0], prior).tobytes()
+    best = None
+    for filter_type in filters:
+        filtered = filter_rows(rows, bpp, filter_type, prior).tobytes()
+        trial = compressor.copy()
+        size = len(trial.compress(filtered)) + len(trial.flush(zlib.Z_SYNC_FLUSH))
+        if best is None or size < best[0]:
+            best = (size, filtered)
+    return best[1]
+
+def stream_png(output_path, width, height, strips, preset=DEFAULT_PRESET):
+    """Encode an image given as strips straight to a PNG file.
+
+    ``strips()`` must return an iterator of (rows, width, 4) RGBA arrays or
+    images from the top row down; the balanced and smallest presets call it
+    twice, first to count colors so the image can be stored as a palette (or
+    RGB when it is opaque) like encode() does. pillow and fast write RGBA in
+    one pass. Rows are filtered, compressed and written as they arrive, so
+    memory is bounded by one strip rather than the image. Returns
+    (bytes_written, layout_label).
+    """
+    if np is None:
+        raise RuntimeError("Streaming PNG encoding needs NumPy")
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown PNG preset: {preset}")
+    palette, opaque = scan_colors(strips()) if preset in ('balanced', 'smallest') else (None, False)
+    depth = 8
+    if palette is not None:
+        depth = palette_bit_depth(len(palette))
+        index = palette_indexer(palette)
+        color_type, bpp, extra = COLOR_PALETTE, 1, palette_chunks(palette)
+        scanlines = lambda rgba: pack_indices(index(rgba), depth)
+        label = f"palette {len(palette)} colors/{depth}-bit"
+    elif opaque:
+        color_type, bpp, extra, label = COLOR_RGB, 3, b'', 'RGB'
+        scanlines = lambda rgba: np.ascontiguousarray(rgba[..., :3]).reshape(len(rgba), -1)
+    else:
+        color_type, bpp, extra, label = COLOR_RGBA, 4, b'', 'RGBA'
+        scanlines = lambda rgba: rgba.reshape(len(rgba), -1)
+
+    # Filters tried on every step; the one that compresses smallest is kept
+    if preset == 'smallest':
+        filters = (FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH, FILTER_ADAPTIVE)
+    elif color_type == COLOR_PALETTE:
+        filters = (FILTER_NONE, FILTER_ADAPTIVE)
+    elif preset == 'balanced':
+        filters = (FILTER_ADAPTIVE,)
+    else:
+        # Up is nearly as small as adaptive on the icons, at a quarter of the time
+        filters = (FILTER_UP,)
+    level = {'fast': 1, 'smallest': 9}.get(preset, 6)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9)
+    rows_written = 0
+    prior = None
+    with open(output_path, 'wb') as f:
+        f.write(header(width, height, depth, color_type) + extra)
+        pending, pending_bytes = [], 0
+        for strip in strips():
+            rgba = np.ascontiguousarray(strip)
+            if rgba.shape[1:] != (width, 4):
+                raise ValueError(f"Strip of shape {rgba.shape} does not fit a {width}px wide RGBA image")
+            lines = scanlines(rgba)
+            step = max(1, min(STRIP_ROWS, FILTER_BYTES // lines.shape[1]))
+            for top in range(0, len(lines), step):
+                part = lines[top:top + step]
+                data = compressor.compress(best_filtered(compressor, part, bpp, filters, prior))
+                prior = part[-1]
+                pending.append(data)
+                pending_bytes += len(data)
+                if pending_bytes >= IDAT_BYTES:
+                    f.write(chunk(b'IDAT', b''.join(pending)))
+                    pending, pending_bytes = [], 0
+            rows_written += len(rgba)
+        if rows_written != height:
+            raise ValueError(f"Strips covered {rows_written} rows of {height}")
+        pending.append(compressor.flush())
+        f.write(chunk(b'IDAT', b''.join(pending)) + chunk(b'IEND', b''))
+        return f.tell(), label
+
+# ---------------------------------------------------------------------------
+# Presets
+# ---------------------------------------------------------------------------
+
+def pillow_png(img, **params):
+    """Encode with Pillow's own PNG writer."""
+    buf = BytesIO()
+    img.save(buf, 'PNG', **params)
+    return buf.getvalue()
+
+def encode(img, preset=DEFAULT_PRESET):
+    """Encode an image with a preset. Returns (png_bytes, layout_label)."""
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown PNG preset: {preset}")
+    if preset == 'pillow':
+        return pillow_png(img), img.mode
+    if preset == 'fast':
+        return pillow_png(img, compress_level=1), img.mode
+    if np is None:
+        return pillow_png(img, optimize=True), img.mode
+
+    layout = image_layout(img)
+    label = layout[5]
+    if preset == 'balanced':
+        if layout[0] != COLOR_PALETTE:
+            # Pillow's C encoder already filters truecolor rows adaptively
+            mode = 'RGB' if layout[0] == COLOR_RGB else 'RGBA'
+            return pillow_png(img.convert(mode)), label
+        # Palette images often compress best unfiltered, so try both
+        candidates = [(FILTER_NONE, 6, zlib.Z_DEFAULT_STRATEGY), (FILTER_ADAPTIVE, 6, zlib.Z_DEFAULT_STRATEGY)]
+    else:
+        candidates = [(filter_type, 9, strategy)
+                      for filter_type in (FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE,
+                                          FILTER_PAETH, FILTER_ADAPTIVE)
+                      for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)]
+
+    best = None
+    for filter_type, level, strategy in candidates:
+        data = write_png(img.width, img.height, layout, filter_type, level, strategy)
+        if best is None or len(data) < len(best):
+            best = data
+    return best, label
+
+@dataclass(frozen=True)
+class PngEncoder:
+    """Encoding options threaded through the icon scripts and their workers.
+
+    With ``tile_rows`` the scripts render icons they draw directly in strips
+    of that many rows and encode them with save_strips().
+    """
+    preset: str = DEFAULT_PRESET
+    compare: bool = False
+    tile_rows: int = 0
+
+    def encode(self, img):
+        """Encode img, returning (png_bytes, EncodeStats).
+
+        With ``compare`` the size of Pillow's default encoding is also
+        measured (outside the reported encode time) to show the bytes saved.
+        """
+        with span('encode', preset=self.preset, size=f"{img.width}x{img.height}") as traced:
+            start = time.perf_counter()
+            data, label = encode(img, self.preset)
+            seconds = time.perf_counter() - start
+            traced.set(bytes=len(data), layout=label)
+        baseline = None
+        if self.compare and self.preset != 'pillow':
+            baseline = len(pillow_png(img))
+        return data, EncodeStats(len(data), seconds, label, baseline)
+
+    def save(self, img, output_path):
+        """Encode and write img, returning EncodeStats."""
+        data, stats = self.encode(img)
+        with span('save', path=output_path, bytes=len(data)):
+            with open(output_path, 'wb') as f:
+                f.write(data)
+        return stats
+
+    def save_strips(self, strips, width, height, output_path):
+        """Encode and write an image given as strips (see stream_png), returning EncodeStats.
+
+        There is no whole image to encode with Pillow, so no bytes saved are reported.
+        """
+        with span('encode', preset=self.preset, size=f"{width}x{height}", tile_rows=self.tile_rows) as traced:
+            start = time.perf_counter()
+            size, label = stream_png(output_path, width, height, strips, self.preset)
+            seconds = time.perf_counter() - start
+            traced.set(bytes=size, layout=label)
+        return EncodeStats(size, seconds, f"{label}, {self.tile_rows}-row strips")
+
+def add_encoder_arguments(parser):
+    """Add the --png and --no-png-stats options to a parser."""
+    parser.add_argument('--png', choices=PRESETS, default=DEFAULT_PRESET,
+                        help=f'PNG encoding preset (default: {DEFAULT_PRESET})')
+    parser.add_argument('--no-png-stats', dest='png_stats', action='store_false',
+                        help='skip the extra default encode used to report bytes saved')
+
+def add_tile_argument(parser):
+    """Add the --tile-rows option to a parser."""
+    parser.add_argument('--tile-rows', type=int, default=0, metavar='ROWS',
+                        help='render and encode icons drawn directly in strips of ROWS rows, so memory '
+                             'is bounded by the strip instead of the image (default: 0, whole images)')
+
+def encoder_from_args(args):
+    """Build a PngEncoder from parsed arguments."""
+    return PngEncoder(args.png, args.png_stats, getattr(args, 'tile_rows', 0))
@@ -0,0 +1,338 @@
+"""
+Watch mode for the icon, bundle and manual builds.
+
+One warm process keeps Pillow, NumPy, python-docx and the rasterizer backend
+imported, polls the inputs of each target and, after a save, rebuilds only
+the targets that read the changed files:
+
+    icons   create_icon.py and the icon_scene modules -> icon_*.png in this folder
+    svg     the app icon SVG and generate_icons.py    -> icon_*.png in this folder
+    bundle  icon_bundle.json, its SVG layers, the scene -> store-assets/icon-bundle
+    manual  docs/manual.yaml, docs/images, docs/locales and the docs scripts
+            -> the manual in each --format
+
+icons and svg write the same files, so only icons is built by default. An
+edited script is reloaded in place, along with every module that comes after
+it in MODULE_ORDER, so the next build runs the new code without a restart.
+
+Between rebuilds each target keeps its caches in memory. The icon scripts
+still skip unchanged sizes through .icon-cache. The bundle keeps every
+rendered and encoded layer and drops only the layers whose SVG or drawing
+code changed. The manual keeps its section fragments, prepared screenshots
+and file digests, and a change to one string catalog rebuilds only that
+language.
+
+Changes are found by polling modification times, so no watcher library is
+needed. A burst of saves is built once.
+
+Run: python watch_assets.py [--target icons --target manual] [--format docx] [--once]
+"""
+from abc import ABC, abstractmethod
+import argparse
+import importlib
+import os
+import sys
+import time
+import traceback
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+DOCS_DIR = os.path.join(PROJECT_ROOT, 'docs')
+sys.path.append(DOCS_DIR)
+
+DEFAULT_INTERVAL = 0.25  # seconds between polls
+
+# Every module a target may run, each after the modules it imports. Reloading
+# a module reloads everything after it, so no module keeps a stale reference
+# (PillowBackend imports create_icon lazily, hence icon_backends after it).
+MODULE_ORDER = (
+    'build_trace', 'png_encode', 'icon_raster', 'icon_scene', 'icon_pyramid', 'icon_cache', 'icon_jobs',
+    'create_icon', 'icon_backends', 'generate_icons', 'build_icon_bundle',
+    'docx_tables', 'image_prep', 'manual_content', 'manual_i18n', 'manual_html', 'manual_pdf', 'create_manual',
+)
+
+# Modules that only draw the icon_scene artwork
+SCENE_MODULES = {'icon_raster', 'icon_scene', 'create_icon'}
+
+def module_files(names):
+    """Return the source files of the named modules that are loaded."""
+    return [os.path.abspath(sys.modules[name].__file__) for name in names if name in sys.modules]
+
+def reload_modules(changed_paths):
+    """Reload the modules whose files changed, and every module after them.
+
+    Returns the names of the modules whose files changed.
+    """
+    by_file = {os.path.abspath(sys.modules[name].__file__): name for name in MODULE_ORDER if name in sys.modules}
+    changed = {by_file[path] for path in changed_paths if path in by_file}
+    if changed:
+        first = min(MODULE_ORDER.index(name) for name in changed)
+        for name in MODULE_ORDER[first:]:
+            if name in sys.modules:
+                importlib.reload(sys.modules[name])
+    return changed
+
+# ---------------------------------------------------------------------------
+# Targets
+# ---------------------------------------------------------------------------
+
+class WatchTarget(ABC):
+    """A build with its inputs and any state worth keeping between rebuilds."""
+    name = None
+    modules = ()
+
+    def inputs(self):
+        """Return the files whose changes trigger a rebuild."""
+        return module_files(self.modules)
+
+    def reset(self, changed_modules):
+        """Drop state built by code that has just been reloaded."""
+
+    @abstractmethod
+    def build(self, changed):
+        """Rebuild the target; ``changed`` is the set of input files that changed."""
+
+class IconsTarget(WatchTarget):
+    name = 'icons'
+    modules = ('png_encode', 'icon_raster', 'icon_scene', 'icon_pyramid', 'icon_cache', 'create_icon')
+
+    def __init__(self, argv):
+        self.argv = argv
+
+    def build(self, changed):
+        sys.modules['create_icon'].main(self.argv)
+
+class SvgTarget(WatchTarget):
+    name = 'svg'
+    modules = ('png_encode', 'icon_pyramid', 'icon_cache', 'icon_backends', 'generate_icons') + tuple(SCENE_MODULES)
+
+    def __init__(self, argv):
+        self.argv = argv
+
+    def inputs(self):
+        generate_icons = sys.modules['generate_icons']
+        return super().inputs() + [os.path.abspath(generate_icons.default_svg_path(PROJECT_ROOT))]
+
+    def build(self, changed):
+        sys.modules['generate_icons'].main(self.argv)
+
+class BundleTarget(WatchTarget):
+    name = 'bundle'
+    modules = ('png_encode', 'icon_backends', 'icon_pyramid', 'build_icon_bundle') + tuple(SCENE_MODULES)
+
+    def __init__(self, args):
+        self.args = args
+        self.manifest = None
+        self.cache = None
+        self.stale_layers = set()
+
+    def layer_paths(self):
+        """Map each SVG layer's file to its layer names."""
+        paths = {}
+        for layer, spec in (self.manifest or {}).get('layers', {}).items():
+            if spec['renderer'] == 'svg':
+                paths.setdefault(os.path.join(PROJECT_ROOT, spec['path']), set()).add(layer)
+        return paths
+
+    def inputs(self):
+        return super().inputs() + [os.path.abspath(self.args.manifest)] + list(self.layer_paths())
+
+    def reset(self, changed_modules):
+        if changed_modules <= SCENE_MODULES and self.manifest is not None:
+            self.stale_layers |= {layer for layer, spec in self.manifest['layers'].items()
+                                  if spec['renderer'] == 'scene'}
+        else:
+            self.cache = None
+
+    def build(self, changed):
+        build_icon_bundle = sys.modules['build_icon_bundle']
+        png_encode = sys.modules['png_encode']
+        manifest = build_icon_bundle.load_manifest(self.args.manifest)
+        if manifest != self.manifest:
+            self.cache = None
+        self.manifest = manifest
+        for path, layers in self.layer_paths().items():
+            if path in changed:
+                self.stale_layers |= layers
+        if self.cache is None:
+            self.cache = build_icon_bundle.RenderCache(manifest['layers'], backend=self.args.backend)
+        else:
+            self.cache.forget(self.stale_layers)
+        self.stale_layers = set()
+        written, failed, renders = build_icon_bundle.build_bundle(
+            manifest, self.args.bundle_output, self.args.platform, png_encode.PngEncoder(self.args.png),
+            backend=self.args.backend, cache=self.cache)
+        print(f"[OK] Wrote {written}/{written + failed} files from {renders} renders: {self.args.bundle_output}")
+
+class ManualTarget(WatchTarget):
+    name = 'manual'
+    modules = ('docx_tables', 'image_prep', 'manual_content', 'manual_i18n', 'manual_html', 'manual_pdf',
+               'create_manual')
+
+    def __init__(self, args):
+        self.args = args
+        self.preprocessor = None
+        self.fragments = None
+
+    def catalogs(self):
+        """Map each built language's string catalog to its language."""
+        manual_i18n = sys.modules['manual_i18n']
+        return {os.path.abspath(manual_i18n.catalog_path(language)): language
+                for language in self.args.languages if language != manual_i18n.SOURCE_LANGUAGE}
+
+    def inputs(self):
+        images_dir = os.path.abspath(sys.modules['create_manual'].IMAGES_DIR)
+        images = [os.path.join(images_dir, name) for name in sorted(os.listdir(images_dir))]
+        data = [os.path.abspath(self.args.content)] + ([os.path.abspath(self.args.catalog)] if self.args.catalog else [])
+        return super().inputs() + data + images + list(self.catalogs())
+
+    def reset(self, changed_modules):
+        self.preprocessor = self.fragments = None
+
+    def build(self, changed):
+        create_manual = sys.modules['create_manual']
+        if self.fragments is None:
+            self.preprocessor = sys.modules['image_prep'].ImagePreprocessor()
+            self.fragments = create_manual.FragmentCache()
+        catalogs = self.catalogs()
+        languages = self.args.languages
+        if changed and changed <= set(catalogs):
+            # Only translations changed: the other languages read the same
+            languages = tuple(dict.fromkeys(catalogs[path] for path in changed))
+        self.preprocessor.prepared.clear()
+        create_manual.create_manual(self.args.manual_output, self.preprocessor, content_path=self.args.content,
+                                    fragments=self.fragments, catalog=self.args.catalog, formats=self.args.formats,
+                                    workers=1, languages=languages)
+        if languages == self.args.languages:
+            self.fragments.trim()
+
+# ---------------------------------------------------------------------------
+# Watching
+# ---------------------------------------------------------------------------
+
+def snapshot(paths):
+    """Return {path: (mtime_ns, size)}, None for files that do not exist."""
+    state = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            state[path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            state[path] = None
+    return state
+
+def changed_paths(before, after):
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+def run_build(target, changed):
+    """Build one target, reporting instead of raising so the watcher keeps going."""
+    start = time.perf_counter()
+    try:
+        target.build(changed)
+    except Exception:
+        traceback.print_exc()
+        print(f"[WATCH] {target.name}: failed after {time.perf_counter() - start:.2f} s")
+        return False
+    print(f"[WATCH] {target.name}: built in {time.perf_counter() - start:.2f} s")
+    return True
+
+def rebuild(targets, changed):
+    """Reload changed scripts and rebuild the targets that read a changed file."""
+    names = ', '.join(sorted(os.path.relpath(path, PROJECT_ROOT) for path in changed))
+    print(f"[WATCH] Changed: {names}")
+    try:
+        changed_modules = reload_modules(changed)
+    except Exception:
+        traceback.print_exc()
+        print("[WATCH] Reload failed; fix the script and save again")
+        return
+    for target in targets:
+        if changed_modules & set(target.modules):
+            target.reset(changed_modules)
+        hits = changed & set(target.inputs())
+        if hits:
+            run_build(target, hits)
+
+def watch(targets, interval=DEFAULT_INTERVAL):
+    """Poll the targets' inputs and rebuild on changes until interrupted."""
+    def inputs():
+        return {path for target in targets for path in target.inputs()}
+
+    state = snapshot(inputs())
+    print(f"[WATCH] Watching {len(state)} files for {', '.join(t.name for t in targets)}; Ctrl+C to stop")
+    while True:
+        time.sleep(interval)
+        current = snapshot(inputs())
+        changed = changed_paths(state, current)
+        if not changed:
+            continue
+        # Editors save in several writes; wait until the files settle
+        while True:
+            time.sleep(interval)
+            settled = snapshot(current)
+            if settled == current:
+                break
+            changed |= changed_paths(current, settled)
+            current = settled
+        rebuild(targets, changed)
+        state = snapshot(inputs())
+
+def main(argv=None):
+    # Imported here so the modules load once, with this folder and docs/ on sys.path
+    import build_icon_bundle
+    import create_icon
+    import create_manual
+    import generate_icons
+    from icon_backends import add_backend_argument
+    from png_encode import DEFAULT_PRESET, PRESETS
+
+    parser = argparse.ArgumentParser(description="Rebuild the icons, icon bundle and manual when their inputs change.")
+    parser.add_argument('--target', action='append', choices=('icons', 'svg', 'bundle', 'manual'), dest='targets',
+                        help='target to watch, repeatable (default: icons, bundle and manual)')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, metavar='SECONDS',
+                        help=f'how often to poll for changes (default: {DEFAULT_INTERVAL})')
+    parser.add_argument('--once', action='store_true', help='build the targets once and exit')
+    parser.add_argument('--png', choices=PRESETS, default=DEFAULT_PRESET,
+                        help=f'PNG encoding preset (default: {DEFAULT_PRESET})')
+    parser.add_argument('--variant', action='append', help='icons: variant to create, repeatable (default: default)')
+    add_backend_argument(parser)
+    parser.add_argument('--manifest', default=build_icon_bundle.DEFAULT_MANIFEST,
+                        help='bundle: manifest (default: icon_bundle.json)')
+    parser.add_argument('--bundle-output', default=build_icon_bundle.DEFAULT_OUTPUT_DIR, metavar='DIR',
+                        help='bundle: output directory (default: store-assets/icon-bundle)')
+    parser.add_argument('--platform', action='append', choices=sorted(build_icon_bundle.PLATFORMS),
+                        help='bundle: only build this platform, repeatable')
+    parser.add_argument('--manual-output', metavar='PATH',
+                        help='manual: output path; the extension is set per format (default: next to create_manual.py)')
+    parser.add_argument('--format', action='append', choices=create_manual.OUTPUT_FORMATS, dest='formats',
+                        help='manual: output format, repeatable (default: docx)')
+    parser.add_argument('--language', action='append', dest='languages',
+                        help=f'manual: language, repeatable (default: {create_manual.SOURCE_LANGUAGE})')
+    parser.add_argument('--content', default=create_manual.CONTENT_PATH, help='manual: content (default: manual.yaml)')
+    parser.add_argument('--catalog', metavar='CSV', help='manual: append an item catalog from a StockItem CSV export')
+    args = parser.parse_args(argv)
+    args.formats = tuple(dict.fromkeys(args.formats or ['docx']))
+    args.languages = tuple(dict.fromkeys(args.languages or [create_manual.SOURCE_LANGUAGE]))
+
+    icon_argv = ['--png', args.png, '--no-png-stats']
+    for variant in args.variant or []:
+        icon_argv += ['--variant', variant]
+    available = {
+        'icons': lambda: IconsTarget(icon_argv),
+        'svg': lambda: SvgTarget(['--png', args.png, '--no-png-stats', '--backend', args.backend]),
+        'bundle': lambda: BundleTarget(args),
+        'manual': lambda: ManualTarget(args),
+    }
+    targets = [available[name]() for name in dict.fromkeys(args.targets or ['icons', 'bundle', 'manual'])]
+
+    for target in targets:
+        run_build(target, set())
+    if args.once:
+        return
+    try:
+        watch(targets, args.interval)
+    except KeyboardInterrupt:
+        print("\n[WATCH] Stopped")
+
+if __name__ == "__main__":
+    main()